@@ -0,0 +1,3 @@
+"""
+Benchmarks for local vector search.
+"""
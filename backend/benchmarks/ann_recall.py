@@ -0,0 +1,96 @@
+"""
+Recall/latency benchmark of the IVF index against exact local search.
+
+Usage:
+    python -m benchmarks.ann_recall --vectors 200000 --dimension 256 --queries 200
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+import numpy as np
+from services.ann_index import ANNVectorIndex
+from services.local_index import LocalVectorIndex
+
+def make_corpus(n: int, dimension: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Generate clustered unit vectors resembling embedding corpora."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+async def run_benchmark(
+    n: int,
+    dimension: int,
+    n_queries: int,
+    top_k: int,
+    nprobes: List[int]
+) -> List[Dict[str, float]]:
+    """
+    Compare IVF search against exact search over the same corpus.
+
+    Args:
+        n: Corpus size
+        dimension: Vector dimension
+        n_queries: Number of queries
+        top_k: Results per query
+        nprobes: nprobe values to measure
+
+    Returns:
+        One row per nprobe with recall@k and mean latencies in milliseconds
+    """
+    corpus = make_corpus(n, dimension, clusters=max(16, n // 1000))
+    queries = make_corpus(n_queries, dimension, clusters=max(16, n // 1000), seed=1)
+    ids = [str(i) for i in range(n)]
+
+    exact = LocalVectorIndex(dimension=dimension)
+    await exact.upsert_matrix(ids, corpus)
+    started = time.perf_counter()
+    approximate = ANNVectorIndex(dimension=dimension, min_train_size=min(n, 10000))
+    await approximate.upsert_matrix(ids, corpus)
+    await approximate.wait_for_training()
+    build_seconds = time.perf_counter() - started
+
+    truth = []
+    started = time.perf_counter()
+    for query in queries:
+        matches = await exact.query_vectors(query, top_k=top_k)
+        truth.append({match["id"] for match in matches})
+    exact_ms = (time.perf_counter() - started) * 1000 / n_queries
+
+    rows = []
+    for nprobe in nprobes:
+        approximate.set_nprobe(nprobe)
+        hits = 0
+        started = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            matches = await approximate.query_vectors(query, top_k=top_k)
+            hits += len(expected & {match["id"] for match in matches})
+        ann_ms = (time.perf_counter() - started) * 1000 / n_queries
+        rows.append({
+            "nprobe": nprobe,
+            "recall": hits / (top_k * n_queries),
+            "ann_ms": ann_ms,
+            "exact_ms": exact_ms,
+            "build_s": build_seconds,
+        })
+    return rows
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rows = asyncio.run(run_benchmark(args.vectors, args.dimension, args.queries, args.top_k, args.nprobe))
+    print(f"{args.vectors} vectors x {args.dimension} dims, built in {rows[0]['build_s']:.1f}s")
+    print(f"{'nprobe':>6} {'recall@' + str(args.top_k):>10} {'ivf ms':>8} {'exact ms':>9}")
+    for row in rows:
+        print(f"{row['nprobe']:>6} {row['recall']:>10.3f} {row['ann_ms']:>8.2f} {row['exact_ms']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
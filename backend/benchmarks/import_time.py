@@ -0,0 +1,76 @@
+"""
+Import-time profile of a backend module, from a cold interpreter.
+
+Usage:
+    python -m benchmarks.import_time --module main --top 25
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+def measure_cold_import(module: str) -> float:
+    """
+    Measure the wall time of importing a module in a fresh interpreter.
+
+    Args:
+        module: Dotted module name
+
+    Returns:
+        Import time in seconds (interpreter startup excluded)
+    """
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True, check=True, cwd=os.getcwd()
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def profile_imports(module: str) -> List[Dict[str, object]]:
+    """
+    Profile a cold import with ``python -X importtime``.
+
+    Args:
+        module: Dotted module name
+
+    Returns:
+        One row per imported module with self and cumulative microseconds
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, cwd=os.getcwd()
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return rows
+
+def main() -> None:
+    """Print the slowest imports from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    seconds = measure_cold_import(args.module)
+    rows = profile_imports(args.module)
+    print(f"import {args.module}: {seconds * 1000:.0f} ms, {len(rows)} modules")
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for row in sorted(rows, key=lambda row: row["cumulative_us"], reverse=True)[:args.top]:
+        print(f"{row['cumulative_us'] / 1000:>13.1f} {row['self_us'] / 1000:>8.1f}  {row['module']}")
+
+if __name__ == "__main__":
+    main()
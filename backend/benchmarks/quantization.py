@@ -0,0 +1,110 @@
+"""
+Memory/recall benchmark of compressed (int8 / PQ) local storage against exact search.
+
+Usage:
+    python -m benchmarks.quantization --vectors 50000 --dimension 1536 --queries 100
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+from benchmarks.ann_recall import make_corpus
+from services.local_index import LocalVectorIndex
+from services.quantized_index import QuantizedVectorIndex
+
+async def run_benchmark(
+    n: int,
+    dimension: int,
+    n_queries: int,
+    top_k: int,
+    n_subvectors: int,
+    rerank: int
+) -> List[Dict[str, float]]:
+    """
+    Compare each codec's memory and recall against exact search.
+
+    Args:
+        n: Corpus size
+        dimension: Vector dimension
+        n_queries: Number of queries
+        top_k: Results per query
+        n_subvectors: PQ code bytes per vector
+        rerank: Candidates re-scored exactly in the re-ranked variants
+
+    Returns:
+        One row per configuration with resident and disk-mapped bytes per
+        vector, compression ratio of the resident bytes, recall@k and mean
+        query latency in milliseconds
+    """
+    corpus = make_corpus(n, dimension, clusters=max(16, n // 1000))
+    queries = make_corpus(n_queries, dimension, clusters=max(16, n // 1000), seed=1)
+    ids = [str(i) for i in range(n)]
+
+    exact = LocalVectorIndex(dimension=dimension)
+    await exact.upsert_matrix(ids, corpus)
+    truth = []
+    started = time.perf_counter()
+    for query in queries:
+        truth.append({match["id"] for match in await exact.query_vectors(query, top_k=top_k)})
+    exact_ms = (time.perf_counter() - started) * 1000 / n_queries
+
+    float_bytes = dimension * 4
+    rows = [{"codec": "float32", "bytes": float_bytes, "mapped": 0, "ratio": 1.0, "recall": 1.0, "ms": exact_ms}]
+    configurations = [
+        ("int8", {"codec": "int8"}),
+        (f"int8+rerank{rerank}", {"codec": "int8", "rerank": rerank}),
+        (f"pq{n_subvectors}+rerank{rerank}", {"codec": "pq", "n_subvectors": n_subvectors, "rerank": rerank}),
+    ]
+    for name, options in configurations:
+        index = QuantizedVectorIndex(dimension=dimension, min_train_size=min(n, 10000), **options)
+        await index.upsert_matrix(ids, corpus)
+        await index.wait_for_training()
+
+        hits = 0
+        started = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            matches = await index.query_vectors(query, top_k=top_k)
+            hits += len(expected & {match["id"] for match in matches})
+        elapsed_ms = (time.perf_counter() - started) * 1000 / n_queries
+
+        # Resident bytes count codes, codebooks and any in-memory originals;
+        # re-ranked variants page their originals in from a disk-backed map
+        usage = index.memory_usage()
+        bytes_per_vector = usage["resident_bytes"] / n
+        rows.append({
+            "codec": name,
+            "bytes": bytes_per_vector,
+            "mapped": usage["mapped_bytes"] / n,
+            "ratio": float_bytes / bytes_per_vector,
+            "recall": hits / (top_k * n_queries),
+            "ms": elapsed_ms,
+        })
+    return rows
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--subvectors", type=int, default=96)
+    parser.add_argument("--rerank", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = asyncio.run(run_benchmark(
+        args.vectors, args.dimension, args.queries, args.top_k, args.subvectors, args.rerank
+    ))
+    print(f"{args.vectors} vectors x {args.dimension} dims")
+    print(
+        f"{'codec':>18} {'bytes/vec':>10} {'mapped/vec':>11} {'ratio':>7} "
+        f"{'recall@' + str(args.top_k):>10} {'ms':>8}"
+    )
+    for row in rows:
+        print(
+            f"{row['codec']:>18} {row['bytes']:>10.0f} {row['mapped']:>11.0f} {row['ratio']:>6.1f}x "
+            f"{row['recall']:>10.3f} {row['ms']:>8.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -21,15 +21,107 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_JWT_SECRET: str
+    SUPABASE_TIMEOUT: float = 10.0  # Seconds allowed per database call
+    SUPABASE_CONNECT_TIMEOUT: float = 5.0  # Seconds allowed to open a connection
+    SUPABASE_MAX_CONNECTIONS: int = 100  # Connections in the shared pool
+    SUPABASE_MAX_KEEPALIVE: int = 20  # Idle connections kept open for reuse
+    SUPABASE_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection is kept open
+    SUPABASE_HTTP2: bool = True  # Multiplex requests over HTTP/2 when h2 is installed
+    
+    # Repository settings
+    REPOSITORY_BULK_CHUNK_SIZE: int = 500  # Rows (or IDs) per bulk insert/upsert/update/delete request
+    REPOSITORY_PAGE_SIZE: int = 500  # Rows fetched per page by iter_pages/iterate
+    ENTITY_CACHE_ENABLED: bool = True
+    ENTITY_CACHE_MAX_ENTRIES: int = 10000  # Records kept in memory across all tables
+    ENTITY_CACHE_TTLS: dict[str, float] = {"users": 300.0}  # Seconds records stay cached, per table (others are not cached)
+    ENTITY_CACHE_NEGATIVE_TTL: float = 30.0  # Seconds a lookup that found nothing is remembered
     
     # Pinecone settings
     PINECONE_API_KEY: str
     PINECONE_ENVIRONMENT: str
     PINECONE_INDEX_NAME: str
+    PINECONE_UPSERT_BATCH_SIZE: int = 100  # Maximum vectors per upsert request
+    PINECONE_UPSERT_MAX_BYTES: int = 2_000_000  # Maximum serialized payload per upsert request
+    PINECONE_UPSERT_CONCURRENCY: int = 4  # Upsert requests in flight at once
+    PINECONE_READY_TIMEOUT: float = 60.0  # Seconds to wait for a newly created index
+    PINECONE_READY_POLL_INTERVAL: float = 1.0  # Seconds between index readiness checks
+    
+    # Local vector index settings
+    VECTOR_STORE_BACKEND: str = "pinecone"  # "pinecone" or "local" (in-process index)
+    LOCAL_INDEX_DIR: Optional[str] = None  # Where the local index is loaded from / saved to
+    LOCAL_MIRROR_NAMESPACES: list[str] = []  # Pinecone namespaces also served from the local index
+    LOCAL_INDEX_TYPE: str = "flat"  # "flat" (exact), "ivf" (approximate) or "int8"/"pq" (compressed)
+    LOCAL_INDEX_NLIST: Optional[int] = None  # IVF clusters per namespace (defaults to sqrt(n))
+    LOCAL_INDEX_NPROBE: int = 16  # IVF clusters scanned per query (recall/speed tradeoff)
+    LOCAL_INDEX_MIN_TRAIN_SIZE: int = 10000  # IVF/PQ namespaces are searched exactly below this size
+    LOCAL_INDEX_PQ_SUBVECTORS: int = 96  # PQ code bytes per vector (must divide the dimension)
+    LOCAL_INDEX_RERANK: int = 0  # int8/PQ candidates re-scored with full vectors (kept on disk, memory-mapped; 0 disables, "pq" requires > 0)
+    
+    # Multi-query search settings
+    SEARCH_TIMEOUT: float = 5.0  # Deadline for query_many; slower namespaces are left out
+    SEARCH_MAX_CONCURRENCY: int = 8  # Namespace queries in flight at once
+    
+    # Lexical and hybrid search settings
+    LEXICAL_BM25_K1: float = 1.2  # BM25 term-frequency saturation
+    LEXICAL_BM25_B: float = 0.75  # BM25 document-length normalization
+    LEXICAL_INDEX_PATH: Optional[str] = None  # Where the BM25 index is loaded from / saved to (defaults to LOCAL_INDEX_DIR/lexical.json)
+    HYBRID_CANDIDATES: int = 50  # Results taken from each retriever before fusion
+    HYBRID_RRF_K: int = 60  # Reciprocal rank fusion smoothing constant
+    
+    # Query result cache settings
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_TTL: float = 300.0  # Seconds a cached result set stays valid
+    QUERY_CACHE_MAX_ENTRIES: int = 1000  # Result sets kept in memory
+    QUERY_CACHE_DECIMALS: int = 4  # Query vectors are rounded to this precision for the key
     
     # OpenAI settings for AutoGen
     OPENAI_API_KEY: str
     
+    # Embedding cache settings
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_DIR: Optional[str] = ".cache/embeddings"  # None keeps the cache in memory only
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000  # In-memory LRU size
+    EMBEDDING_CACHE_MAX_DISK_ENTRIES: int = 500000  # On-disk store size
+    
+    # Embedding request settings
+    EMBEDDING_BATCH_SIZE: int = 2048  # Maximum texts per embeddings API request
+    EMBEDDING_MAX_TOKENS_PER_REQUEST: int = 250000  # Token budget per embeddings API request
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # Embeddings API requests in flight at once
+    EMBEDDING_MAX_INPUT_TOKENS: int = 8000  # Longer inputs are split into windows
+    EMBEDDING_WINDOW_OVERLAP: int = 200  # Tokens shared between consecutive windows
+    EMBEDDING_POOLING: str = "mean"  # How window embeddings are combined: mean, max or first
+    EMBEDDING_COALESCE_WINDOW_MS: float = 5.0  # Collect concurrent get_embedding calls (0 disables)
+    EMBEDDING_COALESCE_MAX_BATCH: int = 64  # Send a coalesced batch early at this size
+    
+    # Retry and circuit breaker settings (per batch, for embeddings and upserts)
+    RETRY_MAX_ATTEMPTS: int = 3  # Attempts per batch before it is reported as failed
+    RETRY_BASE_DELAY: float = 0.5  # Backoff cap for the first retry; doubles per attempt (jittered)
+    RETRY_MAX_DELAY: float = 10.0  # Upper bound for any backoff delay
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures before failing fast
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = 30.0  # Seconds before a trial call is let through
+    
+    # Context upload settings
+    UPLOAD_SPOOL_DIR: str = ".cache/uploads"  # Uploads are streamed here until processed
+    UPLOAD_BLOCK_SIZE: int = 1_048_576  # Bytes read and written per step while spooling
+    UPLOAD_MAX_BYTES: int = 524_288_000  # Larger uploads are rejected with 413
+    UPLOAD_CHUNK_TOKENS: int = 500  # Tokens per embedded chunk
+    UPLOAD_CHUNK_OVERLAP: int = 50  # Tokens shared by consecutive chunks
+    UPLOAD_EMBED_BATCH_SIZE: int = 256  # Chunks embedded and upserted per step
+    
+    # Job queue settings
+    JOB_QUEUE_ENABLED: bool = True  # Run uploads and delegations on the durable job queue
+    JOB_QUEUE_PATH: str = ".cache/jobs.sqlite3"  # SQLite file holding queued jobs
+    JOB_DEFAULT_CONCURRENCY: int = 2  # Workers per job type
+    JOB_CONCURRENCY: dict[str, int] = {}  # Worker overrides by job type, e.g. {"context_upload": 1}
+    JOB_MAX_ATTEMPTS: int = 3  # Attempts per job before it is marked failed
+    JOB_VISIBILITY_TIMEOUT: float = 300.0  # Seconds before a job whose worker stopped renewing runs again
+    JOB_POLL_INTERVAL: float = 1.0  # Seconds between checks for delayed or expired jobs
+    JOB_RETRY_BASE_DELAY: float = 1.0  # Backoff cap for the first retry; doubles per attempt (jittered)
+    JOB_RETRY_MAX_DELAY: float = 60.0  # Upper bound for any retry delay
+    
+    # Service startup settings
+    SERVICE_PRELOAD: list[str] = []  # Services built at startup instead of on first use
+    
     # Database URL
     DATABASE_URL: str
     
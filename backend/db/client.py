@@ -0,0 +1,94 @@
+"""
+Shared async PostgREST client for Supabase data access.
+
+One pooled, keep-alive HTTP client is built per process on first use and
+shared by Database and SupabaseService, so concurrent requests overlap
+their database I/O on the same connections instead of blocking the event
+loop or opening a client each.
+"""
+import asyncio
+import importlib.util
+import inspect
+import logging
+import threading
+from typing import Any, Optional
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_client: Optional[Any] = None
+_lock = threading.Lock()
+
+def http2_available() -> bool:
+    """Check whether the h2 package HTTP/2 support needs is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+def _build_client() -> Any:
+    """Create the PostgREST client on a pooled httpx.AsyncClient."""
+    # Imported here so importing the data layer does not load the client libraries
+    import httpx
+    from postgrest import AsyncPostgrestClient
+
+    base_url = f"{settings.SUPABASE_URL.rstrip('/')}/rest/v1"
+    headers = {"apikey": settings.SUPABASE_KEY, "Authorization": f"Bearer {settings.SUPABASE_KEY}"}
+    http2 = settings.SUPABASE_HTTP2 and http2_available()
+    http_client = httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=httpx.Timeout(settings.SUPABASE_TIMEOUT, connect=settings.SUPABASE_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY
+        ),
+        http2=http2,
+        follow_redirects=True
+    )
+    if "http_client" in inspect.signature(AsyncPostgrestClient.__init__).parameters:
+        client = AsyncPostgrestClient(base_url, headers=headers, http_client=http_client)
+    else:
+        # Older postgrest releases build their own session; swap in the pooled one
+        client = AsyncPostgrestClient(base_url, headers=headers)
+        http_client.headers.update(client.headers)
+        client.session = http_client
+    logger.info(f"Created Supabase data client ({'HTTP/2' if http2 else 'HTTP/1.1'})")
+    return client
+
+def get_async_client() -> Any:
+    """
+    Get the process-wide async PostgREST client, building it on first use.
+
+    Returns:
+        postgrest.AsyncPostgrestClient sharing one connection pool
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+async def close_async_client() -> None:
+    """Close the shared client's connections (a later call builds a new client)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+        logger.info("Closed Supabase data client")
+
+async def execute(query: Any, timeout: Optional[float] = None) -> Any:
+    """
+    Send a PostgREST request with a deadline for the whole call.
+
+    Args:
+        query: Request builder (e.g. client.from_("users").select("*"))
+        timeout: Seconds before the call is abandoned (defaults to SUPABASE_TIMEOUT)
+
+    Returns:
+        The API response
+
+    Raises:
+        asyncio.TimeoutError: If the call takes longer than the timeout
+    """
+    return await asyncio.wait_for(query.execute(), timeout or settings.SUPABASE_TIMEOUT)
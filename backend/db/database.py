@@ -1,12 +1,69 @@
-from typing import Optional, Dict, Any
-from supabase import create_client, Client
+from typing import Optional, Dict, Any, List
 
-from config.settings import settings
+from config.settings import get_settings
+from db.client import execute, get_async_client
+
+settings = get_settings()
+
+def _apply_filters(query: Any, filters: Optional[List[Dict[str, Any]]]) -> Any:
+    """Add filter dictionaries ({'column', 'operator', 'value'}) to a query."""
+    for filter_dict in filters or []:
+        if filter_dict['operator'] == 'in':
+            query = query.in_(filter_dict['column'], filter_dict['value'])
+        else:
+            query = query.filter(
+                filter_dict['column'],
+                filter_dict['operator'],
+                filter_dict['value']
+            )
+    return query
+
+def _apply_order(query: Any, order_by: Any) -> Any:
+    """Order a query by a column name or a list of {'column', 'order', 'nullsfirst'} dictionaries."""
+    if isinstance(order_by, str):
+        return query.order(order_by)
+    for order_dict in order_by:
+        query = query.order(
+            order_dict['column'],
+            desc=order_dict.get('order') == 'desc',
+            nullsfirst=order_dict.get('nullsfirst')
+        )
+    return query
+
+def _quote(value: Any) -> str:
+    """Quote a value for a PostgREST logic tree (timestamps contain reserved characters)."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def _keyset_condition(after: Dict[str, Any]) -> str:
+    """PostgREST or= condition selecting the rows after a keyset cursor.
+
+    Rows are ordered by (column, id), ascending with NULLs first or
+    descending with NULLs last, so the condition is
+
+        column > value OR (column = value AND id > last id)
+
+    (with < when descending) plus the rules for NULL column values.
+
+    Args:
+        after: Dict with 'column', 'value', 'id' and 'descending'
+
+    Returns:
+        Condition for query.or_
+    """
+    column = after['column']
+    op = 'lt' if after['descending'] else 'gt'
+    after_id = f"id.{op}.{_quote(after['id'])}"
+    if after['value'] is None:
+        if after['descending']:
+            return f"and({column}.is.null,{after_id})"
+        return f"{column}.not.is.null,and({column}.is.null,{after_id})"
+    value = _quote(after['value'])
+    condition = f"{column}.{op}.{value},and({column}.eq.{value},{after_id})"
+    return f"{condition},{column}.is.null" if after['descending'] else condition
 
 class Database:
     """Database connection and operations manager."""
     _instance: Optional['Database'] = None
-    _client: Optional[Client] = None
 
     def __new__(cls) -> 'Database':
         """Implement singleton pattern."""
@@ -14,28 +71,26 @@ class Database:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        """Initialize database connection if not already initialized."""
-        if Database._client is None:
-            Database._client = create_client(
-                settings.SUPABASE_URL,
-                settings.SUPABASE_KEY
-            )
-
     @property
-    def client(self) -> Client:
-        """Get the Supabase client instance."""
-        if self._client is None:
-            raise RuntimeError("Database client not initialized")
-        return self._client
+    def client(self) -> Any:
+        """Get the shared async PostgREST client (built on first use)."""
+        return get_async_client()
 
-    async def execute(self, table: str, query_type: str, data: Dict[str, Any] = None, **kwargs) -> Dict:
+    async def execute(
+        self,
+        table: str,
+        query_type: str,
+        data: Any = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Dict:
         """Execute a database operation.
         
         Args:
             table: Name of the table to operate on
             query_type: Type of query ('select', 'insert', 'update', 'delete', 'upsert')
-            data: Data for insert/update operations
+            data: Data for insert/update/upsert operations (a list inserts or upserts many rows)
+            timeout: Seconds before the call is abandoned (defaults to SUPABASE_TIMEOUT)
             **kwargs: Additional query parameters
         
         Returns:
@@ -45,51 +100,54 @@ class Database:
 
         if query_type == 'select':
             # Handle select query parameters
-            if kwargs.get('columns'):
-                query = query.select(kwargs['columns'])
-            if kwargs.get('filters'):
-                for filter_dict in kwargs['filters']:
-                    query = query.filter(
-                        filter_dict['column'],
-                        filter_dict['operator'],
-                        filter_dict['value']
-                    )
+            query = _apply_filters(query.select(kwargs.get('columns') or '*'), kwargs.get('filters'))
+            if kwargs.get('keyset_after'):
+                query = query.or_(_keyset_condition(kwargs['keyset_after']))
             if kwargs.get('order_by'):
-                query = query.order(kwargs['order_by'])
+                query = _apply_order(query, kwargs['order_by'])
             if kwargs.get('limit'):
                 query = query.limit(kwargs['limit'])
             
-            result = await query.execute()
+            result = await execute(query, timeout)
             return result.data
 
         elif query_type == 'insert':
-            result = await query.insert(data).execute()
+            result = await execute(query.insert(data), timeout)
             return result.data
 
         elif query_type == 'update':
-            if not kwargs.get('match_column'):
-                raise ValueError("match_column is required for update operations")
+            # Rows are matched by one column value or, for bulk updates, by filters
+            if kwargs.get('match_column'):
+                query = query.update(data).match({kwargs['match_column']: kwargs['match_value']})
+            elif kwargs.get('filters'):
+                query = _apply_filters(query.update(data), kwargs['filters'])
+            else:
+                raise ValueError("match_column or filters is required for update operations")
             
-            result = await query.update(data).match(
-                {kwargs['match_column']: kwargs['match_value']}
-            ).execute()
+            result = await execute(query, timeout)
             return result.data
 
         elif query_type == 'upsert':
-            result = await query.upsert(data).execute()
+            if kwargs.get('on_conflict'):
+                query = query.upsert(data, on_conflict=kwargs['on_conflict'])
+            else:
+                query = query.upsert(data)
+            result = await execute(query, timeout)
             return result.data
 
         elif query_type == 'delete':
-            if not kwargs.get('match_column'):
-                raise ValueError("match_column is required for delete operations")
+            if kwargs.get('match_column'):
+                query = query.delete().match({kwargs['match_column']: kwargs['match_value']})
+            elif kwargs.get('filters'):
+                query = _apply_filters(query.delete(), kwargs['filters'])
+            else:
+                raise ValueError("match_column or filters is required for delete operations")
             
-            result = await query.delete().match(
-                {kwargs['match_column']: kwargs['match_value']}
-            ).execute()
+            result = await execute(query, timeout)
             return result.data
 
         else:
             raise ValueError(f"Unsupported query type: {query_type}")
 
 # Create a global database instance
-db = Database() 
\ No newline at end of file
+db = Database()
@@ -1,5 +1,7 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from config.settings import get_settings
 from config.validator import validate_on_startup
 import logging
@@ -16,9 +18,22 @@ settings = get_settings()
 # Validate environment variables on startup
 validate_on_startup()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background warm-up and job workers without delaying startup, and close services on shutdown."""
+    from services.registry import registry
+    from services.vector_store import check_vector_store_ready
+    await registry.startup(settings.SERVICE_PRELOAD)
+    await check_vector_store_ready()
+    if settings.JOB_QUEUE_ENABLED:
+        await registry.get("job_queue").start()
+    yield
+    await registry.shutdown()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
+    lifespan=lifespan,
     version=settings.APP_VERSION,
     docs_url=f"{settings.API_V1_PREFIX}/docs",
     redoc_url=f"{settings.API_V1_PREFIX}/redoc",
@@ -34,13 +49,14 @@ app.add_middleware(
 )
 
 # Import and include routers
-from routes import auth, tasks, agents, contexts
+from routes import auth, tasks, agents, contexts, jobs
 
 # Include routers with API prefix
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
 app.include_router(tasks.router, prefix=settings.API_V1_PREFIX)
 app.include_router(agents.router, prefix=settings.API_V1_PREFIX)
 app.include_router(contexts.router, prefix=settings.API_V1_PREFIX)
+app.include_router(jobs.router, prefix=settings.API_V1_PREFIX)
 
 @app.get("/")
 async def root():
@@ -49,4 +65,14 @@ async def root():
         "status": "ok",
         "name": settings.APP_NAME,
         "version": settings.APP_VERSION,
-    }
\ No newline at end of file
+    }
+
+@app.get("/ready")
+async def ready():
+    """Readiness endpoint: 200 once the vector store is usable, 503 until then."""
+    from services.vector_store import check_vector_store_ready
+    readiness = await check_vector_store_ready()
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content={"status": "ready" if readiness["ready"] else "starting", "vector_store": readiness},
+    )
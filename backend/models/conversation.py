@@ -59,4 +59,12 @@ class Conversation(SupabaseModel):
                 "is_active": True,
                 "last_interaction": "2024-03-20T10:30:00Z"
             }
-        } 
\ No newline at end of file
+        }
+
+class ConversationSummary(SupabaseModel):
+    """Conversation without its messages, for listing conversations."""
+    user_id: str
+    title: str
+    context: Dict = Field(default_factory=dict)
+    is_active: bool = True
+    last_interaction: Optional[datetime] = None
\ No newline at end of file
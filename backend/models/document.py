@@ -29,4 +29,13 @@ class Document(SupabaseModel):
                 "tags": ["marketing", "strategy", "2024"],
                 "source_url": "https://company-drive.com/docs/marketing-strategy.pdf"
             }
-        } 
\ No newline at end of file
+        }
+
+class DocumentSummary(SupabaseModel):
+    """Document without its content, for listing documents."""
+    title: str
+    user_id: str
+    embedding_id: Optional[str] = None
+    metadata: Dict = Field(default_factory=dict)
+    tags: List[str] = Field(default_factory=list)
+    source_url: Optional[str] = None
\ No newline at end of file
@@ -1,22 +1,52 @@
-from typing import TypeVar, Generic, List, Optional, Dict, Any
+import base64
+import json
+from dataclasses import dataclass
+from typing import (
+    TypeVar, Generic, List, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, Hashable,
+    Iterator, Sequence, Type, Union
+)
 from pydantic import BaseModel
 
+from config.settings import get_settings
 from db.database import db
+from .cache import MISS, EntityCache, get_entity_cache
+
+settings = get_settings()
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 
+def _chunks(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    """Split a sequence into consecutive chunks of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+@dataclass
+class Page(Generic[ModelType]):
+    """One page of a keyset-paginated query."""
+    items: List[ModelType]
+    next_cursor: Optional[str] = None  # Pass as after to get the next page; None on the last page
+
 class BaseRepository(Generic[ModelType]):
     """Base repository with common CRUD operations."""
     
-    def __init__(self, model: type[ModelType], table_name: str):
+    # Keyset pagination order: (sort_column, id), newest first by default.
+    # The pair should be covered by an index, e.g. (user_id, updated_at, id).
+    sort_column: str = 'updated_at'
+    sort_descending: bool = True
+    
+    def __init__(self, model: type[ModelType], table_name: str, cache: Optional[EntityCache] = None):
         """Initialize repository with model class and table name.
         
         Args:
             model: Pydantic model class
             table_name: Name of the database table
+            cache: Read-through cache for lookups by ID (defaults to the
+                shared entity cache; unused if it has no TTL for the table)
         """
         self.model = model
         self.table_name = table_name
+        cache = cache if cache is not None else get_entity_cache()
+        self.cache = cache if cache is not None and cache.caches(table_name) else None
 
     async def create(self, data: Dict[str, Any]) -> ModelType:
         """Create a new record.
@@ -27,40 +57,62 @@ class BaseRepository(Generic[ModelType]):
         Returns:
             Created model instance
         """
-        result = await db.execute(self.table_name, 'insert', data)
+        try:
+            result = await db.execute(self.table_name, 'insert', data)
+        finally:
+            self._invalidate()
         return self.model(**result[0])
 
-    async def get_by_id(self, id: str) -> Optional[ModelType]:
+    async def get_by_id(
+        self,
+        id: str,
+        projection: Optional[Type[BaseModel]] = None,
+        use_cache: bool = True
+    ) -> Optional[ModelType]:
         """Get a record by ID.
         
         Args:
             id: Record ID
+            projection: Model whose fields are the only columns fetched
+                (e.g. a summary model); defaults to the full model
+            use_cache: Whether the entity cache may answer; pass False to
+                read the current row, e.g. before a read-modify-write
             
         Returns:
             Model instance if found, None otherwise
         """
-        result = await db.execute(
-            self.table_name,
-            'select',
-            filters=[{'column': 'id', 'operator': 'eq', 'value': id}]
-        )
-        return self.model(**result[0]) if result else None
+        model, columns = self._projection(projection)
 
-    async def get_all(self, limit: int = 100) -> List[ModelType]:
-        """Get all records with optional limit.
+        async def load() -> Optional[ModelType]:
+            result = await db.execute(
+                self.table_name,
+                'select',
+                columns=columns,
+                filters=[{'column': 'id', 'operator': 'eq', 'value': id}]
+            )
+            return model(**result[0]) if result else None
+
+        if projection is not None or not use_cache:
+            return await load()
+        return await self._read_through('id', id, load)
+
+    async def get_all(
+        self,
+        limit: int = 100,
+        after: Optional[str] = None,
+        projection: Optional[Type[BaseModel]] = None
+    ) -> List[ModelType]:
+        """Get all records in keyset order with optional limit.
         
         Args:
             limit: Maximum number of records to return
+            after: Cursor of the last record already seen (see cursor)
+            projection: Model whose fields are the only columns fetched
             
         Returns:
             List of model instances
         """
-        result = await db.execute(
-            self.table_name,
-            'select',
-            limit=limit
-        )
-        return [self.model(**item) for item in result]
+        return await self.filter([], limit=limit, after=after, projection=projection)
 
     async def update(self, id: str, data: Dict[str, Any]) -> Optional[ModelType]:
         """Update a record by ID.
@@ -72,13 +124,16 @@ class BaseRepository(Generic[ModelType]):
         Returns:
             Updated model instance if found, None otherwise
         """
-        result = await db.execute(
-            self.table_name,
-            'update',
-            data=data,
-            match_column='id',
-            match_value=id
-        )
+        try:
+            result = await db.execute(
+                self.table_name,
+                'update',
+                data=data,
+                match_column='id',
+                match_value=id
+            )
+        finally:
+            self._invalidate(id)
         return self.model(**result[0]) if result else None
 
     async def delete(self, id: str) -> bool:
@@ -90,35 +145,335 @@ class BaseRepository(Generic[ModelType]):
         Returns:
             True if deleted, False if not found
         """
-        result = await db.execute(
-            self.table_name,
-            'delete',
-            match_column='id',
-            match_value=id
-        )
+        try:
+            result = await db.execute(
+                self.table_name,
+                'delete',
+                match_column='id',
+                match_value=id
+            )
+        finally:
+            self._invalidate(id)
         return bool(result)
 
     async def filter(
         self,
         filters: List[Dict[str, Any]],
-        order_by: Optional[str] = None,
-        limit: Optional[int] = None
+        order_by: Optional[Union[str, List[Dict[str, Any]]]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        projection: Optional[Type[BaseModel]] = None
     ) -> List[ModelType]:
         """Get records matching filters.
         
         Args:
             filters: List of filter dictionaries
-            order_by: Column to order by
+            order_by: Column, or list of {'column', 'order'} dictionaries, to
+                order by (defaults to the keyset order)
             limit: Maximum number of records to return
+            after: Cursor of the last record already seen; only records
+                after it in keyset order are returned
+            projection: Model whose fields are the only columns fetched
+                (e.g. a summary model); defaults to the full model
             
         Returns:
             List of model instances
+            
+        Raises:
+            ValueError: If a cursor is combined with another order, or is invalid
         """
+        if after is not None and order_by is not None:
+            raise ValueError("A cursor can only be used with the keyset order")
+        model, columns = self._projection(projection)
         result = await db.execute(
             self.table_name,
             'select',
+            columns=columns,
             filters=filters,
-            order_by=order_by,
-            limit=limit
+            order_by=order_by or self._keyset_order(),
+            limit=limit,
+            keyset_after=self._decode_cursor(after) if after else None
+        )
+        return [model(**item) for item in result] 
+
+    async def get_page(
+        self,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        limit: int = 100,
+        after: Optional[str] = None,
+        projection: Optional[Type[BaseModel]] = None
+    ) -> Page[ModelType]:
+        """Get one page of records in keyset order.
+        
+        Unlike offsets, the cursor stays cheap and stable on any page:
+        the database seeks to it on the (sort_column, id) index.
+        
+        Args:
+            filters: List of filter dictionaries
+            limit: Page size
+            after: Cursor from the previous page's next_cursor
+            projection: Model whose fields are the only columns fetched
+            
+        Returns:
+            The page and the cursor of the next one
+        """
+        items = await self.filter(filters or [], limit=limit, after=after, projection=projection)
+        return Page(items, self.cursor(items[-1]) if len(items) == limit else None)
+
+    async def iter_pages(
+        self,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        page_size: Optional[int] = None,
+        projection: Optional[Type[BaseModel]] = None
+    ) -> AsyncIterator[List[ModelType]]:
+        """Iterate over all matching records page by page, fetching each page lazily.
+        
+        Args:
+            filters: List of filter dictionaries
+            page_size: Records per request (defaults to REPOSITORY_PAGE_SIZE)
+            projection: Model whose fields are the only columns fetched
+            
+        Yields:
+            Lists of model instances, in keyset order
+        """
+        after = None
+        while True:
+            page = await self.get_page(filters, page_size or settings.REPOSITORY_PAGE_SIZE, after, projection)
+            if page.items:
+                yield page.items
+            if page.next_cursor is None:
+                return
+            after = page.next_cursor
+
+    async def iterate(
+        self,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        page_size: Optional[int] = None,
+        projection: Optional[Type[BaseModel]] = None
+    ) -> AsyncIterator[ModelType]:
+        """Iterate over all matching records, holding one page in memory at a time.
+        
+        Args:
+            filters: List of filter dictionaries
+            page_size: Records per request (defaults to REPOSITORY_PAGE_SIZE)
+            projection: Model whose fields are the only columns fetched
+            
+        Yields:
+            Model instances, in keyset order
+        """
+        async for page in self.iter_pages(filters, page_size, projection):
+            for item in page:
+                yield item
+
+    def _projection(self, projection: Optional[Type[BaseModel]]) -> tuple:
+        """Get the model rows are parsed into and the columns to select (None selects all)."""
+        if projection is None:
+            return self.model, None
+        if not {'id', self.sort_column} <= set(projection.model_fields):
+            # Cursors are built from these columns
+            raise ValueError(f"{projection.__name__} must include id and {self.sort_column}")
+        return projection, ','.join(projection.model_fields)
+
+    def cursor(self, item: ModelType) -> str:
+        """Get the opaque cursor pointing just after a record in keyset order."""
+        row = item.model_dump(mode='json', include={self.sort_column, 'id'})
+        key = json.dumps([row.get(self.sort_column), row['id']])
+        return base64.urlsafe_b64encode(key.encode()).decode()
+
+    def _decode_cursor(self, cursor: str) -> Dict[str, Any]:
+        """Turn a cursor into the keyset_after argument of Database.execute."""
+        try:
+            value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+        return {
+            'column': self.sort_column,
+            'value': value,
+            'id': last_id,
+            'descending': self.sort_descending
+        }
+
+    def _keyset_order(self) -> List[Dict[str, Any]]:
+        """Order of keyset pagination: (sort_column, id), NULLs at the start of the ascending order."""
+        order = 'desc' if self.sort_descending else 'asc'
+        return [
+            {'column': self.sort_column, 'order': order, 'nullsfirst': not self.sort_descending},
+            {'column': 'id', 'order': order},
+        ]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get entity cache statistics.
+
+        Returns:
+            Hit/miss counters and hit ratio, or {"enabled": False}
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+
+    async def _read_through(
+        self,
+        field: str,
+        value: Hashable,
+        load: Callable[[], Awaitable[Optional[ModelType]]]
+    ) -> Optional[ModelType]:
+        """Look a record up in the cache, loading and caching it (or its absence) on a miss."""
+        if self.cache is None:
+            return await load()
+        cached = self.cache.get(self.table_name, field, value)
+        if cached is not MISS:
+            # Callers get copies, so changing a model never changes the cache
+            return cached.model_copy(deep=True) if cached is not None else None
+        generation = self.cache.generation(self.table_name)
+        record = await load()
+        self.cache.set(
+            self.table_name,
+            field,
+            value,
+            record.model_copy(deep=True) if record is not None else None,
+            record_id=getattr(record, 'id', None),
+            generation=generation
         )
-        return [self.model(**item) for item in result] 
\ No newline at end of file
+        return record
+
+    def _invalidate(self, record_id: Optional[str] = None) -> None:
+        """Drop cached entries after a write (called after the write, so racing reads are not cached)."""
+        if self.cache is not None:
+            self.cache.invalidate(self.table_name, record_id)
+
+    def _row(self, item: Union[ModelType, Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert a model (unset IDs left to the database) or dict to a row."""
+        if isinstance(item, BaseModel):
+            return item.model_dump(mode='json', exclude_none=True)
+        return item
+
+    async def create_many(
+        self,
+        items: Sequence[Union[ModelType, Dict[str, Any]]],
+        chunk_size: Optional[int] = None
+    ) -> List[ModelType]:
+        """Create many records, one insert request per chunk.
+        
+        Args:
+            items: Models or dicts to insert
+            chunk_size: Rows per request (defaults to REPOSITORY_BULK_CHUNK_SIZE)
+            
+        Returns:
+            Created model instances
+        """
+        created = []
+        try:
+            for chunk in _chunks(items, chunk_size or settings.REPOSITORY_BULK_CHUNK_SIZE):
+                result = await db.execute(self.table_name, 'insert', [self._row(item) for item in chunk])
+                created.extend(self.model(**item) for item in result)
+        finally:
+            self._invalidate()
+        return created
+
+    async def upsert_many(
+        self,
+        items: Sequence[Union[ModelType, Dict[str, Any]]],
+        on_conflict: str = 'id',
+        chunk_size: Optional[int] = None
+    ) -> List[ModelType]:
+        """Insert or update many records, one upsert request per chunk.
+        
+        Args:
+            items: Models or dicts to upsert
+            on_conflict: Unique column(s) deciding whether a row is updated
+            chunk_size: Rows per request (defaults to REPOSITORY_BULK_CHUNK_SIZE)
+            
+        Returns:
+            Inserted or updated model instances
+        """
+        upserted = []
+        try:
+            for chunk in _chunks(items, chunk_size or settings.REPOSITORY_BULK_CHUNK_SIZE):
+                result = await db.execute(
+                    self.table_name,
+                    'upsert',
+                    [self._row(item) for item in chunk],
+                    on_conflict=on_conflict
+                )
+                upserted.extend(self.model(**item) for item in result)
+        finally:
+            self._invalidate()
+        return upserted
+
+    async def update_many(
+        self,
+        data: Dict[str, Any],
+        ids: Optional[Sequence[str]] = None,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        chunk_size: Optional[int] = None
+    ) -> List[ModelType]:
+        """Apply the same update to many records.
+        
+        Records are selected by ID (one request per chunk of IDs), by
+        filters (one request), or by both.
+        
+        Args:
+            data: Data to update
+            ids: Record IDs
+            filters: List of filter dictionaries
+            chunk_size: IDs per request (defaults to REPOSITORY_BULK_CHUNK_SIZE)
+            
+        Returns:
+            Updated model instances
+            
+        Raises:
+            ValueError: If neither ids nor filters are given
+        """
+        updated = []
+        try:
+            for chunk_filters in self._bulk_filters(ids, filters, chunk_size):
+                result = await db.execute(self.table_name, 'update', data=data, filters=chunk_filters)
+                updated.extend(self.model(**item) for item in result)
+        finally:
+            self._invalidate()
+        return updated
+
+    async def delete_many(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        filters: Optional[List[Dict[str, Any]]] = None,
+        chunk_size: Optional[int] = None
+    ) -> int:
+        """Delete many records.
+        
+        Args:
+            ids: Record IDs (one request per chunk)
+            filters: List of filter dictionaries
+            chunk_size: IDs per request (defaults to REPOSITORY_BULK_CHUNK_SIZE)
+            
+        Returns:
+            Number of deleted records
+            
+        Raises:
+            ValueError: If neither ids nor filters are given
+        """
+        deleted = 0
+        try:
+            for chunk_filters in self._bulk_filters(ids, filters, chunk_size):
+                result = await db.execute(self.table_name, 'delete', filters=chunk_filters)
+                deleted += len(result)
+        finally:
+            self._invalidate()
+        return deleted
+
+    def _bulk_filters(
+        self,
+        ids: Optional[Sequence[str]],
+        filters: Optional[List[Dict[str, Any]]],
+        chunk_size: Optional[int]
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Filters of each bulk update/delete request (an empty ID list yields none)."""
+        if ids is None and not filters:
+            # Never update or delete a whole table by accident
+            raise ValueError("ids or filters is required for bulk updates and deletes")
+        if ids is None:
+            yield list(filters)
+            return
+        for chunk in _chunks(list(ids), chunk_size or settings.REPOSITORY_BULK_CHUNK_SIZE):
+            yield [*(filters or []), {'column': 'id', 'operator': 'in', 'value': list(chunk)}]
@@ -0,0 +1,202 @@
+"""
+Entity cache module for read-through caching of repository records.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Returned by EntityCache.get when the key is not cached
+MISS = object()
+
+class EntityCache:
+    """
+    In-memory LRU cache of records keyed by (table, field, value), with
+    per-table TTLs, negative entries and invalidation by record ID.
+
+    The cache is per process: writes through another process are only
+    seen once the entries expire, so TTLs bound the staleness.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttls: Optional[Dict[str, float]] = None,
+        negative_ttl: float = 30.0
+    ):
+        """
+        Initialize the entity cache.
+
+        Args:
+            max_entries: Maximum number of entries kept across all tables
+            ttls: Seconds records of each table stay valid (tables not
+                listed are not cached)
+            negative_ttl: Seconds a lookup that found nothing is remembered
+                (capped by the table's TTL; 0 disables negative entries)
+        """
+        self._max_entries = max_entries
+        self._ttls = dict(ttls or {})
+        self._negative_ttl = negative_ttl
+        # Key -> (expiry, record ID or None for a negative entry, value)
+        self._entries: "OrderedDict[Tuple[str, str, Hashable], Tuple[float, Optional[str], Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "expirations": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def caches(self, table: str) -> bool:
+        """Check whether records of a table are cached."""
+        return self._ttls.get(table, 0) > 0
+
+    def generation(self, table: str) -> int:
+        """
+        Get the write generation of a table.
+
+        Capture it before reading from the database and pass it to set(),
+        so a record read while the table was written is not cached.
+        """
+        with self._lock:
+            return self._generations.get(table, 0)
+
+    def get(self, table: str, field: str, value: Hashable) -> Any:
+        """
+        Look up a record.
+
+        Args:
+            table: Table name
+            field: Column the record was looked up by (e.g. "id", "email")
+            value: Column value
+
+        Returns:
+            The cached record, None for a cached "not found", or MISS
+        """
+        key = (table, field, value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() >= entry[0]:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self._stats["hits" if entry[2] is not None else "negative_hits"] += 1
+            return entry[2]
+
+    def set(
+        self,
+        table: str,
+        field: str,
+        value: Hashable,
+        record: Any,
+        record_id: Optional[str] = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """
+        Store a record, or None to remember that nothing was found.
+
+        Args:
+            table: Table name
+            field: Column the record was looked up by
+            value: Column value
+            record: Record to cache (None for a negative entry)
+            record_id: ID of the record, used to invalidate it
+            generation: Table generation captured before the read; the
+                record is dropped if the table was written since
+        """
+        ttl = self._ttls.get(table, 0)
+        if record is None:
+            ttl = min(ttl, self._negative_ttl)
+        if ttl <= 0:
+            return
+        key = (table, field, value)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(table, 0):
+                return
+            self._entries[key] = (time.monotonic() + ttl, record_id, record)
+            self._entries.move_to_end(key)
+            self._stats["writes"] += 1
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, table: str, record_id: Optional[str] = None) -> int:
+        """
+        Drop cached entries of a table after a write.
+
+        Every entry of the record (under any lookup field) and every
+        negative entry of the table are dropped, since the write may have
+        created a row an earlier lookup did not find.
+
+        Args:
+            table: Table that was written to
+            record_id: Record that changed (None drops the whole table)
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [
+                key for key, entry in self._entries.items()
+                if key[0] == table and (record_id is None or entry[1] in (record_id, None))
+            ]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} cached records of {table}")
+        return len(stale)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Hit/miss/eviction counters, hit ratio and current size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+_default_cache: Optional[EntityCache] = None
+
+def get_entity_cache() -> Optional[EntityCache]:
+    """
+    Get the process-wide entity cache shared by the repositories.
+
+    Returns:
+        The cache built from the ENTITY_CACHE_* settings, or None if disabled
+    """
+    global _default_cache
+    settings = get_settings()
+    if not settings.ENTITY_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = EntityCache(
+            max_entries=settings.ENTITY_CACHE_MAX_ENTRIES,
+            ttls=settings.ENTITY_CACHE_TTLS,
+            negative_ttl=settings.ENTITY_CACHE_NEGATIVE_TTL
+        )
+    return _default_cache
@@ -1,6 +1,6 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
 from datetime import datetime, timedelta
-from models.conversation import Conversation, Message
+from models.conversation import Conversation, ConversationSummary, Message
 from .base import BaseRepository
 
 class ConversationRepository(BaseRepository[Conversation]):
@@ -14,14 +14,16 @@ class ConversationRepository(BaseRepository[Conversation]):
         self,
         user_id: str,
         since: Optional[datetime] = None,
-        limit: int = 50
-    ) -> List[Conversation]:
+        limit: int = 50,
+        with_messages: bool = False
+    ) -> List[Union[ConversationSummary, Conversation]]:
         """Get conversations for a specific user.
         
         Args:
             user_id: User ID
             since: Optional datetime to filter conversations from
             limit: Maximum number of conversations to return
+            with_messages: Fetch full conversations instead of summaries without messages
             
         Returns:
             List of conversations matching the criteria
@@ -38,7 +40,8 @@ class ConversationRepository(BaseRepository[Conversation]):
         return await self.filter(
             filters=filters,
             order_by=[{'column': 'updated_at', 'order': 'desc'}],
-            limit=limit
+            limit=limit,
+            projection=None if with_messages else ConversationSummary
         )
     
     async def add_message(
@@ -1,5 +1,5 @@
-from typing import List, Optional, Dict
-from models.document import Document
+from typing import List, Optional, Dict, Union
+from models.document import Document, DocumentSummary
 from .base import BaseRepository
 
 class DocumentRepository(BaseRepository[Document]):
@@ -12,13 +12,15 @@ class DocumentRepository(BaseRepository[Document]):
     async def get_user_documents(
         self, 
         user_id: str,
-        tags: Optional[List[str]] = None
-    ) -> List[Document]:
+        tags: Optional[List[str]] = None,
+        with_content: bool = False
+    ) -> List[Union[DocumentSummary, Document]]:
         """Get documents for a specific user.
         
         Args:
             user_id: User ID
             tags: Optional list of tags to filter by
+            with_content: Fetch full documents instead of summaries without content
             
         Returns:
             List of documents matching the criteria
@@ -29,7 +31,7 @@ class DocumentRepository(BaseRepository[Document]):
             # Supabase array contains operator
             filters.append({'column': 'tags', 'operator': 'cs', 'value': tags})
             
-        return await self.filter(filters=filters)
+        return await self.filter(filters=filters, projection=None if with_content else DocumentSummary)
     
     async def update_embedding(
         self,
@@ -52,4 +54,16 @@ class DocumentRepository(BaseRepository[Document]):
         if metadata:
             update_data['metadata'] = metadata
             
-        return await self.update(document_id, update_data) 
\ No newline at end of file
+        return await self.update(document_id, update_data) 
+    
+    async def set_tags(self, document_ids: List[str], tags: List[str]) -> List[Document]:
+        """Replace the tags of many documents, one request per chunk of IDs.
+        
+        Args:
+            document_ids: Document IDs
+            tags: New tags for every document
+            
+        Returns:
+            Updated documents that were found
+        """
+        return await self.update_many({'tags': tags}, ids=document_ids)
\ No newline at end of file
@@ -48,4 +48,18 @@ class TaskRepository(BaseRepository[Task]):
         return await self.update(task_id, {
             'status': TaskStatus.COMPLETED,
             'completed_at': datetime.utcnow()
-        }) 
\ No newline at end of file
+        }) 
+    
+    async def mark_completed_many(self, task_ids: List[str]) -> List[Task]:
+        """Mark many tasks as completed, one request per chunk of IDs.
+        
+        Args:
+            task_ids: Task IDs
+            
+        Returns:
+            Updated tasks that were found
+        """
+        return await self.update_many(
+            {'status': TaskStatus.COMPLETED, 'completed_at': datetime.utcnow().isoformat()},
+            ids=task_ids
+        )
\ No newline at end of file
@@ -18,11 +18,14 @@ class UserRepository(BaseRepository[User]):
         Returns:
             User if found, None otherwise
         """
-        result = await self.filter(
-            filters=[{'column': 'email', 'operator': 'eq', 'value': email}],
-            limit=1
-        )
-        return result[0] if result else None
+        async def load() -> Optional[User]:
+            result = await self.filter(
+                filters=[{'column': 'email', 'operator': 'eq', 'value': email}],
+                limit=1
+            )
+            return result[0] if result else None
+
+        return await self._read_through('email', email, load)
     
     async def update_preferences(self, user_id: str, preferences: dict) -> Optional[User]:
         """Update user preferences.
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, UploadFile
+from fastapi import APIRouter, BackgroundTasks, File, UploadFile, status
+from services.uploads import UploadJob
+from routes.contexts import upload_context as upload_context_file
 
 router = APIRouter()
 
-@router.post("/context/upload")
-def upload_context(file: UploadFile):
-    return {"filename": file.filename}
\ No newline at end of file
+@router.post("/context/upload", response_model=UploadJob, status_code=status.HTTP_202_ACCEPTED)
+async def upload_context(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """Legacy upload endpoint; titles the context after the file and defers to /contexts/upload."""
+    return await upload_context_file(background_tasks, title=file.filename or "Untitled", file=file)
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from config.settings import get_settings
+from services.registry import get_service
+from services.uploads import UploadJob, UploadTooLargeError, upload_from_job
+
+settings = get_settings()
 
 router = APIRouter(prefix="/contexts", tags=["Contexts"])
 
@@ -21,21 +26,81 @@ class Context(ContextBase):
     updated_at: datetime
     vector_ids: List[str]
 
-@router.post("/upload", response_model=Context)
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = 5
+    namespace: Optional[str] = None
+    filter: Optional[Dict[str, Any]] = None
+    mode: str = "auto"  # auto, hybrid, lexical or vector
+
+class SearchMatch(BaseModel):
+    id: str
+    score: float
+    metadata: dict = {}
+
+@router.post("/upload", response_model=UploadJob, status_code=status.HTTP_202_ACCEPTED)
 async def upload_context(
+    background_tasks: BackgroundTasks,
     title: str,
     description: Optional[str] = None,
+    namespace: Optional[str] = None,
     file: UploadFile = File(...),
 ):
     """
     Upload a document for RAG context.
-    This is a placeholder that will be implemented with Pinecone and Supabase.
+
+    The file is streamed to a spool file and hashed on the way; parsing,
+    chunking and embedding run on the job queue (or as a background task
+    when the queue is disabled). Poll the returned job at
+    GET /contexts/upload/{job_id} for progress. Re-uploading identical
+    content to the same namespace returns the earlier job with duplicate set.
     """
-    # TODO: Implement actual document upload and processing
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Context upload not yet implemented"
-    )
+    uploads = get_service("upload_manager")
+    try:
+        job = await uploads.accept(file, title, description, namespace)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    finally:
+        await file.close()
+    if job.duplicate:
+        return job
+    if settings.JOB_QUEUE_ENABLED:
+        await get_service("job_queue").enqueue("context_upload", uploads.job_payload(job.id), job_id=job.id)
+    else:
+        background_tasks.add_task(uploads.process, job.id)
+    return job
+
+@router.get("/upload/{job_id}", response_model=UploadJob)
+async def get_upload_status(job_id: str):
+    """Get the processing status and progress of an upload."""
+    job = get_service("upload_manager").get(job_id)
+    if job is None and settings.JOB_QUEUE_ENABLED:
+        queued = await get_service("job_queue").get(job_id)
+        if queued is not None and queued.type == "context_upload":
+            job = upload_from_job(queued)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return job
+
+@router.post("/search", response_model=List[SearchMatch])
+async def search_contexts(request: SearchRequest):
+    """
+    Search uploaded context by text.
+
+    Combines BM25 and vector search; in auto mode, keyword-like queries
+    (ticket IDs, names, quoted phrases) are answered from the lexical index
+    alone when it covers the namespace.
+    """
+    try:
+        return await get_service("hybrid_retriever").search(
+            request.query,
+            top_k=request.top_k,
+            namespace=request.namespace,
+            filter=request.filter,
+            mode=request.mode
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 @router.get("/", response_model=List[Context])
 async def list_contexts():
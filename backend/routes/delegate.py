@@ -1,11 +1,24 @@
-from fastapi import APIRouter
-from supabase import create_client
-from config import API_KEYS
+import uuid
+from fastapi import APIRouter, BackgroundTasks, status
+from config.settings import get_settings
+from services.delegation import record_delegated_task
+from services.registry import get_service
+
+settings = get_settings()
 
-supabase = create_client(API_KEYS["supabase_url"], API_KEYS["supabase_key"])
 router = APIRouter()
 
-@router.post("/delegate")
-def delegate_task(task: str):
-    supabase.table("delegated_tasks").insert({"task": task}).execute()
-    return {"status": "delegated", "task": task}
\ No newline at end of file
+@router.post("/delegate", status_code=status.HTTP_202_ACCEPTED)
+async def delegate_task(background_tasks: BackgroundTasks, task: str, priority: int = 0):
+    """
+    Queue a task for delegation; poll the job for its outcome.
+
+    When the job queue is disabled the task is recorded by a background
+    task instead, and no job is returned.
+    """
+    if settings.JOB_QUEUE_ENABLED:
+        job_id = await get_service("job_queue").enqueue("delegation", {"task": task}, priority=priority)
+        return {"status": "queued", "task": task, "job_id": job_id}
+    task_id = str(uuid.uuid4())
+    background_tasks.add_task(record_delegated_task, task_id, task)
+    return {"status": "accepted", "task": task, "id": task_id, "job_id": None}
\ No newline at end of file
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException, status
+from services.registry import get_service
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.get("/")
+async def get_job_stats():
+    """Get job counts by type and status, and the worker counts."""
+    return await get_service("job_queue").stats()
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Get a background job's status, attempts, result and last error."""
+    job = await get_service("job_queue").get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job.as_dict()
@@ -1,15 +1,27 @@
 """
 Services package for external API and service integrations.
-"""
 
-from .supabase import supabase
-from .pinecone import pinecone
-from .autogen import autogen_service
-from .embeddings import embeddings_service
+Service singletons are built on first access (see services.registry), so
+importing this package does not import heavy client libraries or open
+connections.
+"""
+from typing import Any
+from .registry import get_service, registry
 
 __all__ = [
     'supabase',
     'pinecone',
     'autogen_service',
     'embeddings_service',
-] 
\ No newline at end of file
+    'get_service',
+    'registry',
+]
+
+def __getattr__(name: str) -> Any:
+    """Build a registered service on first attribute access."""
+    if name in ('supabase', 'pinecone', 'autogen_service', 'embeddings_service'):
+        service = get_service(name)
+        # Shadow the submodule of the same name, as the eager imports used to
+        globals()[name] = service
+        return service
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,450 @@
+"""
+Approximate nearest-neighbor (IVF) vector index for large local namespaces.
+"""
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .local_index import LocalVectorIndex, metadata_matches, save_array, save_json
+from .similarity import normalize_rows, top_k as select_top_k
+
+logger = logging.getLogger(__name__)
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    iterations: int = 15,
+    seed: int = 0,
+    chunk_size: int = 65536
+) -> np.ndarray:
+    """
+    Cluster unit vectors by cosine similarity.
+
+    Args:
+        vectors: (n, dimension) unit vectors
+        n_clusters: Number of centroids
+        iterations: Number of Lloyd iterations
+        seed: Random seed for initialization
+        chunk_size: Rows assigned per matrix product (bounds memory)
+
+    Returns:
+        (n_clusters, dimension) unit centroids
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = assign_to_centroids(vectors, centroids, chunk_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = normalize_rows(sums, copy=False)
+
+    return centroids
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Assign each vector to its most similar centroid.
+
+    Args:
+        vectors: (n, dimension) unit vectors
+        centroids: (k, dimension) unit centroids
+        chunk_size: Rows assigned per matrix product
+
+    Returns:
+        (n,) centroid index per vector
+    """
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for i in range(0, len(vectors), chunk_size):
+        assignments[i:i + chunk_size] = np.argmax(vectors[i:i + chunk_size] @ centroids.T, axis=1)
+    return assignments
+
+class _InvertedList:
+    """Contiguous vectors of one cluster with tombstones for deleted rows."""
+
+    def __init__(self, dimension: int, capacity: int = 64):
+        self.matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        self.slots = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.size = 0
+
+    def append(self, slots: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """Append rows, growing geometrically; returns their positions."""
+        needed = self.size + len(slots)
+        if needed > len(self.matrix):
+            capacity = max(needed, len(self.matrix) * 2, 64)
+            matrix = np.zeros((capacity, self.matrix.shape[1]), dtype=np.float32)
+            matrix[:self.size] = self.matrix[:self.size]
+            self.matrix = matrix
+            self.slots = np.resize(self.slots, capacity)
+            self.alive = np.concatenate([self.alive[:self.size], np.zeros(capacity - self.size, dtype=bool)])
+
+        positions = np.arange(self.size, needed)
+        self.matrix[positions] = vectors
+        self.slots[positions] = slots
+        self.alive[positions] = True
+        self.size = needed
+        return positions
+
+class IVFNamespace:
+    """Inverted-file index over one namespace with tombstoned deletes.
+
+    Below min_train_size vectors the namespace is a single list and queries
+    are exact. Once it grows past that it is clustered into nlist lists and
+    queries only scan the nprobe lists nearest to the query. Clusters are
+    retrained when the namespace grows 4x past its last training size, and
+    tombstoned rows are compacted away when they make up half a list.
+
+    Training is split so the index can run the clustering off the event
+    loop: training_snapshot() and apply_training() touch the namespace,
+    fit() only reads the snapshot. Until a fit is applied, queries keep
+    using the current lists (exact search before the first training).
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        dimension: int,
+        nlist: Optional[int] = None,
+        nprobe: int = 16,
+        min_train_size: int = 10000,
+        seed: int = 0
+    ):
+        """
+        Initialize the namespace.
+
+        Args:
+            dimension: Vector dimension
+            nlist: Number of clusters (defaults to sqrt(n) at training time)
+            nprobe: Clusters scanned per query; higher is slower but more accurate
+            min_train_size: Vector count at which clustering starts
+            seed: Random seed for clustering
+        """
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self.lists: List[_InvertedList] = [_InvertedList(dimension)]
+        # Per slot: external ID (None when deleted), metadata and (list, position)
+        self.slot_ids: List[Optional[str]] = []
+        self.slot_metadata: List[Optional[Dict[str, Any]]] = []
+        self.slot_locations: List[Tuple[int, int]] = []
+        self.positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def trained(self) -> bool:
+        """Whether the namespace has been clustered."""
+        return self.centroids is not None
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: List[Dict[str, Any]]) -> None:
+        """Insert or overwrite vectors; vectors must already be normalized."""
+        # Later duplicates of an ID within one call win
+        latest = {vector_id: i for i, vector_id in enumerate(ids)}
+        rows = sorted(latest.values())
+        self.delete([ids[i] for i in rows])
+
+        vectors = vectors[rows]
+        first_slot = len(self.slot_ids)
+        slots = np.arange(first_slot, first_slot + len(rows))
+        for slot, i in zip(slots, rows):
+            self.positions[ids[i]] = int(slot)
+            self.slot_ids.append(ids[i])
+            self.slot_metadata.append(metadata[i])
+            self.slot_locations.append((0, 0))
+
+        self._add_to_lists(slots, vectors)
+
+    @property
+    def needs_training(self) -> bool:
+        """Whether the namespace has grown enough to be (re)clustered."""
+        if not self.trained:
+            return len(self) >= self.min_train_size
+        return len(self) >= 4 * self.trained_size
+
+    def _add_to_lists(
+        self,
+        slots: np.ndarray,
+        vectors: np.ndarray,
+        assignments: Optional[np.ndarray] = None
+    ) -> None:
+        """Append vectors to their nearest (or given) lists and record their locations."""
+        if assignments is None and self.trained:
+            assignments = assign_to_centroids(vectors, self.centroids)
+        elif assignments is None:
+            assignments = np.zeros(len(slots), dtype=np.int64)
+
+        for list_no in np.unique(assignments):
+            members = np.flatnonzero(assignments == list_no)
+            positions = self.lists[list_no].append(slots[members], vectors[members])
+            for slot, position in zip(slots[members], positions):
+                self.slot_locations[slot] = (int(list_no), int(position))
+
+    def delete(self, ids: List[str]) -> int:
+        """Tombstone vectors by ID."""
+        touched = set()
+        deleted = 0
+        for vector_id in ids:
+            slot = self.positions.pop(vector_id, None)
+            if slot is None:
+                continue
+            list_no, position = self.slot_locations[slot]
+            self.lists[list_no].alive[position] = False
+            self.slot_ids[slot] = None
+            self.slot_metadata[slot] = None
+            touched.add(list_no)
+            deleted += 1
+
+        for list_no in touched:
+            inverted = self.lists[list_no]
+            if inverted.size >= 64 and inverted.alive[:inverted.size].sum() * 2 < inverted.size:
+                self._compact_list(list_no)
+        return deleted
+
+    def _compact_list(self, list_no: int) -> None:
+        """Drop tombstoned rows from one list."""
+        old = self.lists[list_no]
+        keep = np.flatnonzero(old.alive[:old.size])
+        fresh = _InvertedList(self.dimension, capacity=max(len(keep), 64))
+        positions = fresh.append(old.slots[keep], old.matrix[keep])
+        for slot, position in zip(old.slots[keep], positions):
+            self.slot_locations[slot] = (list_no, int(position))
+        self.lists[list_no] = fresh
+
+    def _live_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Collect (slots, vectors) of all live rows."""
+        slots, vectors = [], []
+        for inverted in self.lists:
+            keep = np.flatnonzero(inverted.alive[:inverted.size])
+            slots.append(inverted.slots[keep])
+            vectors.append(inverted.matrix[keep])
+        return np.concatenate(slots), np.concatenate(vectors)
+
+    def training_snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Copy the (slots, vectors) of all live rows for fit()."""
+        return self._live_vectors()
+
+    def fit(self, snapshot: Tuple[np.ndarray, np.ndarray]) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Cluster a snapshot without touching the namespace (safe in a worker thread).
+
+        Args:
+            snapshot: (slots, vectors) returned by training_snapshot()
+
+        Returns:
+            Centroids and per-slot assignments, or None for an empty snapshot
+        """
+        slots, vectors = snapshot
+        if not len(slots):
+            return None
+
+        nlist = self.nlist or int(math.sqrt(len(slots)))
+        nlist = max(1, min(nlist, len(slots)))
+        # Cluster a bounded sample; assignment of the rest is a cheap product
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), max(nlist * 64, 20000))
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+        centroids = spherical_kmeans(sample, nlist, seed=self.seed)
+        return {"slots": slots, "centroids": centroids, "assignments": assign_to_centroids(vectors, centroids)}
+
+    def apply_training(self, fitted: Optional[Dict[str, np.ndarray]]) -> None:
+        """
+        Rebuild the inverted lists around centroids returned by fit().
+
+        Slots are never reused, so rows upserted after the snapshot are the
+        live slots it does not contain; only those are assigned here, and
+        rows deleted in the meantime are simply no longer live.
+        """
+        if fitted is None:
+            return
+        slots, vectors = self._live_vectors()
+        known = np.full(len(self.slot_ids), -1, dtype=np.int64)
+        known[fitted["slots"]] = fitted["assignments"]
+        assignments = known[slots]
+        added = assignments < 0
+        if added.any():
+            assignments[added] = assign_to_centroids(vectors[added], fitted["centroids"])
+
+        self.centroids = fitted["centroids"]
+        self.lists = [_InvertedList(self.dimension) for _ in range(len(self.centroids))]
+        self._add_to_lists(slots, vectors, assignments)
+        self.trained_size = len(slots)
+        logger.info(f"Trained IVF index with {len(self.centroids)} lists over {len(slots)} vectors")
+
+    def train(self) -> None:
+        """(Re)cluster all live vectors and rebuild the inverted lists."""
+        self.apply_training(self.fit(self.training_snapshot()))
+
+    def matching_ids(self, filter: Dict[str, Any]) -> List[str]:
+        """IDs whose metadata satisfies a filter."""
+        return [
+            vector_id for vector_id, slot in self.positions.items()
+            if metadata_matches(self.slot_metadata[slot], filter)
+        ]
+
+    def query(
+        self,
+        vector: np.ndarray,
+        top_k: int,
+        filter: Optional[Dict[str, Any]],
+        nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Approximate cosine search over the nprobe nearest lists."""
+        if not len(self):
+            return []
+
+        nprobe = nprobe or self.nprobe
+        while True:
+            if self.trained:
+                probe = select_top_k(self.centroids @ vector, nprobe)[0]
+            else:
+                probe = [0]
+
+            scores, slots = [], []
+            for list_no in probe:
+                inverted = self.lists[list_no]
+                if not inverted.size:
+                    continue
+                list_scores = inverted.matrix[:inverted.size] @ vector
+                mask = inverted.alive[:inverted.size]
+                if filter:
+                    mask = mask & np.fromiter(
+                        (
+                            alive and metadata_matches(self.slot_metadata[slot], filter)
+                            for alive, slot in zip(mask, inverted.slots[:inverted.size])
+                        ),
+                        dtype=bool,
+                        count=inverted.size
+                    )
+                scores.append(list_scores[mask])
+                slots.append(inverted.slots[:inverted.size][mask])
+
+            found = sum(len(s) for s in scores)
+            # Filters can empty the probed lists; widen the search until enough match
+            if found >= top_k or not self.trained or nprobe >= len(self.lists):
+                break
+            nprobe *= 2
+
+        if not found:
+            return []
+        indices, best = select_top_k(np.concatenate(scores), top_k)
+        candidate_slots = np.concatenate(slots)[indices]
+        return [
+            {
+                "id": self.slot_ids[slot],
+                "score": float(score),
+                "metadata": self.slot_metadata[slot],
+            }
+            for slot, score in zip(candidate_slots, best)
+        ]
+
+    def save(self, directory: str) -> None:
+        """Write the namespace to a directory, dropping tombstoned rows."""
+        vectors, offsets, ids, metadata = [], [0], [], []
+        for inverted in self.lists:
+            keep = np.flatnonzero(inverted.alive[:inverted.size])
+            vectors.append(inverted.matrix[keep])
+            offsets.append(offsets[-1] + len(keep))
+            for slot in inverted.slots[keep]:
+                ids.append(self.slot_ids[slot])
+                metadata.append(self.slot_metadata[slot])
+
+        # The lists may be views into a vectors.npy mapped from this directory
+        save_array(os.path.join(directory, "vectors.npy"), np.concatenate(vectors))
+        save_array(os.path.join(directory, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        if self.trained:
+            save_array(os.path.join(directory, "centroids.npy"), self.centroids)
+        save_json(
+            os.path.join(directory, "records.json"),
+            {"ids": ids, "metadata": metadata, "trained_size": self.trained_size}
+        )
+
+    @classmethod
+    def load(cls, directory: str, dimension: int, **options: Any) -> "IVFNamespace":
+        """Read a namespace written by save(), memory-mapping its vectors."""
+        space = cls(dimension, **options)
+        with open(os.path.join(directory, "records.json")) as f:
+            records = json.load(f)
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="c")
+        offsets = np.load(os.path.join(directory, "offsets.npy"))
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if os.path.exists(centroids_path):
+            space.centroids = np.load(centroids_path)
+            space.trained_size = records["trained_size"]
+
+        space.slot_ids = records["ids"]
+        space.slot_metadata = records["metadata"]
+        space.positions = {vector_id: slot for slot, vector_id in enumerate(space.slot_ids)}
+        space.slot_locations = [(0, 0)] * len(space.slot_ids)
+        space.lists = []
+        for list_no, (start, end) in enumerate(zip(offsets[:-1], offsets[1:])):
+            inverted = _InvertedList(dimension, capacity=0)
+            # Views into the memory-mapped file; appends copy into fresh arrays
+            inverted.matrix = vectors[start:end]
+            inverted.slots = np.arange(start, end, dtype=np.int64)
+            inverted.alive = np.ones(end - start, dtype=bool)
+            inverted.size = int(end - start)
+            space.lists.append(inverted)
+            for position in range(inverted.size):
+                space.slot_locations[start + position] = (list_no, position)
+        return space
+
+class ANNVectorIndex(LocalVectorIndex):
+    """Local vector index whose namespaces use approximate IVF search."""
+
+    _namespace_class = IVFNamespace
+
+    def __init__(
+        self,
+        dimension: int = 1536,
+        path: Optional[str] = None,
+        nlist: Optional[int] = None,
+        nprobe: int = 16,
+        min_train_size: int = 10000,
+        seed: int = 0
+    ):
+        """
+        Initialize the ANN index.
+
+        Args:
+            dimension: Vector dimension
+            path: Directory to load from and save to (optional)
+            nlist: Clusters per namespace (defaults to sqrt(n))
+            nprobe: Clusters scanned per query (recall/speed tradeoff)
+            min_train_size: Namespace size at which clustering starts
+            seed: Random seed for clustering
+        """
+        super().__init__(
+            dimension,
+            path,
+            nlist=nlist,
+            nprobe=nprobe,
+            min_train_size=min_train_size,
+            seed=seed
+        )
+
+    def set_nprobe(self, nprobe: int) -> None:
+        """
+        Change how many clusters each query scans, for every namespace.
+
+        Args:
+            nprobe: Clusters scanned per query
+        """
+        self._namespace_options["nprobe"] = nprobe
+        for space in self._namespaces.values():
+            space.nprobe = nprobe
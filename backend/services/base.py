@@ -38,7 +38,7 @@ class BaseService(Generic[ModelType]):
         Returns:
             Model instance if found, None otherwise
         """
-        return await self.repository.get(id)
+        return await self.repository.get_by_id(id)
     
     async def update(self, id: str, data: Dict[str, Any]) -> Optional[ModelType]:
         """Update a record.
@@ -0,0 +1,38 @@
+"""
+Delegation module for recording delegated tasks from the job queue.
+"""
+import logging
+from typing import TYPE_CHECKING, Any, Dict
+
+if TYPE_CHECKING:
+    from .jobs import Job
+
+logger = logging.getLogger(__name__)
+
+async def record_delegated_task(task_id: str, task: str) -> None:
+    """
+    Upsert a delegated_tasks row, so recording the same ID twice is harmless.
+
+    Args:
+        task_id: Row ID (the job ID when run from the queue)
+        task: Task text
+    """
+    from .registry import get_service
+    await get_service("supabase").upsert("delegated_tasks", {"id": task_id, "task": task})
+
+async def run_delegation_job(job: "Job") -> Dict[str, Any]:
+    """
+    Job queue handler recording a delegated task (job type "delegation").
+
+    The row is upserted under the job ID, so a retried job never records
+    the task twice.
+
+    Args:
+        job: Job with the task text under payload["task"]
+
+    Returns:
+        ID of the delegated_tasks row
+    """
+    await record_delegated_task(job.id, job.payload["task"])
+    logger.info(f"Recorded delegated task from job {job.id}")
+    return {"id": job.id}
@@ -0,0 +1,156 @@
+"""
+Batch packing, long-text windowing and pooling helpers for embeddings.
+"""
+import logging
+import math
+from typing import Any, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Conservative characters-per-token ratio used when tiktoken is unavailable
+CHARS_PER_TOKEN = 3
+
+POOLING_STRATEGIES = ("mean", "max", "first")
+
+class TokenCounter:
+    """Counts and slices tokens with tiktoken, falling back to a character estimate."""
+
+    def __init__(self, model: str):
+        """
+        Initialize the token counter.
+
+        Args:
+            model: Embedding model name used to pick the tokenizer
+        """
+        self._model = model
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def encoding(self) -> Optional[Any]:
+        """Get the tiktoken encoding, or None if tiktoken is unavailable."""
+        if not self._loaded:
+            self._loaded = True
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self._model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # tiktoken is optional and may need to download its vocabulary
+                logger.warning(f"tiktoken unavailable, estimating token counts: {str(e)}")
+                self._encoding = None
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a text.
+
+        Args:
+            text: Text to measure
+
+        Returns:
+            Exact token count with tiktoken, otherwise a conservative estimate
+        """
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+    def split(self, text: str, max_tokens: int, overlap: int = 0) -> List[Tuple[str, int]]:
+        """
+        Split a text into overlapping windows of at most max_tokens tokens.
+
+        Args:
+            text: Text to split
+            max_tokens: Maximum tokens per window
+            overlap: Tokens shared between consecutive windows
+
+        Returns:
+            List of (window text, token count) tuples
+        """
+        overlap = min(overlap, max_tokens // 2)
+        step = max_tokens - overlap
+
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return [
+                (self.encoding.decode(tokens[i:i + max_tokens]), len(tokens[i:i + max_tokens]))
+                for i in range(0, max(len(tokens) - overlap, 1), step)
+            ]
+
+        window_chars = max_tokens * CHARS_PER_TOKEN
+        step_chars = step * CHARS_PER_TOKEN
+        windows = []
+        for i in range(0, max(len(text) - overlap * CHARS_PER_TOKEN, 1), step_chars):
+            window = text[i:i + window_chars]
+            windows.append((window, self.count(window)))
+        return windows
+
+def pack_batches(
+    items: Sequence[Tuple[Hashable, int]],
+    max_tokens: int,
+    max_inputs: int
+) -> List[List[Hashable]]:
+    """
+    Greedily pack items into request batches, preserving order.
+
+    A batch is closed when adding the next item would exceed either the
+    token budget or the input count limit. Items are assumed to fit into a
+    single request on their own.
+
+    Args:
+        items: (item id, token count) pairs
+        max_tokens: Token budget per request
+        max_inputs: Maximum number of inputs per request
+
+    Returns:
+        List of batches of item ids
+    """
+    batches: List[List[Hashable]] = []
+    current: List[Hashable] = []
+    current_tokens = 0
+
+    for item_id, tokens in items:
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item_id)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+def pool_embeddings(
+    vectors: Sequence[Sequence[float]],
+    weights: Optional[Sequence[float]] = None,
+    strategy: str = "mean"
+) -> np.ndarray:
+    """
+    Pool the embeddings of a text's windows into a single vector.
+
+    Args:
+        vectors: Window embeddings in text order
+        weights: Per-window weights for mean pooling (e.g. token counts)
+        strategy: "mean" (weighted average), "max" (element-wise max) or "first"
+
+    Returns:
+        Unit-length pooled float32 embedding
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+
+    if strategy == "mean":
+        pooled = np.average(matrix, axis=0, weights=weights)
+    elif strategy == "max":
+        pooled = matrix.max(axis=0)
+    elif strategy == "first":
+        pooled = matrix[0]
+    else:
+        raise ValueError(f"Unsupported pooling strategy: {strategy}")
+
+    norm = np.linalg.norm(pooled)
+    if norm > 0:
+        pooled = pooled / norm
+    return pooled.astype(np.float32)
@@ -0,0 +1,289 @@
+"""
+Embedding cache module for reusing previously generated embeddings.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """Two-tier (in-memory LRU + on-disk SQLite) content-addressed embedding cache.
+
+    Lookups and writes are coroutines: the memory tier is served on the
+    event loop, while SQLite reads and writes run in worker threads, one at
+    a time, under a lock separate from the one guarding the LRU.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        path: Optional[str] = None,
+        max_disk_entries: int = 500000
+    ):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            max_entries: Maximum number of vectors kept in the in-memory LRU
+            path: Directory for the on-disk store (memory only if None)
+            max_disk_entries: Maximum number of vectors kept on disk
+        """
+        self._max_entries = max_entries
+        self._max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes use of the SQLite connection, which runs in worker threads
+        self._disk_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        # Rows in the disk store, kept up to date instead of counted per write
+        self._disk_entries = 0
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+        }
+
+        if path:
+            self._open_disk_store(path)
+
+    def _open_disk_store(self, path: str) -> None:
+        """Open (and create if needed) the SQLite store under the given directory."""
+        try:
+            os.makedirs(path, exist_ok=True)
+            self._db = sqlite3.connect(
+                os.path.join(path, "embeddings.sqlite3"),
+                check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, "
+                "vector BLOB NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_accessed_at "
+                "ON embeddings (accessed_at)"
+            )
+            self._db.commit()
+            self._disk_entries = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            logger.info(f"Embedding cache disk store opened at: {path}")
+        except sqlite3.Error as e:
+            # The disk tier is an optimization; fall back to memory only
+            logger.warning(f"Embedding cache disk store unavailable, using memory only: {str(e)}")
+            self._db = None
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        Normalize text so that trivially different inputs share a cache entry.
+
+        Args:
+            text: Raw input text
+
+        Returns:
+            Unicode-normalized text with collapsed whitespace
+        """
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @classmethod
+    def make_key(cls, model: str, dimension: int, text: str, variant: Optional[str] = None) -> str:
+        """
+        Build the cache key for a text.
+
+        Args:
+            model: Embedding model name
+            dimension: Embedding dimension
+            text: Input text (normalized before hashing)
+            variant: Optional qualifier for vectors derived differently (e.g. pooled)
+
+        Returns:
+            Hex digest identifying (model, dimension, normalized text)
+        """
+        digest = hashlib.sha256(cls.normalize_text(text).encode("utf-8")).hexdigest()
+        if variant:
+            return f"{model}:{dimension}:{variant}:{digest}"
+        return f"{model}:{dimension}:{digest}"
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up several keys, promoting disk hits into memory.
+
+        Args:
+            keys: Cache keys to look up
+
+        Returns:
+            Mapping of found keys to float32 vectors
+        """
+        found: Dict[str, np.ndarray] = {}
+        disk_lookups: List[str] = []
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+                    self._stats["memory_hits"] += 1
+                else:
+                    disk_lookups.append(key)
+
+        disk_hits: List[Tuple[str, np.ndarray]] = []
+        if disk_lookups and self._db is not None:
+            disk_hits = await asyncio.to_thread(self._read_disk, disk_lookups)
+
+        with self._lock:
+            for key, vector in disk_hits:
+                found[key] = vector
+                self._remember(key, vector)
+            self._stats["disk_hits"] += len(disk_hits)
+            self._stats["hits"] = self._stats["memory_hits"] + self._stats["disk_hits"]
+            self._stats["misses"] += len(disk_lookups) - len(disk_hits)
+
+        return found
+
+    async def get(self, key: str) -> Optional[np.ndarray]:
+        """Look up a single key."""
+        return (await self.get_many([key])).get(key)
+
+    async def set_many(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        """
+        Store several vectors in both tiers.
+
+        Args:
+            items: (key, vector) pairs to store
+        """
+        rows = []
+        now = time.time()
+
+        with self._lock:
+            for key, vector in items:
+                # Copy so cached rows never pin (or alias) a caller's larger matrix
+                vector = np.array(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes(), now))
+            self._stats["writes"] += len(rows)
+
+        if rows and self._db is not None:
+            await asyncio.to_thread(self._write_disk, rows)
+
+    async def set(self, key: str, vector: np.ndarray) -> None:
+        """Store a single vector."""
+        await self.set_many([(key, vector)])
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Insert into the in-memory LRU, evicting the least recently used entries."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _read_disk(self, keys: List[str]) -> List[Tuple[str, np.ndarray]]:
+        """Read vectors from the disk tier and refresh their access time (in a worker thread)."""
+        results = []
+        with self._disk_lock:
+            if self._db is None:
+                return results
+            try:
+                # SQLite limits the number of bound parameters per statement
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        chunk
+                    ).fetchall()
+                    results.extend(
+                        (key, np.frombuffer(blob, dtype=np.float32).copy()) for key, blob in rows
+                    )
+
+                if results:
+                    now = time.time()
+                    self._db.executemany(
+                        "UPDATE embeddings SET accessed_at = ? WHERE key = ?",
+                        [(now, key) for key, _ in results]
+                    )
+                    self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache disk read failed: {str(e)}")
+        return results
+
+    def _write_disk(self, rows: List[Tuple[str, bytes, float]]) -> None:
+        """Write vectors to the disk tier and enforce the disk size cap (in a worker thread)."""
+        with self._disk_lock:
+            if self._db is None:
+                return
+            try:
+                # New keys are counted from the insert; existing ones are then overwritten
+                inserted = self._db.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                    rows
+                ).rowcount
+                if inserted < len(rows):
+                    self._db.executemany(
+                        "UPDATE embeddings SET vector = ?, accessed_at = ? WHERE key = ?",
+                        [(vector, accessed_at, key) for key, vector, accessed_at in rows]
+                    )
+                evicted = 0
+                overflow = self._disk_entries + inserted - self._max_disk_entries
+                if overflow > 0:
+                    evicted = self._db.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        "SELECT key FROM embeddings ORDER BY accessed_at ASC LIMIT ?)",
+                        (overflow,)
+                    ).rowcount
+                self._db.commit()
+                self._disk_entries += inserted - evicted
+                with self._lock:
+                    self._stats["disk_evictions"] += evicted
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning(f"Embedding cache disk write failed: {str(e)}")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Hit/miss/eviction counters, hit ratio and current sizes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        if self._db is not None:
+            stats["disk_entries"] = self._disk_entries
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Remove all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        with self._disk_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+                self._disk_entries = 0
+
+    def close(self) -> None:
+        """Close the disk store, waiting for any read or write in progress."""
+        with self._disk_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Request coalescing module for batching concurrent single-text embedding calls.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from .embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+EmbedFunction = Callable[[List[str], Optional[str]], Awaitable[List[List[float]]]]
+
+class EmbeddingCoalescer:
+    """Collects concurrent single-text embedding requests into batched calls."""
+
+    def __init__(self, embed_fn: EmbedFunction, window_ms: float = 5.0, max_batch_size: int = 64):
+        """
+        Initialize the coalescer.
+
+        Args:
+            embed_fn: Batched embedding function, called as embed_fn(texts, model)
+            window_ms: How long to collect requests before sending a batch
+            max_batch_size: Send a batch immediately once it has this many texts
+        """
+        self._embed_fn = embed_fn
+        self._window = window_ms / 1000
+        self._max_batch_size = max_batch_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Per model: texts collected for the next batch, and texts already sent
+        self._pending: Dict[Optional[str], Dict[str, asyncio.Future]] = {}
+        self._in_flight: Dict[Optional[str], Dict[str, asyncio.Future]] = {}
+        self._timers: Dict[Optional[str], asyncio.TimerHandle] = {}
+        # Running batch tasks; the loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {"requests": 0, "deduplicated": 0, "batches": 0, "batched_texts": 0}
+
+    async def embed(self, text: str, model: Optional[str] = None) -> List[float]:
+        """
+        Embed a single text as part of a coalesced batch.
+
+        Args:
+            text: Text string to embed
+            model: OpenAI embedding model to use (optional)
+
+        Returns:
+            Embedding vector
+        """
+        self._bind_loop()
+        self._stats["requests"] += 1
+        key = EmbeddingCache.normalize_text(text)
+
+        pending = self._pending.setdefault(model, {})
+        future = pending.get(key) or self._in_flight.get(model, {}).get(key)
+        if future is not None:
+            # Identical text already queued or in flight: share its result
+            self._stats["deduplicated"] += 1
+        else:
+            future = self._loop.create_future()
+            pending[key] = future
+            if len(pending) >= self._max_batch_size:
+                self._flush(model)
+            elif model not in self._timers:
+                self._timers[model] = self._loop.call_later(self._window, self._flush, model)
+
+        # Shield so one cancelled caller doesn't cancel the result for the others
+        return await asyncio.shield(future)
+
+    def _bind_loop(self) -> None:
+        """Reset state when used from a different event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = {}
+            self._in_flight = {}
+            self._timers = {}
+            self._tasks = set()
+
+    def _flush(self, model: Optional[str]) -> None:
+        """Send the texts collected for a model as one batch."""
+        timer = self._timers.pop(model, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(model, {})
+        if not batch:
+            return
+
+        self._in_flight.setdefault(model, {}).update(batch)
+        self._stats["batches"] += 1
+        self._stats["batched_texts"] += len(batch)
+        task = self._loop.create_task(self._run_batch(model, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, model: Optional[str], batch: Dict[str, asyncio.Future]) -> None:
+        """Embed a batch and resolve each caller's future."""
+        texts = list(batch.keys())
+        try:
+            embeddings = await self._embed_fn(texts, model)
+            for text, embedding in zip(texts, embeddings):
+                if not batch[text].done():
+                    batch[text].set_result(embedding)
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Error embedding coalesced batch of {len(texts)} texts: {str(e)}")
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            in_flight = self._in_flight.get(model, {})
+            for text, future in batch.items():
+                if in_flight.get(text) is future:
+                    del in_flight[text]
+                # Mark exceptions as retrieved when every caller has gone away
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+    async def close(self) -> None:
+        """Cancel collected and in-flight batches and wait for their tasks to finish."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers = {}
+        for pending in self._pending.values():
+            for future in pending.values():
+                future.cancel()
+        self._pending = {}
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing statistics.
+
+        Returns:
+            Request, deduplication and batch counters with the average batch size
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["average_batch_size"] = (
+            stats["batched_texts"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
@@ -1,107 +1,370 @@
 """
 Embeddings service module for generating vector embeddings from text.
 """
+import asyncio
 import logging
-import time
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+import numpy as np
 import openai
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from config.settings import get_settings
+from .embedding_cache import EmbeddingCache
+from .embedding_batching import POOLING_STRATEGIES, TokenCounter, pack_batches, pool_embeddings
+from .embedding_coalescer import EmbeddingCoalescer
+from .resilience import CircuitBreaker, retry_async
+from .similarity import MatrixLike, SimilarityIndex, VectorLike, cosine_scores, pairwise_similarity
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Errors worth retrying: the request may succeed later (other API errors will not)
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
 class EmbeddingsService:
     """Service for generating text embeddings using OpenAI."""
     
-    def __init__(self):
-        """Initialize the embeddings service."""
-        self._client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        """
+        Initialize the embeddings service.
+        
+        Args:
+            cache: Embedding cache to use (built from settings if None)
+        """
+        self._client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self._model = "text-embedding-3-small"  # Default model, can be configured
-        self._max_tokens = 8000  # text-embedding-3-small max tokens
+        self._max_tokens = settings.EMBEDDING_MAX_INPUT_TOKENS  # text-embedding-3-small accepts 8191
         self._dimension = 1536  # Default embedding dimension
+        self._batch_size = settings.EMBEDDING_BATCH_SIZE
+        self._max_request_tokens = settings.EMBEDDING_MAX_TOKENS_PER_REQUEST
+        self._max_concurrency = settings.EMBEDDING_MAX_CONCURRENCY
+        self._window_overlap = settings.EMBEDDING_WINDOW_OVERLAP
+        self._pooling = settings.EMBEDDING_POOLING
+        self._token_counters: Dict[str, TokenCounter] = {}
+        if self._pooling not in POOLING_STRATEGIES:
+            raise ValueError(f"Unsupported pooling strategy: {self._pooling}")
+        self._cache = cache if cache is not None else self._build_cache()
+        self._breaker = CircuitBreaker(
+            "openai-embeddings",
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+        )
+        self._coalescer = (
+            EmbeddingCoalescer(
+                self.get_embeddings,
+                window_ms=settings.EMBEDDING_COALESCE_WINDOW_MS,
+                max_batch_size=settings.EMBEDDING_COALESCE_MAX_BATCH
+            )
+            if settings.EMBEDDING_COALESCE_WINDOW_MS > 0 else None
+        )
         logger.info(f"Embeddings service initialized with model: {self._model}")
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-        retry=retry_if_exception_type((openai.APIError, openai.APIConnectionError))
-    )
+    @staticmethod
+    def _build_cache() -> Optional[EmbeddingCache]:
+        """Create the embedding cache configured in settings."""
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return None
+        return EmbeddingCache(
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            path=settings.EMBEDDING_CACHE_DIR,
+            max_disk_entries=settings.EMBEDDING_CACHE_MAX_DISK_ENTRIES
+        )
+    
     async def get_embeddings(
         self, 
         texts: List[str],
-        model: Optional[str] = None
-    ) -> List[List[float]]:
+        model: Optional[str] = None,
+        as_array: bool = False
+    ) -> Union[List[List[float]], np.ndarray]:
         """
         Generate embeddings for a list of texts.
         
+        Texts already in the embedding cache are served from it; only cache
+        misses are sent to the API, with several batches in flight at once.
+        Results are returned in input order.
+        
         Args:
             texts: List of text strings to embed
             model: OpenAI embedding model to use (optional)
+            as_array: Return a contiguous float32 matrix of shape
+                      (len(texts), dimension) instead of nested lists
         
         Returns:
-            List of embedding vectors
+            List of embedding vectors, or a float32 matrix if as_array is set
         """
         try:
-            # Use batch processing for efficiency
-            model_name = model or self._model
-            embeddings = []
-            
-            # Process in batches to avoid rate limits
-            batch_size = 100  # Adjust based on usage
+            # Rows for empty strings stay zero in the preallocated matrix
+            matrix = np.zeros((len(texts), self._dimension), dtype=np.float32)
+            async for _ in self._stream_rows(texts, model, out=matrix):
+                pass
             
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                
-                # Check for empty or whitespace-only strings
-                valid_batch = [text for text in batch if text and text.strip()]
-                
-                if not valid_batch:
-                    # Handle empty batch
-                    embeddings.extend([[0.0] * self._dimension] * len(batch))
-                    continue
-                
-                response = self._client.embeddings.create(
-                    model=model_name,
-                    input=valid_batch,
-                    encoding_format="float"
+            logger.info(f"Generated {len(texts)} embeddings successfully")
+            return matrix if as_array else matrix.tolist()
+        
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {str(e)}")
+            raise
+    
+    async def stream_embeddings(
+        self,
+        texts: List[str],
+        model: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        as_array: bool = False
+    ) -> AsyncIterator[Tuple[int, Union[List[List[float]], np.ndarray]]]:
+        """
+        Generate embeddings and yield them in input order as batches finish.
+        
+        Cache misses are embedded concurrently (bounded by
+        EMBEDDING_MAX_CONCURRENCY). Each consecutive slice of the input is
+        yielded as soon as all of its embeddings are available, so callers
+        can start upserting before the whole corpus is embedded.
+        
+        Args:
+            texts: List of text strings to embed
+            model: OpenAI embedding model to use (optional)
+            chunk_size: Number of embeddings per yielded slice (defaults to the batch size)
+            as_array: Yield float32 matrices instead of nested lists
+        
+        Yields:
+            (offset, embeddings) tuples covering texts[offset:offset + len(embeddings)]
+        """
+        async for offset, rows in self._stream_rows(texts, model, chunk_size):
+            yield offset, rows if as_array else rows.tolist()
+    
+    async def _stream_rows(
+        self,
+        texts: List[str],
+        model: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        out: Optional[np.ndarray] = None
+    ) -> AsyncIterator[Tuple[int, np.ndarray]]:
+        """
+        Generate embeddings as float32 row blocks in input order.
+        
+        Args:
+            texts: List of text strings to embed
+            model: OpenAI embedding model to use (optional)
+            chunk_size: Number of rows per yielded block (defaults to the batch size)
+            out: Zero-initialized (len(texts), dimension) matrix to fill in
+                 place; yielded blocks are views into it
+        
+        Yields:
+            (offset, rows) tuples covering texts[offset:offset + len(rows)]
+        """
+        model_name = model or self._model
+        chunk_size = chunk_size or self._batch_size
+        counter = self._get_token_counter(model_name)
+        
+        # Map each non-empty input to its cache key; empty strings get zero vectors.
+        # Pooled vectors of oversized inputs depend on the pooling strategy.
+        keys: List[Optional[str]] = [
+            EmbeddingCache.make_key(
+                model_name,
+                self._dimension,
+                text,
+                variant=self._pooling if self._is_oversized(text, counter) else None
+            )
+            if text and text.strip() else None
+            for text in texts
+        ]
+        
+        vectors: Dict[str, np.ndarray] = {}
+        if self._cache is not None:
+            vectors = await self._cache.get_many(key for key in keys if key)
+        
+        # Unique texts that still need to be embedded, in order of first appearance
+        misses: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key and key not in vectors and key not in misses:
+                misses[key] = EmbeddingCache.normalize_text(text)
+        
+        # Split oversized texts into windows; each window is one API input
+        windows: List[Tuple[str, str, int]] = []  # (cache key, window text, tokens)
+        windows_of: Dict[str, List[int]] = {}
+        for key, text in misses.items():
+            tokens = counter.count(text)
+            parts = (
+                counter.split(text, self._max_tokens, self._window_overlap)
+                if tokens > self._max_tokens else [(text, tokens)]
+            )
+            windows_of[key] = list(range(len(windows), len(windows) + len(parts)))
+            windows.extend((key, part, part_tokens) for part, part_tokens in parts)
+        
+        batches = pack_batches(
+            [(i, window[2]) for i, window in enumerate(windows)],
+            max_tokens=self._max_request_tokens,
+            max_inputs=self._batch_size
+        )
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        
+        async def run_batch(batch: List[int]) -> Tuple[List[int], np.ndarray]:
+            async with semaphore:
+                batch_embeddings = await self._create_embeddings(
+                    [windows[i][1] for i in batch],
+                    model_name
                 )
-                
-                # Verify response format
-                if not hasattr(response, "data"):
-                    raise ValueError(f"Unexpected response format: {response}")
-                
-                # Extract embeddings from response
-                batch_embeddings = [item.embedding for item in response.data]
-                
-                # Re-align with original batch if there were empty strings
-                aligned_embeddings = []
-                valid_idx = 0
-                for text in batch:
-                    if text and text.strip():
-                        aligned_embeddings.append(batch_embeddings[valid_idx])
-                        valid_idx += 1
+            return batch, batch_embeddings
+        
+        pending = {asyncio.create_task(run_batch(batch)) for batch in batches}
+        if pending:
+            logger.info(
+                f"Embedding {len(misses)} uncached texts ({len(windows)} inputs) in "
+                f"{len(pending)} requests ({len(texts) - len(misses)} inputs served from cache or empty)"
+            )
+        
+        window_vectors: Dict[int, np.ndarray] = {}
+        offset = 0
+        failures: List[BaseException] = []
+        try:
+            while True:
+                # Emit every consecutive slice whose embeddings are all available
+                while not failures and offset < len(keys):
+                    slice_keys = keys[offset:offset + chunk_size]
+                    if any(key and key not in vectors for key in slice_keys):
+                        break
+                    if out is not None:
+                        rows = out[offset:offset + len(slice_keys)]
                     else:
-                        # Use zero vector for empty strings
-                        aligned_embeddings.append([0.0] * self._dimension)
+                        rows = np.zeros((len(slice_keys), self._dimension), dtype=np.float32)
+                    for row, key in enumerate(slice_keys):
+                        if key:
+                            rows[row] = vectors[key]
+                    yield offset, rows
+                    offset += len(slice_keys)
                 
-                embeddings.extend(aligned_embeddings)
+                if not pending:
+                    break
                 
-                # Respect rate limits
-                if i + batch_size < len(texts):
-                    time.sleep(0.5)
-            
-            logger.info(f"Generated {len(embeddings)} embeddings successfully")
-            return embeddings
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                completed: Dict[str, np.ndarray] = {}
+                for task in done:
+                    # A failed batch doesn't stop the others: their results are still cached
+                    if task.exception() is not None:
+                        failures.append(task.exception())
+                        continue
+                    batch, batch_embeddings = task.result()
+                    window_vectors.update(zip(batch, batch_embeddings))
+                    for key in dict.fromkeys(windows[i][0] for i in batch):
+                        if key in vectors or not all(i in window_vectors for i in windows_of[key]):
+                            continue
+                        completed[key] = self._combine_windows(
+                            [window_vectors.pop(i) for i in windows_of[key]],
+                            [windows[i][2] for i in windows_of[key]]
+                        )
+                
+                vectors.update(completed)
+                # Cache results as they complete so a later failure keeps finished work
+                if completed and self._cache is not None:
+                    await self._cache.set_many(completed.items())
+        finally:
+            for task in pending:
+                task.cancel()
         
-        except Exception as e:
-            logger.error(f"Error generating embeddings: {str(e)}")
-            raise
+        if failures:
+            logger.error(
+                f"{len(failures)} of {len(batches)} embedding requests failed; "
+                f"results of the others were kept"
+            )
+            raise failures[0]
+    
+    def _get_token_counter(self, model_name: str) -> TokenCounter:
+        """Get the (lazily created) token counter for a model."""
+        if model_name not in self._token_counters:
+            self._token_counters[model_name] = TokenCounter(model_name)
+        return self._token_counters[model_name]
+    
+    def _is_oversized(self, text: str, counter: TokenCounter) -> bool:
+        """Check whether a text exceeds the per-input token limit."""
+        # Every token covers at least one UTF-8 byte, so short texts skip tokenization
+        if not text or len(text.encode("utf-8")) <= self._max_tokens:
+            return False
+        return counter.count(EmbeddingCache.normalize_text(text)) > self._max_tokens
+    
+    def _combine_windows(self, vectors: List[np.ndarray], tokens: List[int]) -> np.ndarray:
+        """Pool the window embeddings of one input into a single vector."""
+        if len(vectors) == 1:
+            return vectors[0]
+        return pool_embeddings(vectors, weights=tokens, strategy=self._pooling)
+    
+    async def _create_embeddings(self, batch: List[str], model_name: str) -> np.ndarray:
+        """
+        Embed a single batch of texts with the OpenAI API.
+        
+        Transient errors are retried for this batch only, with jittered
+        backoff; while the API keeps failing the circuit breaker opens and
+        further batches fail fast.
+        
+        Args:
+            batch: Non-empty texts to embed
+            model_name: OpenAI embedding model to use
+        
+        Returns:
+            float32 matrix of embedding vectors in batch order
+        """
+        response = await retry_async(
+            lambda: self._client.embeddings.create(
+                model=model_name,
+                input=batch,
+                encoding_format="float"
+            ),
+            attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay=settings.RETRY_BASE_DELAY,
+            max_delay=settings.RETRY_MAX_DELAY,
+            retry_on=TRANSIENT_ERRORS,
+            breaker=self._breaker,
+            description=f"embeddings request of {len(batch)} inputs"
+        )
+        
+        # Verify response format
+        if not hasattr(response, "data"):
+            raise ValueError(f"Unexpected response format: {response}")
+        
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get embedding cache statistics.
+        
+        Returns:
+            Cache hit/miss/eviction counters, or {"enabled": False}
+        """
+        if self._cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._cache.stats()}
+    
+    def coalescer_stats(self) -> Dict[str, Any]:
+        """
+        Get request coalescing statistics for get_embedding.
+        
+        Returns:
+            Request/deduplication/batch counters, or {"enabled": False}
+        """
+        if self._coalescer is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._coalescer.stats()}
+    
+    def circuit_breaker_stats(self) -> Dict[str, Any]:
+        """
+        Get circuit breaker statistics for the embeddings API.
+        
+        Returns:
+            Breaker state, consecutive failures and call counters
+        """
+        return self._breaker.stats()
+    
+    async def close(self) -> None:
+        """Cancel coalesced batches still running and close the embedding cache's disk store."""
+        if self._coalescer is not None:
+            await self._coalescer.close()
+        if self._cache is not None:
+            self._cache.close()
     
     async def get_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
         """
         Generate embedding for a single text.
         
+        Concurrent calls are coalesced into batched requests (see
+        EMBEDDING_COALESCE_WINDOW_MS).
+        
         Args:
             text: Text string to embed
             model: OpenAI embedding model to use (optional)
@@ -113,6 +376,9 @@ class EmbeddingsService:
         if not text or not text.strip():
             return [0.0] * self._dimension
         
+        if self._coalescer is not None:
+            return await self._coalescer.embed(text, model)
+        
         results = await self.get_embeddings([text], model)
         return results[0]
     
@@ -128,71 +394,119 @@ class EmbeddingsService:
             Cosine similarity score (0-1)
         """
         try:
-            import numpy as np
-            
-            embeddings = await self.get_embeddings([text1, text2])
-            vec1 = np.array(embeddings[0])
-            vec2 = np.array(embeddings[1])
-            
-            # Compute cosine similarity
-            dot_product = np.dot(vec1, vec2)
-            norm1 = np.linalg.norm(vec1)
-            norm2 = np.linalg.norm(vec2)
-            
-            # Handle zero vectors
-            if norm1 == 0 or norm2 == 0:
-                return 0.0
-                
-            similarity = dot_product / (norm1 * norm2)
-            return float(similarity)
+            embeddings = await self.get_embeddings([text1, text2], as_array=True)
+            return float(cosine_scores(embeddings[0], embeddings[1:])[0])
         
         except Exception as e:
             logger.error(f"Error calculating similarity: {str(e)}")
             raise
     
-    async def batch_similarity(self, query: str, candidates: List[str]) -> List[float]:
+    async def batch_similarity(
+        self,
+        query: Union[str, VectorLike],
+        candidates: Union[List[str], MatrixLike]
+    ) -> List[float]:
         """
         Calculate similarity scores between a query and multiple candidates.
         
         Args:
-            query: Query text to compare
-            candidates: List of text strings to compare against
+            query: Query text, or its precomputed embedding
+            candidates: Candidate texts, or a precomputed (n, dimension) matrix
         
         Returns:
             List of similarity scores
         """
         try:
-            import numpy as np
-            
-            # Get embeddings for query and all candidates
-            all_texts = [query] + candidates
-            embeddings = await self.get_embeddings(all_texts)
-            
-            # Separate query embedding from candidate embeddings
-            query_embed = np.array(embeddings[0])
-            candidate_embeds = [np.array(embed) for embed in embeddings[1:]]
-            
-            # Calculate similarity for each candidate
-            similarities = []
-            query_norm = np.linalg.norm(query_embed)
-            
-            for embed in candidate_embeds:
-                candidate_norm = np.linalg.norm(embed)
-                
-                # Handle zero vectors
-                if query_norm == 0 or candidate_norm == 0:
-                    similarities.append(0.0)
-                    continue
-                
-                dot_product = np.dot(query_embed, embed)
-                similarity = dot_product / (query_norm * candidate_norm)
-                similarities.append(float(similarity))
-            
-            return similarities
+            query_vector, candidate_matrix = await self._resolve_vectors(query, candidates)
+            return cosine_scores(query_vector, candidate_matrix).tolist()
         
         except Exception as e:
             logger.error(f"Error calculating batch similarity: {str(e)}")
             raise
+    
+    async def top_k_similar(
+        self,
+        query: Union[str, VectorLike],
+        candidates: Union[List[str], MatrixLike],
+        k: int = 5
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank candidates by similarity to a query and return the best k.
+        
+        Args:
+            query: Query text, or its precomputed embedding
+            candidates: Candidate texts, or a precomputed (n, dimension) matrix
+            k: Number of results to return
+        
+        Returns:
+            (candidate index, score) pairs, best first
+        """
+        try:
+            query_vector, candidate_matrix = await self._resolve_vectors(query, candidates)
+            return SimilarityIndex(candidate_matrix).top_k(query_vector, k)
+        
+        except Exception as e:
+            logger.error(f"Error ranking candidates by similarity: {str(e)}")
+            raise
+    
+    async def similarity_matrix(self, items: Union[List[str], MatrixLike]) -> np.ndarray:
+        """
+        Calculate all-pairs cosine similarity, e.g. for deduplication or clustering.
+        
+        Args:
+            items: Texts, or a precomputed (n, dimension) matrix
+        
+        Returns:
+            (n, n) float32 similarity matrix
+        """
+        try:
+            if self._is_text_list(items):
+                items = await self.get_embeddings(items, as_array=True)
+            return pairwise_similarity(items)
+        
+        except Exception as e:
+            logger.error(f"Error calculating similarity matrix: {str(e)}")
+            raise
+    
+    async def _resolve_vectors(
+        self,
+        query: Union[str, VectorLike],
+        candidates: Union[List[str], MatrixLike]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embed whichever of query and candidates are given as text, in one call.
+        
+        Args:
+            query: Query text or vector
+            candidates: Candidate texts or matrix
+        
+        Returns:
+            (query vector, candidate matrix)
+        """
+        texts: List[str] = []
+        if isinstance(query, str):
+            texts.append(query)
+        candidates_are_text = self._is_text_list(candidates)
+        if candidates_are_text:
+            texts.extend(candidates)
+        
+        embeddings = await self.get_embeddings(texts, as_array=True) if texts else None
+        
+        if isinstance(query, str):
+            query_vector, embeddings = embeddings[0], embeddings[1:]
+        else:
+            query_vector = np.asarray(query, dtype=np.float32)
+        
+        if candidates_are_text:
+            candidate_matrix = embeddings
+        else:
+            candidate_matrix = np.asarray(candidates, dtype=np.float32).reshape(-1, len(query_vector))
+        return query_vector, candidate_matrix
+    
+    @staticmethod
+    def _is_text_list(items: Any) -> bool:
+        """Check whether items is a list of texts rather than vectors."""
+        return not isinstance(items, np.ndarray) and all(isinstance(item, str) for item in items)
 
 # Create a singleton instance
 embeddings_service = EmbeddingsService() 
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Hybrid retrieval module combining BM25 and vector search.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set
+from .lexical_index import LexicalIndex
+from .search import _metadata, reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("auto", "hybrid", "lexical", "vector")
+
+# Ticket IDs, project codes, versions, acronyms: "PRJ-1042", "Q3", "v2.1", "OKR"
+_IDENTIFIER_PATTERN = re.compile(r"\d|[A-Za-z][-_#/.][A-Za-z0-9]|^[A-Z]{2,}$")
+
+def is_keyword_query(query: str) -> bool:
+    """
+    Guess whether a query is an exact-term lookup rather than a question.
+
+    Quoted phrases, single words and short queries made only of identifiers
+    or capitalized names (e.g. "PRJ-1042", "Jane Doe") count as keyword-like.
+
+    Args:
+        query: Query text
+
+    Returns:
+        True if lexical search alone is likely to answer the query
+    """
+    query = query.strip()
+    if len(query) > 1 and query[0] == query[-1] == '"':
+        return True
+    words = query.split()
+    if len(words) == 1:
+        return True
+    if not words or len(words) > 4:
+        return False
+    return all(_IDENTIFIER_PATTERN.search(word) or word[:1].isupper() for word in words)
+
+class HybridRetriever:
+    """Retriever fusing BM25 and vector rankings, with a lexical-only fast path."""
+
+    def __init__(
+        self,
+        lexical_index: LexicalIndex,
+        vector_store: Any,
+        embeddings: Any,
+        candidates: int = 50,
+        rrf_k: int = 60
+    ):
+        """
+        Initialize the retriever.
+
+        Args:
+            lexical_index: BM25 index holding the same IDs as the vector store
+            vector_store: PineconeService or a local index (query_vectors)
+            embeddings: EmbeddingsService used to embed queries
+            candidates: Results taken from each retriever before fusion
+            rrf_k: Reciprocal rank fusion smoothing constant
+        """
+        self._lexical = lexical_index
+        self._vector_store = vector_store
+        self._embeddings = embeddings
+        self._candidates = candidates
+        self._rrf_k = rrf_k
+        # Namespaces whose lexical index held every stored vector when checked;
+        # both indexes are updated together from then on
+        self._covered: Set[str] = set()
+
+    async def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        mode: str = "auto"
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the best matches for a text query.
+
+        In "auto" mode keyword-like queries with lexical hits are answered
+        from the BM25 index alone, without an embeddings request, provided
+        the BM25 index covers every vector in the namespace; all other
+        queries run both retrievers and fuse their rankings by reciprocal
+        rank.
+
+        Args:
+            query: Query text
+            top_k: Number of results to return
+            namespace: Optional namespace (shared by both indexes)
+            filter: Optional Pinecone-style metadata filter
+            mode: "auto", "hybrid", "lexical" or "vector"
+
+        Returns:
+            Matches with 'id', 'score' and 'metadata', best first
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode: {mode}")
+        candidates = max(self._candidates, top_k)
+
+        if mode == "lexical":
+            return self._lexical.search(query, top_k, namespace, filter)
+        if mode == "auto" and is_keyword_query(query) and await self._lexical_covers(namespace):
+            lexical = self._lexical.search(query, top_k, namespace, filter)
+            if lexical:
+                logger.debug(f"Answered keyword query from the lexical index: {query!r}")
+                return lexical
+        if mode == "vector":
+            return await self._vector_search(query, top_k, namespace, filter)
+
+        # BM25 runs on the event loop, where add_texts and remove also run, so
+        # a search never sees the postings mid-update
+        lexical = self._lexical.search(query, candidates, namespace, filter)
+        dense = await self._vector_search(query, candidates, namespace, filter)
+        return reciprocal_rank_fusion([lexical, dense], top_k=top_k, k=self._rrf_k)
+
+    async def _lexical_covers(self, namespace: Optional[str]) -> bool:
+        """
+        Check whether the lexical index holds every vector of a namespace.
+
+        Vectors stored before the lexical index existed (or while it was not
+        persisted) would be missed by a lexical-only answer.
+        """
+        name = namespace or ""
+        if name in self._covered:
+            return True
+        if not self._lexical.has_namespace(namespace):
+            return False
+        stats = await self._vector_store.get_stats()
+        vector_count = stats.get("namespaces", {}).get(name, {}).get("vector_count", 0)
+        if self._lexical.count(namespace) < vector_count:
+            logger.debug(f"Lexical index does not cover namespace {name!r}; searching both indexes")
+            return False
+        self._covered.add(name)
+        return True
+
+    async def _vector_search(
+        self,
+        query: str,
+        top_k: int,
+        namespace: Optional[str],
+        filter: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Embed the query and search the vector store."""
+        vector = await self._embeddings.get_embedding(query)
+        matches = await self._vector_store.query_vectors(vector, top_k, namespace, filter)
+        return [
+            {"id": match["id"], "score": float(match["score"]), "metadata": _metadata(match)}
+            for match in matches
+        ]
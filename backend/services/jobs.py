@@ -0,0 +1,453 @@
+"""
+Job queue module for durable background work backed by SQLite.
+
+Jobs are rows in a local SQLite file, so queued work survives restarts.
+Workers lease a job for a visibility timeout and renew the lease while the
+handler runs; a job whose worker died becomes visible again once its lease
+expires. Failed jobs are retried with exponential backoff up to their
+attempt limit.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (type, status, priority DESC, available_at);
+"""
+
+@dataclass
+class Job:
+    """A unit of background work and its progress."""
+    id: str
+    type: str
+    payload: Dict[str, Any]
+    priority: int
+    status: str
+    attempts: int
+    max_attempts: int
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Convert the job to a dict."""
+        return asdict(self)
+
+JobHandler = Callable[[Job], Awaitable[Any]]
+
+class JobStore:
+    """SQLite-backed job table with atomic claims (safe across threads and processes)."""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the job database.
+
+        Args:
+            path: SQLite file (":memory:" for a throwaway store)
+        """
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        max_attempts: int = 3,
+        delay: float = 0.0,
+        job_id: Optional[str] = None
+    ) -> str:
+        """
+        Add a job to the queue.
+
+        Args:
+            job_type: Handler name
+            payload: JSON-serializable job arguments
+            priority: Higher runs first
+            max_attempts: Attempts before the job is marked failed
+            delay: Seconds before the job becomes visible
+            job_id: Optional ID (a UUID if None)
+
+        Returns:
+            The job ID
+        """
+        now = time.time()
+        job_id = job_id or str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, type, payload, priority, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, job_type, json.dumps(payload), priority, max_attempts, now + delay, now, now)
+            )
+        return job_id
+
+    def claim(self, job_types: List[str], visibility_timeout: float) -> Optional[Job]:
+        """
+        Lease the highest-priority visible job of the given types.
+
+        A job is visible when it is queued and due, or running with an
+        expired lease (its worker died). Expired jobs without attempts left
+        are marked failed instead.
+
+        Args:
+            job_types: Job types to consider
+            visibility_timeout: Seconds the lease lasts unless renewed
+
+        Returns:
+            The leased job, or None if none is visible
+        """
+        placeholders = ",".join("?" * len(job_types))
+        with self._lock:
+            while True:
+                now = time.time()
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute(
+                        f"SELECT * FROM jobs WHERE type IN ({placeholders}) AND ("
+                        "(status = 'queued' AND available_at <= ?) OR "
+                        "(status = 'running' AND lease_expires_at <= ?)"
+                        ") ORDER BY priority DESC, available_at, created_at LIMIT 1",
+                        (*job_types, now, now)
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    if row["status"] == "running" and row["attempts"] >= row["max_attempts"]:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = 'failed', error = ?, lease_expires_at = NULL, updated_at = ? "
+                            "WHERE id = ?",
+                            ("Visibility timeout expired on the last attempt", now, row["id"])
+                        )
+                        self._conn.execute("COMMIT")
+                        continue
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_expires_at = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (now + visibility_timeout, now, row["id"])
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                return self._to_job(row, status="running", attempts=row["attempts"] + 1)
+
+    def extend_lease(self, job_id: str, visibility_timeout: float) -> None:
+        """Renew a running job's lease."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now + visibility_timeout, now, job_id)
+            )
+
+    def complete(self, job_id: str, result: Any = None) -> None:
+        """Mark a running job completed with its (JSON-serializable) result."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'completed', result = ?, error = NULL, lease_expires_at = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (json.dumps(result, default=str), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str, retry_delay: Optional[float] = None) -> None:
+        """
+        Record a failed attempt.
+
+        Args:
+            job_id: Job ID
+            error: Error message
+            retry_delay: Seconds until the retry (None marks the job failed)
+        """
+        now = time.time()
+        with self._lock:
+            if retry_delay is None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE id = ?",
+                    (error, now, job_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, available_at = ?, lease_expires_at = NULL, "
+                    "updated_at = ? WHERE id = ?",
+                    (error, now + retry_delay, now, job_id)
+                )
+
+    def release(self, job_id: str) -> None:
+        """Put an interrupted job back in the queue without counting the attempt."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), available_at = ?, "
+                "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now, now, job_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row is not None else None
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Count jobs by type and status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT type, status, COUNT(*) AS n FROM jobs GROUP BY type, status"
+            ).fetchall()
+        counts: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            counts.setdefault(row["type"], {})[row["status"]] = row["n"]
+        return counts
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row, **overrides: Any) -> Job:
+        """Convert a row to a Job."""
+        fields = {
+            "id": row["id"],
+            "type": row["type"],
+            "payload": json.loads(row["payload"]),
+            "priority": row["priority"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "max_attempts": row["max_attempts"],
+            "result": json.loads(row["result"]) if row["result"] is not None else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+        fields.update(overrides)
+        return Job(**fields)
+
+class JobQueue:
+    """Asyncio worker pool running jobs from a JobStore, with per-type concurrency."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        default_concurrency: int = 2,
+        concurrency: Optional[Dict[str, int]] = None,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        retry_base_delay: float = 1.0,
+        retry_max_delay: float = 60.0
+    ):
+        """
+        Initialize the job queue.
+
+        Args:
+            store: Durable job storage
+            default_concurrency: Workers per job type
+            concurrency: Worker count overrides by job type
+            visibility_timeout: Seconds a job stays leased without a heartbeat
+            max_attempts: Default attempts per job
+            poll_interval: Seconds between checks for due or expired jobs
+            retry_base_delay: Backoff cap for the first retry; doubles per attempt
+            retry_max_delay: Upper bound for any retry delay
+        """
+        self._store = store
+        self._default_concurrency = default_concurrency
+        self._concurrency = dict(concurrency or {})
+        self._visibility_timeout = visibility_timeout
+        self._max_attempts = max_attempts
+        self._poll_interval = poll_interval
+        self._retry_base_delay = retry_base_delay
+        self._retry_max_delay = retry_max_delay
+        self._handlers: Dict[str, JobHandler] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        """Whether the worker pool is started."""
+        return bool(self._workers)
+
+    def register(self, job_type: str, handler: JobHandler, concurrency: Optional[int] = None) -> None:
+        """
+        Register the handler for a job type.
+
+        Args:
+            job_type: Job type name
+            handler: Async function taking the Job and returning a
+                JSON-serializable result; raising schedules a retry
+            concurrency: Workers for this type (overrides the default)
+        """
+        self._handlers[job_type] = handler
+        if concurrency is not None:
+            self._concurrency[job_type] = concurrency
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        priority: int = 0,
+        max_attempts: Optional[int] = None,
+        delay: float = 0.0,
+        job_id: Optional[str] = None
+    ) -> str:
+        """
+        Persist a job and wake a worker for it.
+
+        Args:
+            job_type: Registered job type
+            payload: JSON-serializable job arguments
+            priority: Higher runs first
+            max_attempts: Attempts before the job fails (default from settings)
+            delay: Seconds before the job may run
+            job_id: Optional ID (a UUID if None)
+
+        Returns:
+            The job ID
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"No handler registered for job type: {job_type}")
+        job_id = await asyncio.to_thread(
+            self._store.enqueue,
+            job_type,
+            payload,
+            priority,
+            max_attempts or self._max_attempts,
+            delay,
+            job_id
+        )
+        if job_type in self._wakeups:
+            self._wakeups[job_type].set()
+        logger.info(f"Enqueued {job_type} job {job_id}")
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID."""
+        return await asyncio.to_thread(self._store.get, job_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Get job counts by type and status, and the worker counts."""
+        return {
+            "running": self.running,
+            "workers": {job_type: self._workers_for(job_type) for job_type in self._handlers},
+            "jobs": await asyncio.to_thread(self._store.counts),
+        }
+
+    async def start(self) -> None:
+        """Start the workers of every registered job type."""
+        if self.running:
+            return
+        for job_type in self._handlers:
+            self._wakeups[job_type] = asyncio.Event()
+            self._workers.extend(
+                asyncio.create_task(self._work(job_type))
+                for _ in range(self._workers_for(job_type))
+            )
+        logger.info(f"Started {len(self._workers)} job workers")
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running go back to the queue."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._wakeups.clear()
+
+    def close(self) -> None:
+        """Close the job store."""
+        self._store.close()
+
+    def _workers_for(self, job_type: str) -> int:
+        return self._concurrency.get(job_type, self._default_concurrency)
+
+    async def _work(self, job_type: str) -> None:
+        """Claim and run jobs of one type until cancelled."""
+        wakeup = self._wakeups[job_type]
+        while True:
+            wakeup.clear()
+            claim = asyncio.ensure_future(
+                asyncio.to_thread(self._store.claim, [job_type], self._visibility_timeout)
+            )
+            try:
+                job = await asyncio.shield(claim)
+            except asyncio.CancelledError:
+                # The claim thread cannot be interrupted; hand back what it leased
+                job = await claim
+                if job is not None:
+                    self._store.release(job.id)
+                raise
+            except Exception as e:
+                logger.error(f"Error claiming {job_type} job: {str(e)}")
+                job = None
+            if job is None:
+                # asyncio.wait, unlike wait_for, never swallows a cancellation
+                waiter = asyncio.ensure_future(wakeup.wait())
+                try:
+                    await asyncio.wait({waiter}, timeout=self._poll_interval)
+                finally:
+                    waiter.cancel()
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Job) -> None:
+        """Run one job, renewing its lease, and record the outcome."""
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            result = await self._handlers[job.type](job)
+        except asyncio.CancelledError:
+            self._store.release(job.id)
+            raise
+        except Exception as e:
+            retry_delay = None
+            if job.attempts < job.max_attempts:
+                retry_delay = backoff_delay(job.attempts - 1, self._retry_base_delay, self._retry_max_delay)
+            logger.error(
+                f"{job.type} job {job.id} failed (attempt {job.attempts}/{job.max_attempts}): {str(e)}"
+            )
+            await asyncio.to_thread(self._store.fail, job.id, str(e), retry_delay)
+        else:
+            await asyncio.to_thread(self._store.complete, job.id, result)
+            logger.info(f"Completed {job.type} job {job.id}")
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renew a job's lease at a third of the visibility timeout."""
+        while True:
+            await asyncio.sleep(self._visibility_timeout / 3)
+            await asyncio.to_thread(self._store.extend_lease, job_id, self._visibility_timeout)
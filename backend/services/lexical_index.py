@@ -0,0 +1,320 @@
+"""
+Lexical (BM25) index over document and chunk text.
+"""
+import heapq
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from .local_index import DEFAULT_NAMESPACE, metadata_matches, save_json
+
+if TYPE_CHECKING:
+    from models.document import Document
+
+logger = logging.getLogger(__name__)
+
+# Words and identifiers such as "PRJ-1042", "v2.3" or "jane.doe"
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms.
+
+    Compound identifiers are kept whole and also split into their parts,
+    so "PRJ-1042" matches queries for "prj-1042" as well as "1042".
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Terms in text order
+    """
+    terms = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        terms.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+class _LexicalNamespace:
+    """Inverted index of one namespace with incremental updates."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, doc_id: str, terms: List[str], metadata: Dict[str, Any]) -> None:
+        """Index a text, replacing any earlier version with the same ID."""
+        self.add_counts(doc_id, Counter(terms), metadata)
+
+    def add_counts(self, doc_id: str, counts: Dict[str, int], metadata: Dict[str, Any]) -> None:
+        """Index a text given its term counts, replacing any earlier version."""
+        self.remove(doc_id)
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        length = sum(counts.values())
+        self.doc_terms[doc_id] = list(counts)
+        self.lengths[doc_id] = length
+        self.metadata[doc_id] = metadata
+        self.total_length += length
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Term counts and metadata of every text, as written by LexicalIndex.save()."""
+        return {
+            doc_id: {
+                "terms": {term: self.postings[term][doc_id] for term in terms},
+                "metadata": self.metadata[doc_id],
+            }
+            for doc_id, terms in self.doc_terms.items()
+        }
+
+    def remove(self, doc_id: str) -> bool:
+        """Remove a text by ID; returns whether it was indexed."""
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return False
+        for term in self.doc_terms.pop(doc_id):
+            del self.postings[term][doc_id]
+            if not self.postings[term]:
+                del self.postings[term]
+        self.metadata.pop(doc_id, None)
+        self.total_length -= length
+        return True
+
+class LexicalIndex:
+    """Incremental BM25 index with the namespace and filter semantics of the vector stores.
+
+    The index is not locked: update and search it from the event loop only.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, path: Optional[str] = None):
+        """
+        Initialize the lexical index.
+
+        Args:
+            k1: BM25 term-frequency saturation
+            b: BM25 document-length normalization (0 disables)
+            path: JSON file to load from and save to (optional)
+        """
+        self._k1 = k1
+        self._b = b
+        self._path = path
+        self._namespaces: Dict[str, _LexicalNamespace] = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @property
+    def path(self) -> Optional[str]:
+        """File the index is saved to by default."""
+        return self._path
+
+    def _namespace(self, namespace: Optional[str], create: bool = False) -> Optional[_LexicalNamespace]:
+        """Get a namespace, optionally creating it."""
+        name = namespace or DEFAULT_NAMESPACE
+        if name not in self._namespaces and create:
+            self._namespaces[name] = _LexicalNamespace()
+        return self._namespaces.get(name)
+
+    def has_namespace(self, namespace: Optional[str]) -> bool:
+        """Check whether a namespace holds any texts."""
+        return bool(self._namespace(namespace))
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        """Number of texts indexed in a namespace."""
+        space = self._namespace(namespace)
+        return len(space) if space else 0
+
+    def add_texts(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        namespace: Optional[str] = None
+    ) -> int:
+        """
+        Index texts (e.g. chunks), replacing earlier versions with the same IDs.
+
+        Args:
+            ids: Text IDs (use the vector IDs so results can be fused)
+            texts: Texts to index, one per ID
+            metadata: Optional metadata dicts, one per text
+            namespace: Optional namespace
+
+        Returns:
+            Number of texts indexed
+        """
+        if len(ids) != len(texts):
+            raise ValueError(f"Got {len(ids)} ids for {len(texts)} texts")
+        space = self._namespace(namespace, create=True)
+        for i, (doc_id, text) in enumerate(zip(ids, texts)):
+            space.add(doc_id, tokenize(text), metadata[i] if metadata else {})
+        return len(ids)
+
+    def add_documents(self, documents: List["Document"], namespace: Optional[str] = None) -> int:
+        """
+        Index Document titles and content under their IDs.
+
+        Args:
+            documents: Documents to index (must have IDs)
+            namespace: Optional namespace
+
+        Returns:
+            Number of documents indexed
+        """
+        return self.add_texts(
+            [document.id for document in documents],
+            [f"{document.title}\n{document.content}" for document in documents],
+            [
+                {
+                    "document_id": document.id,
+                    "title": document.title,
+                    "user_id": document.user_id,
+                    "tags": document.tags,
+                }
+                for document in documents
+            ],
+            namespace=namespace
+        )
+
+    def remove(self, ids: List[str], namespace: Optional[str] = None) -> int:
+        """
+        Remove texts by ID.
+
+        Args:
+            ids: Text IDs
+            namespace: Optional namespace
+
+        Returns:
+            Number of texts removed
+        """
+        space = self._namespace(namespace)
+        if space is None:
+            return 0
+        return sum(space.remove(doc_id) for doc_id in ids)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank texts by BM25 score for a query.
+
+        Args:
+            query: Query text
+            top_k: Number of results to return
+            namespace: Optional namespace
+            filter: Optional Pinecone-style metadata filter
+
+        Returns:
+            Matches with 'id', 'score' and 'metadata', best first
+        """
+        space = self._namespace(namespace)
+        if space is None or not len(space):
+            return []
+
+        count = len(space)
+        average_length = space.total_length / count
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = space.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, frequency in docs.items():
+                norm = self._k1 * (1 - self._b + self._b * space.lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self._k1 + 1) / (frequency + norm)
+
+        if filter:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if metadata_matches(space.metadata[doc_id], filter)
+            }
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [
+            {"id": doc_id, "score": score, "metadata": space.metadata[doc_id]}
+            for doc_id, score in best
+        ]
+
+    def get_stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get statistics about the index.
+
+        Args:
+            namespace: Optional namespace
+
+        Returns:
+            Text and term counts
+        """
+        if namespace:
+            space = self._namespace(namespace)
+            return {
+                "namespace": namespace,
+                "text_count": len(space) if space else 0,
+                "term_count": len(space.postings) if space else 0,
+            }
+        return {
+            "namespaces": {
+                name: {"text_count": len(space), "term_count": len(space.postings)}
+                for name, space in self._namespaces.items()
+            },
+            "total_text_count": sum(len(space) for space in self._namespaces.values()),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Snapshot the index for save() (call from the event loop).
+
+        Returns:
+            Term counts and metadata of every text, by namespace
+        """
+        return {"namespaces": {name: space.to_dict() for name, space in self._namespaces.items() if len(space)}}
+
+    def save(self, path: Optional[str] = None, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Persist the index to a JSON file, replacing it atomically.
+
+        Args:
+            path: Target file (defaults to the path given at construction)
+            data: Snapshot from to_dict(), so the write can run off the event loop
+        """
+        path = path or self._path
+        if not path:
+            raise ValueError("No path given to save the lexical index to")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = data if data is not None else self.to_dict()
+        save_json(path, data)
+        logger.info(f"Saved lexical index with {len(data['namespaces'])} namespaces to {path}")
+
+    def load(self, path: str) -> None:
+        """
+        Load an index saved with save(), replacing the current contents.
+
+        Args:
+            path: File written by save()
+        """
+        with open(path) as f:
+            data = json.load(f)
+        namespaces: Dict[str, _LexicalNamespace] = {}
+        for name, texts in data["namespaces"].items():
+            space = namespaces[name] = _LexicalNamespace()
+            for doc_id, text in texts.items():
+                space.add_counts(doc_id, text["terms"], text["metadata"])
+        self._namespaces = namespaces
+        self._path = path
+        logger.info(f"Loaded lexical index with {len(namespaces)} namespaces from {path}")
\ No newline at end of file
@@ -0,0 +1,486 @@
+"""
+In-process vector index with the same surface as PineconeService.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Union
+from urllib.parse import quote
+import numpy as np
+from .search import scatter_gather
+from .similarity import normalize_rows, normalize_vector, top_k as select_top_k
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMESPACE = ""
+
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+}
+
+def _field_matches(value: Any, condition: Any) -> bool:
+    """Evaluate one field condition; list-valued metadata matches if any element does."""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    values = value if isinstance(value, list) else [value]
+    for operator, operand in condition.items():
+        compare = _COMPARISONS.get(operator)
+        if compare is None:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+        if operator in ("$ne", "$nin"):
+            if not all(compare(item, operand) for item in values):
+                return False
+        elif not any(compare(item, operand) for item in values):
+            return False
+    return True
+
+def metadata_matches(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check metadata against a Pinecone-style filter.
+
+    Supports implicit equality, $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin,
+    $and and $or.
+
+    Args:
+        metadata: Vector metadata
+        filter: Pinecone metadata filter
+
+    Returns:
+        True if the metadata satisfies the filter
+    """
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(metadata_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(metadata_matches(metadata, clause) for clause in condition):
+                return False
+        elif not _field_matches(metadata.get(key), condition):
+            return False
+    return True
+
+def save_array(path: str, array: np.ndarray) -> None:
+    """
+    Write an array to a .npy file atomically.
+
+    The array may be memory-mapped from the very file it replaces (an index
+    loaded from a directory and saved back to it), so it is written to a
+    temporary file and renamed over the target; open maps keep reading the
+    old file.
+
+    Args:
+        path: Target .npy file
+        array: Array to write
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def save_json(path: str, data: Any) -> None:
+    """
+    Write a JSON file atomically, so a reader never sees it half written.
+
+    Args:
+        path: Target .json file
+        data: JSON-serializable data
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+class _Namespace:
+    """Vectors of one namespace in a contiguous, growable float32 matrix."""
+
+    kind = "flat"
+
+    def __init__(self, dimension: int, capacity: int = 1024):
+        self.dimension = dimension
+        self.matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _reserve(self, size: int) -> None:
+        """Grow the matrix geometrically so appends are amortized O(1)."""
+        if size <= len(self.matrix):
+            return
+        capacity = max(size, len(self.matrix) * 2, 1024)
+        matrix = np.zeros((capacity, self.dimension), dtype=np.float32)
+        matrix[:len(self.ids)] = self.matrix[:len(self.ids)]
+        self.matrix = matrix
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: List[Dict[str, Any]]) -> None:
+        """Insert or overwrite rows; vectors must already be normalized."""
+        self._reserve(len(self.ids) + len(ids))
+        for vector_id, vector, meta in zip(ids, vectors, metadata):
+            position = self.positions.get(vector_id)
+            if position is None:
+                position = len(self.ids)
+                self.positions[vector_id] = position
+                self.ids.append(vector_id)
+                self.metadata.append(meta)
+            else:
+                self.metadata[position] = meta
+            self.matrix[position] = vector
+
+    def delete(self, ids: List[str]) -> int:
+        """Delete rows by ID, moving the last row into each freed slot."""
+        deleted = 0
+        for vector_id in ids:
+            position = self.positions.pop(vector_id, None)
+            if position is None:
+                continue
+            last = len(self.ids) - 1
+            if position != last:
+                self.matrix[position] = self.matrix[last]
+                self.ids[position] = self.ids[last]
+                self.metadata[position] = self.metadata[last]
+                self.positions[self.ids[position]] = position
+            self.ids.pop()
+            self.metadata.pop()
+            deleted += 1
+        return deleted
+
+    def matching_ids(self, filter: Dict[str, Any]) -> List[str]:
+        """IDs whose metadata satisfies a filter."""
+        return [
+            vector_id for vector_id, meta in zip(self.ids, self.metadata)
+            if metadata_matches(meta, filter)
+        ]
+
+    def query(self, vector: np.ndarray, top_k: int, filter: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Exact cosine search over the namespace."""
+        size = len(self.ids)
+        if not size:
+            return []
+
+        scores = self.matrix[:size] @ vector
+        if filter:
+            mask = np.fromiter(
+                (metadata_matches(meta, filter) for meta in self.metadata),
+                dtype=bool,
+                count=size
+            )
+            scores = np.where(mask, scores, -np.inf)
+            top_k = min(top_k, int(mask.sum()))
+
+        indices, best = select_top_k(scores, top_k)
+        return [
+            {"id": self.ids[i], "score": float(score), "metadata": self.metadata[i]}
+            for i, score in zip(indices, best)
+        ]
+
+    def save(self, directory: str) -> None:
+        """Write the namespace to a directory."""
+        save_array(os.path.join(directory, "vectors.npy"), self.matrix[:len(self)])
+        save_json(os.path.join(directory, "records.json"), {"ids": self.ids, "metadata": self.metadata})
+
+    @classmethod
+    def load(cls, directory: str, dimension: int, **options: Any) -> "_Namespace":
+        """Read a namespace written by save(), memory-mapping its matrix."""
+        with open(os.path.join(directory, "records.json")) as f:
+            records = json.load(f)
+        space = cls(dimension, capacity=0)
+        space.matrix = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="c")
+        space.ids = records["ids"]
+        space.metadata = records["metadata"]
+        space.positions = {vector_id: i for i, vector_id in enumerate(space.ids)}
+        return space
+
+class LocalVectorIndex:
+    """In-memory vector index mirroring the PineconeService interface."""
+
+    _namespace_class = _Namespace
+
+    def __init__(self, dimension: int = 1536, path: Optional[str] = None, **namespace_options: Any):
+        """
+        Initialize the local index.
+
+        Args:
+            dimension: Vector dimension
+            path: Directory to load from and save to (optional)
+            **namespace_options: Options passed to each namespace's storage
+        """
+        self._dimension = dimension
+        self._path = path
+        self._namespace_options = namespace_options
+        self._namespaces: Dict[str, _Namespace] = {}
+        # Namespace name -> background task (re)training it
+        self._training: Dict[str, asyncio.Task] = {}
+        if path and os.path.exists(os.path.join(path, "index.json")):
+            self.load(path)
+
+    def _namespace(self, namespace: Optional[str], create: bool = False) -> Optional[_Namespace]:
+        """Get a namespace, optionally creating it."""
+        name = namespace or DEFAULT_NAMESPACE
+        if name not in self._namespaces and create:
+            self._namespaces[name] = self._namespace_class(self._dimension, **self._namespace_options)
+        return self._namespaces.get(name)
+
+    def has_namespace(self, namespace: Optional[str]) -> bool:
+        """Check whether a namespace holds any vectors."""
+        return bool(self._namespace(namespace))
+
+    async def upsert_vectors(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Insert or update vectors.
+
+        Args:
+            vectors: List of vector records with 'id', 'values' and optional 'metadata'.
+            namespace: Optional namespace for the vectors.
+
+        Returns:
+            Upsert status and count.
+        """
+        if not vectors:
+            return {"status": "success", "count": 0}
+        matrix = np.stack([np.asarray(record["values"], dtype=np.float32) for record in vectors])
+        return await self.upsert_matrix(
+            [record["id"] for record in vectors],
+            matrix,
+            [record.get("metadata") or {} for record in vectors],
+            namespace=namespace
+        )
+
+    async def upsert_matrix(
+        self,
+        ids: List[str],
+        matrix: np.ndarray,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Insert or update vectors given as a (n, dimension) matrix.
+
+        Args:
+            ids: Vector IDs, one per matrix row.
+            matrix: Embedding matrix.
+            metadata: Optional metadata dicts, one per matrix row.
+            namespace: Optional namespace for the vectors.
+
+        Returns:
+            Upsert status and count.
+        """
+        matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+        if matrix.shape != (len(ids), self._dimension):
+            raise ValueError(
+                f"Expected a ({len(ids)}, {self._dimension}) matrix, got {matrix.shape}"
+            )
+        metadata = metadata or [{} for _ in ids]
+        space = self._namespace(namespace, create=True)
+        space.upsert(ids, normalize_rows(matrix), metadata)
+        self._schedule_training(namespace or DEFAULT_NAMESPACE, space)
+        return {"status": "success", "count": len(ids)}
+
+    def _schedule_training(self, name: str, space: Any) -> None:
+        """Start training a namespace in the background if it has outgrown its structure."""
+        if getattr(space, "needs_training", False) and name not in self._training:
+            self._training[name] = asyncio.get_running_loop().create_task(self._train(name, space))
+
+    async def _train(self, name: str, space: Any) -> None:
+        """
+        Train a namespace in a worker thread, keeping the event loop free.
+
+        The snapshot is taken and the result applied on the loop, so
+        upserts and deletes made during training are reconciled by the
+        namespace; until then queries use its untrained (exact) structure.
+        """
+        try:
+            while space.needs_training and self._namespaces.get(name) is space:
+                fitted = await asyncio.to_thread(space.fit, space.training_snapshot())
+                # The namespace may have been dropped or reloaded meanwhile
+                if fitted is None or self._namespaces.get(name) is not space:
+                    break
+                space.apply_training(fitted)
+        except Exception as e:
+            logger.error(f"Error training namespace {name or 'default'}: {str(e)}")
+        finally:
+            self._training.pop(name, None)
+
+    async def wait_for_training(self) -> None:
+        """Wait until no namespace is being trained."""
+        while self._training:
+            await asyncio.gather(*self._training.values())
+
+    async def query_vectors(
+        self,
+        query_vector: Union[List[float], np.ndarray],
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Query the nearest vectors by cosine similarity.
+
+        Args:
+            query_vector: The vector to query.
+            top_k: Number of results to return.
+            namespace: Optional namespace to query.
+            filter: Optional Pinecone-style metadata filter.
+
+        Returns:
+            List of matches with 'id', 'score' and 'metadata'.
+        """
+        space = self._namespace(namespace)
+        if space is None:
+            return []
+        return space.query(normalize_vector(query_vector), top_k, filter)
+
+    async def query_many(
+        self,
+        query_vectors: List[Union[List[float], np.ndarray]],
+        namespaces: Optional[List[Optional[str]]] = None,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Query several vectors across several namespaces.
+
+        Args:
+            query_vectors: The vectors to query.
+            namespaces: Namespaces to search (default namespace if None).
+            top_k: Number of merged results per query vector.
+            filter: Optional Pinecone-style metadata filter.
+            timeout: Deadline in seconds (None waits for all namespaces).
+
+        Returns:
+            Results in the shape returned by PineconeService.query_many.
+        """
+        return await scatter_gather(
+            self.query_vectors, query_vectors, namespaces or [None], top_k, filter, timeout
+        )
+
+    async def delete_vectors(
+        self,
+        ids: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        namespace: Optional[str] = None,
+        delete_all: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Delete vectors.
+
+        Args:
+            ids: List of vector IDs to delete.
+            filter: Metadata filter for vectors to delete.
+            namespace: Optional namespace.
+            delete_all: Whether to delete all vectors in the namespace.
+
+        Returns:
+            Delete status.
+        """
+        name = namespace or DEFAULT_NAMESPACE
+        if delete_all:
+            self._namespaces.pop(name, None)
+            return {"status": "success", "message": f"All vectors deleted from namespace {namespace or 'default'}"}
+
+        space = self._namespace(namespace)
+        if ids:
+            count = space.delete(ids) if space else 0
+            return {"status": "success", "count": count}
+        elif filter:
+            count = space.delete(space.matching_ids(filter)) if space else 0
+            return {"status": "success", "message": "Vectors deleted by filter", "count": count}
+        else:
+            raise ValueError("Must provide either ids, filter, or delete_all=True")
+
+    async def get_stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get statistics about the index.
+
+        Args:
+            namespace: Optional namespace.
+
+        Returns:
+            Index statistics in the shape returned by PineconeService.
+        """
+        if namespace:
+            space = self._namespace(namespace)
+            return {"namespace": namespace, "vector_count": len(space) if space else 0}
+        return {
+            "dimension": self._dimension,
+            "namespaces": {
+                name: {"vector_count": len(space)} for name, space in self._namespaces.items()
+            },
+            "total_vector_count": sum(len(space) for space in self._namespaces.values()),
+        }
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Persist the index to a directory (one .npy matrix per namespace).
+
+        Args:
+            path: Target directory (defaults to the path given at construction)
+        """
+        path = path or self._path
+        if not path:
+            raise ValueError("No path given to save the local index to")
+        os.makedirs(path, exist_ok=True)
+
+        manifest = {
+            "dimension": self._dimension,
+            "kind": self._namespace_class.kind,
+            "namespaces": {},
+        }
+        for name, space in self._namespaces.items():
+            if not len(space):
+                continue
+            directory = quote(name, safe="") or "__default__"
+            os.makedirs(os.path.join(path, directory), exist_ok=True)
+            space.save(os.path.join(path, directory))
+            manifest["namespaces"][name] = directory
+
+        # Write the manifest last so a partial save is never loaded
+        save_json(os.path.join(path, "index.json"), manifest)
+        logger.info(f"Saved local vector index with {len(self._namespaces)} namespaces to {path}")
+
+    def load(self, path: str) -> None:
+        """
+        Load an index saved with save(), memory-mapping the vector matrices.
+
+        Pages are read lazily and copied on write, so loading is fast and
+        untouched namespaces cost no resident memory.
+
+        Args:
+            path: Directory written by save()
+        """
+        with open(os.path.join(path, "index.json")) as f:
+            manifest = json.load(f)
+        if manifest["dimension"] != self._dimension:
+            raise ValueError(
+                f"Index at {path} has dimension {manifest['dimension']}, expected {self._dimension}"
+            )
+        kind = manifest.get("kind", _Namespace.kind)
+        if kind != self._namespace_class.kind:
+            raise ValueError(f"Index at {path} is a {kind} index, expected {self._namespace_class.kind}")
+
+        namespaces = {
+            name: self._namespace_class.load(
+                os.path.join(path, directory), self._dimension, **self._namespace_options
+            )
+            for name, directory in manifest["namespaces"].items()
+        }
+
+        self._namespaces = namespaces
+        self._path = path
+        logger.info(f"Loaded local vector index with {len(namespaces)} namespaces from {path}")
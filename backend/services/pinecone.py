@@ -1,103 +1,336 @@
 """
 Pinecone service module for vector database operations.
 """
+import asyncio
+import json
 import logging
+import threading
 import time
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Union
 import numpy as np
 from pinecone import Pinecone, ServerlessSpec
 from config.settings import get_settings
+from .embedding_batching import pack_batches
+from .local_index import LocalVectorIndex
+from .query_cache import QueryCache
+from .resilience import CircuitBreaker, retry_async
+from .search import scatter_gather
+from .vector_store import create_local_index
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Upper bound on a JSON float plus its ", " separator: repr() of a double has
+# at most 17 significant digits, a sign and a 3-digit exponent
+# ("-1.2345678901234567e-308")
+JSON_FLOAT_BYTES = 26
+# Braces, keys and separators of {"id": ..., "values": [...], "metadata": ...}
+JSON_RECORD_OVERHEAD_BYTES = 48
+
 class PineconeService:
     """Service for Pinecone vector database operations."""
     
     def __init__(self):
-        """Initialize the Pinecone client."""
+        """
+        Initialize the service.
+        
+        Nothing is sent over the network here: the client connects (and
+        provisions the index if needed) on first use.
+        """
         self._pc = None
         self._index = None
-        self._connect()
+        self._connect_lock = threading.Lock()
+        self._connect_task: Optional[asyncio.Task] = None
+        self._last_error: Optional[str] = None
+        # Hot namespaces are also kept in an in-process index and queried locally
+        self._mirror_namespaces = set(settings.LOCAL_MIRROR_NAMESPACES)
+        self._mirror = (
+            create_local_index() if self._mirror_namespaces else None
+        )
+        # Shared by all upsert batches so an outage fails fast instead of retrying each one
+        self._breaker = CircuitBreaker(
+            "pinecone",
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+        )
+        self._query_cache = (
+            QueryCache(
+                max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+                ttl=settings.QUERY_CACHE_TTL,
+                decimals=settings.QUERY_CACHE_DECIMALS
+            )
+            if settings.QUERY_CACHE_ENABLED else None
+        )
     
     def _connect(self) -> None:
-        """Establish connection to Pinecone."""
-        try:
-            # Create Pinecone client
-            self._pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-            
-            # Check if index exists
-            index_name = settings.PINECONE_INDEX_NAME
-            all_indexes = self._pc.list_indexes()
+        """Establish connection to Pinecone (blocking; safe to call from several threads)."""
+        with self._connect_lock:
+            if self._index is not None:
+                return
+            try:
+                # Create Pinecone client
+                self._pc = Pinecone(api_key=settings.PINECONE_API_KEY)
+                
+                # Check if index exists
+                index_name = settings.PINECONE_INDEX_NAME
+                all_indexes = self._pc.list_indexes()
+                
+                if index_name not in [idx.name for idx in all_indexes]:
+                    logger.info(f"Creating new Pinecone index: {index_name}")
+                    # Default to 1536 dimensions for OpenAI embeddings
+                    self._pc.create_index(
+                        name=index_name,
+                        dimension=1536,  # OpenAI embeddings dimension
+                        metric="cosine",
+                        spec=ServerlessSpec(cloud="aws", region="us-west-2")
+                    )
+                    self._wait_until_ready(index_name)
+                
+                # Connect to the index
+                self._index = self._pc.Index(index_name)
+                self._last_error = None
+                logger.info(f"Connected to Pinecone index: {index_name}")
             
-            if index_name not in [idx.name for idx in all_indexes]:
-                logger.info(f"Creating new Pinecone index: {index_name}")
-                # Default to 1536 dimensions for OpenAI embeddings
-                self._pc.create_index(
-                    name=index_name,
-                    dimension=1536,  # OpenAI embeddings dimension
-                    metric="cosine",
-                    spec=ServerlessSpec(cloud="aws", region="us-west-2")
-                )
-                # Wait for index to be ready
-                time.sleep(10)
-            
-            # Connect to the index
-            self._index = self._pc.Index(index_name)
-            logger.info(f"Connected to Pinecone index: {index_name}")
+            except Exception as e:
+                self._last_error = str(e)
+                logger.error(f"Failed to connect to Pinecone: {str(e)}")
+                raise
+    
+    def _wait_until_ready(self, index_name: str) -> None:
+        """
+        Poll a newly created index until Pinecone reports it ready.
         
-        except Exception as e:
-            logger.error(f"Failed to connect to Pinecone: {str(e)}")
-            raise
+        Args:
+            index_name: Name of the index being provisioned.
+        
+        Raises:
+            TimeoutError: If the index is not ready within PINECONE_READY_TIMEOUT seconds.
+        """
+        deadline = time.monotonic() + settings.PINECONE_READY_TIMEOUT
+        while not self._pc.describe_index(index_name).status["ready"]:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Pinecone index {index_name} not ready after {settings.PINECONE_READY_TIMEOUT}s"
+                )
+            time.sleep(settings.PINECONE_READY_POLL_INTERVAL)
     
     @property
     def index(self):
-        """Get the Pinecone index instance."""
+        """Get the Pinecone index instance, connecting (blocking) if needed."""
         if not self._index:
             self._connect()
         return self._index
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-        retry=retry_if_exception_type(Exception)
-    )
+    async def connect(self) -> None:
+        """Connect to Pinecone from a worker thread, so the event loop is never blocked."""
+        if self._index is None:
+            await asyncio.to_thread(self._connect)
+    
+    async def get_index(self):
+        """Get the Pinecone index instance, connecting without blocking if needed."""
+        await self.connect()
+        return self._index
+    
+    @property
+    def is_ready(self) -> bool:
+        """Whether the index is connected and usable."""
+        return self._index is not None
+    
+    async def check_ready(self) -> Dict[str, Any]:
+        """
+        Report readiness without waiting for a connection.
+        
+        If the service is not connected and no connection attempt is
+        running, one is started in the background.
+        
+        Returns:
+            "ready" flag and the last connection error, if any.
+        """
+        if self.is_ready:
+            return {"ready": True}
+        
+        loop = asyncio.get_running_loop()
+        task = self._connect_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self.connect())
+            # The error is kept in _last_error; don't log it as unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._connect_task = task
+        return {"ready": False, "error": self._last_error}
+    
     async def upsert_vectors(
         self, 
         vectors: List[Dict[str, Any]], 
-        namespace: Optional[str] = None
+        namespace: Optional[str] = None,
+        checkpoint: Optional[Set[str]] = None
     ) -> Dict[str, Any]:
         """
         Insert or update vectors in Pinecone.
         
+        Vectors are split into batches bounded by PINECONE_UPSERT_BATCH_SIZE
+        vectors and PINECONE_UPSERT_MAX_BYTES of serialized payload. Up to
+        PINECONE_UPSERT_CONCURRENCY batches are sent at once from worker
+        threads, so the event loop is never blocked. Each batch is retried
+        on its own with jittered backoff; while Pinecone keeps failing the
+        circuit breaker opens and the remaining batches fail fast.
+        
         Args:
             vectors: List of vector records to insert/update.
-                    Each record should have 'id', 'values', and 'metadata'.
+                    Each record should have 'id', 'values', and 'metadata';
+                    'values' may be a list or a float32 numpy row.
             namespace: Optional namespace for the vectors.
+            checkpoint: Optional set of IDs already upserted by an earlier
+                    attempt of the same job. Those vectors are skipped, and
+                    the IDs of every batch that succeeds are added to it, so
+                    calling again after a partial failure only sends the rest.
         
         Returns:
-            Response from Pinecone upsert operation.
+            Overall status ("success", "partial" or "failed"), counts, and
+            one entry per batch with its status and, on failure, the error
+            and the IDs that were not upserted.
         """
-        try:
-            # Process vectors in batches of 100 (recommended by Pinecone)
-            batch_size = 100
-            total_vectors = len(vectors)
-            
-            for i in range(0, total_vectors, batch_size):
-                batch = vectors[i:i + batch_size]
-                response = self.index.upsert(
-                    vectors=batch,
-                    namespace=namespace,
-                    show_progress=False
-                )
-                logger.info(f"Upserted batch {i // batch_size + 1}/{(total_vectors // batch_size) + 1} to Pinecone")
-            
-            return {"status": "success", "count": total_vectors}
+        total = len(vectors)
+        if checkpoint:
+            vectors = [record for record in vectors if record["id"] not in checkpoint]
         
-        except Exception as e:
-            logger.error(f"Error upserting vectors to Pinecone: {str(e)}")
-            raise
+        batches = pack_batches(
+            [(i, self._estimate_payload_bytes(record)) for i, record in enumerate(vectors)],
+            max_tokens=settings.PINECONE_UPSERT_MAX_BYTES,
+            max_inputs=settings.PINECONE_UPSERT_BATCH_SIZE
+        )
+        semaphore = asyncio.Semaphore(settings.PINECONE_UPSERT_CONCURRENCY)
+        
+        async def run_batch(number: int, rows: List[int]) -> Dict[str, Any]:
+            batch = [vectors[i] for i in rows]
+            async with semaphore:
+                try:
+                    await self._upsert_batch(batch, namespace)
+                except Exception as e:
+                    logger.error(f"Error upserting batch {number + 1}/{len(batches)} to Pinecone: {str(e)}")
+                    return {
+                        "batch": number,
+                        "count": len(batch),
+                        "status": "failed",
+                        "error": str(e),
+                        "ids": [record["id"] for record in batch],
+                    }
+            if checkpoint is not None:
+                checkpoint.update(record["id"] for record in batch)
+            logger.info(f"Upserted batch {number + 1}/{len(batches)} to Pinecone")
+            return {"batch": number, "count": len(batch), "status": "success"}
+        
+        results = await asyncio.gather(*[
+            run_batch(number, rows) for number, rows in enumerate(batches)
+        ])
+        # Even failed batches may have been partly written
+        if batches:
+            self._invalidate_queries(namespace)
+        
+        upserted = sum(result["count"] for result in results if result["status"] == "success")
+        failed = len(vectors) - upserted
+        
+        if self._is_mirrored(namespace) and upserted:
+            succeeded = [
+                vectors[i]
+                for rows, result in zip(batches, results) if result["status"] == "success"
+                for i in rows
+            ]
+            await self._mirror.upsert_vectors(succeeded, namespace=namespace)
+        
+        if not failed:
+            status = "success"
+        elif upserted:
+            status = "partial"
+        else:
+            status = "failed"
+        
+        return {
+            "status": status,
+            "count": total,
+            "upserted": upserted,
+            "skipped": total - len(vectors),
+            "failed": failed,
+            "batches": results,
+        }
+    
+    async def _upsert_batch(self, batch: List[Dict[str, Any]], namespace: Optional[str]) -> None:
+        """
+        Send one upsert request from a worker thread, with retries.
+        
+        Args:
+            batch: Vector records to upsert.
+            namespace: Optional namespace for the vectors.
+        """
+        def send() -> Any:
+            return self.index.upsert(
+                vectors=self._to_wire(batch),
+                namespace=namespace,
+                show_progress=False
+            )
+        
+        await retry_async(
+            lambda: asyncio.to_thread(send),
+            attempts=settings.RETRY_MAX_ATTEMPTS,
+            base_delay=settings.RETRY_BASE_DELAY,
+            max_delay=settings.RETRY_MAX_DELAY,
+            breaker=self._breaker,
+            description=f"Pinecone upsert of {len(batch)} vectors"
+        )
+    
+    @staticmethod
+    def _estimate_payload_bytes(record: Dict[str, Any]) -> int:
+        """
+        Estimate the serialized size of a vector record.
+        
+        Args:
+            record: Vector record with 'id', 'values' and optional 'metadata'.
+        
+        Returns:
+            JSON payload size in bytes, never less than the serialized record.
+        """
+        # Bounding the values avoids serializing every vector just to size it
+        size = (
+            len(record["values"]) * JSON_FLOAT_BYTES
+            + len(json.dumps(str(record["id"])))
+            + JSON_RECORD_OVERHEAD_BYTES
+        )
+        if record.get("metadata"):
+            size += len(json.dumps(record["metadata"], default=str))
+        return size
+    
+    async def upsert_matrix(
+        self,
+        ids: List[str],
+        matrix: np.ndarray,
+        metadata: Optional[List[Dict[str, Any]]] = None,
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Insert or update vectors given as a (n, dimension) embedding matrix.
+        
+        Rows are passed as views and only converted to the wire format one
+        batch at a time, so the matrix is never copied as a whole.
+        
+        Args:
+            ids: Vector IDs, one per matrix row.
+            matrix: float32 embedding matrix (e.g. from get_embeddings(as_array=True)).
+            metadata: Optional metadata dicts, one per matrix row.
+            namespace: Optional namespace for the vectors.
+        
+        Returns:
+            Response from the upsert operation.
+        """
+        if len(ids) != len(matrix):
+            raise ValueError(f"Got {len(ids)} ids for {len(matrix)} vectors")
+        if metadata is not None and len(metadata) != len(matrix):
+            raise ValueError(f"Got {len(metadata)} metadata entries for {len(matrix)} vectors")
+        
+        vectors = [
+            {"id": vector_id, "values": matrix[row], "metadata": metadata[row] if metadata else {}}
+            for row, vector_id in enumerate(ids)
+        ]
+        return await self.upsert_vectors(vectors, namespace=namespace)
     
     @retry(
         stop=stop_after_attempt(3),
@@ -114,8 +347,13 @@ class PineconeService:
         """
         Query vectors from Pinecone.
         
+        Mirrored namespaces are queried locally once the mirror holds them.
+        Results are cached by (quantized) query vector, top_k, namespace and
+        filter for QUERY_CACHE_TTL seconds; writes to a namespace drop its
+        cached results.
+        
         Args:
-            query_vector: The vector to query.
+            query_vector: The vector to query (list or numpy array).
             top_k: Number of results to return.
             namespace: Optional namespace to query.
             filter: Optional metadata filters.
@@ -124,10 +362,24 @@ class PineconeService:
             List of matches.
         """
         try:
+            # The mirror starts empty in each process; until this process has
+            # loaded or upserted the namespace, Pinecone answers
+            if self._is_mirrored(namespace) and self._mirror.has_namespace(namespace):
+                return await self._mirror.query_vectors(query_vector, top_k, namespace, filter)
+            
             # Ensure vector is normalized
             vector = self._normalize_vector(query_vector)
             
-            response = self.index.query(
+            if self._query_cache is not None:
+                cache_key = self._query_cache.make_key(vector, top_k, namespace, filter)
+                cached = self._query_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+                generation = self._query_cache.generation(namespace)
+            
+            index = await self.get_index()
+            response = await asyncio.to_thread(
+                index.query,
                 vector=vector,
                 top_k=top_k,
                 namespace=namespace,
@@ -135,12 +387,51 @@ class PineconeService:
                 include_metadata=True
             )
             
+            if self._query_cache is not None:
+                self._query_cache.set(cache_key, namespace, response["matches"], generation=generation)
             return response["matches"]
         
         except Exception as e:
             logger.error(f"Error querying vectors from Pinecone: {str(e)}")
             raise
     
+    async def query_many(
+        self,
+        query_vectors: List[Union[List[float], np.ndarray]],
+        namespaces: Optional[List[Optional[str]]] = None,
+        top_k: int = 5,
+        filter: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Query several vectors across several namespaces concurrently.
+        
+        Each (vector, namespace) pair is queried as a separate shard (up to
+        SEARCH_MAX_CONCURRENCY at once), and each vector's matches are merged
+        across namespaces by score with duplicate IDs removed. Shards still
+        running at the deadline are dropped and reported.
+        
+        Args:
+            query_vectors: The vectors to query (lists or numpy rows).
+            namespaces: Namespaces to search (default namespace if None).
+            top_k: Number of merged results per query vector.
+            filter: Optional metadata filters.
+            timeout: Deadline in seconds (defaults to SEARCH_TIMEOUT).
+        
+        Returns:
+            Status ("success", "partial" or "failed"), one match list per
+            query vector, and the shards that failed or timed out.
+        """
+        return await scatter_gather(
+            self.query_vectors,
+            query_vectors,
+            namespaces or [None],
+            top_k=top_k,
+            filter=filter,
+            timeout=settings.SEARCH_TIMEOUT if timeout is None else timeout,
+            max_concurrency=settings.SEARCH_MAX_CONCURRENCY
+        )
+    
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=10),
@@ -166,23 +457,32 @@ class PineconeService:
             Response from Pinecone delete operation.
         """
         try:
+            index = await self.get_index()
+            
             if delete_all:
                 # Delete all vectors in namespace
-                self.index.delete(delete_all=True, namespace=namespace)
-                return {"status": "success", "message": f"All vectors deleted from namespace {namespace or 'default'}"}
+                await asyncio.to_thread(index.delete, delete_all=True, namespace=namespace)
+                result = {"status": "success", "message": f"All vectors deleted from namespace {namespace or 'default'}"}
             
             elif ids:
                 # Delete specific vectors by ID
-                self.index.delete(ids=ids, namespace=namespace)
-                return {"status": "success", "count": len(ids)}
+                await asyncio.to_thread(index.delete, ids=ids, namespace=namespace)
+                result = {"status": "success", "count": len(ids)}
             
             elif filter:
                 # Delete vectors by filter
-                self.index.delete(filter=filter, namespace=namespace)
-                return {"status": "success", "message": "Vectors deleted by filter"}
+                await asyncio.to_thread(index.delete, filter=filter, namespace=namespace)
+                result = {"status": "success", "message": "Vectors deleted by filter"}
             
             else:
                 raise ValueError("Must provide either ids, filter, or delete_all=True")
+            
+            # Only mirror the delete once Pinecone has applied it, so a failed
+            # delete never leaves the mirror missing vectors Pinecone still has
+            if self._is_mirrored(namespace):
+                await self._mirror.delete_vectors(ids, filter, namespace, delete_all)
+            self._invalidate_queries(namespace)
+            return result
         
         except Exception as e:
             logger.error(f"Error deleting vectors from Pinecone: {str(e)}")
@@ -199,7 +499,8 @@ class PineconeService:
             Index statistics.
         """
         try:
-            stats = self.index.describe_index_stats()
+            index = await self.get_index()
+            stats = await asyncio.to_thread(index.describe_index_stats)
             if namespace:
                 return {
                     "namespace": namespace,
@@ -210,25 +511,68 @@ class PineconeService:
             logger.error(f"Error getting Pinecone stats: {str(e)}")
             raise
     
-    def _normalize_vector(self, vector: List[float]) -> List[float]:
+    def _invalidate_queries(self, namespace: Optional[str]) -> None:
+        """Drop cached query results for a namespace after a write."""
+        if self._query_cache is not None:
+            self._query_cache.invalidate(namespace)
+    
+    def query_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get query result cache statistics.
+        
+        Returns:
+            Hit/miss counters and hit ratio, or {"enabled": False}
+        """
+        if self._query_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._query_cache.stats()}
+    
+    def _is_mirrored(self, namespace: Optional[str]) -> bool:
+        """Check whether a namespace is served from the local mirror."""
+        return self._mirror is not None and (namespace or "") in self._mirror_namespaces
+    
+    @property
+    def mirror(self) -> Optional[LocalVectorIndex]:
+        """The local index serving LOCAL_MIRROR_NAMESPACES (None if none are mirrored)."""
+        return self._mirror
+    
+    @staticmethod
+    def _to_wire(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Convert numpy vector values to lists for the Pinecone client.
+        
+        Args:
+            batch: Vector records whose 'values' may be numpy rows.
+        
+        Returns:
+            Records with list values.
+        """
+        return [
+            {**record, "values": record["values"].tolist()}
+            if isinstance(record.get("values"), np.ndarray) else record
+            for record in batch
+        ]
+    
+    def _normalize_vector(self, vector: Union[List[float], np.ndarray]) -> List[float]:
         """
         Normalize a vector to unit length for cosine similarity.
         
         Args:
-            vector: The vector to normalize.
+            vector: The vector to normalize (list or numpy array).
         
         Returns:
-            Normalized vector.
+            Normalized vector as a list (the Pinecone wire format).
         """
         try:
-            vector_np = np.array(vector, dtype=np.float32)
+            # No copy for float32 arrays; lists are converted once
+            vector_np = np.asarray(vector, dtype=np.float32)
             norm = np.linalg.norm(vector_np)
             if norm > 0:
                 return (vector_np / norm).tolist()
-            return vector
+            return vector_np.tolist()
         except Exception as e:
             logger.error(f"Error normalizing vector: {str(e)}")
-            return vector
+            return list(vector)
 
 # Create a singleton instance
 pinecone = PineconeService() 
\ No newline at end of file
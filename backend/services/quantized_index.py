@@ -0,0 +1,582 @@
+"""
+Compressed (int8 / product-quantized) vector storage for local namespaces.
+"""
+import abc
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .local_index import LocalVectorIndex, metadata_matches, save_array, save_json
+from .similarity import top_k as select_top_k
+
+logger = logging.getLogger(__name__)
+
+# Rows decoded per matrix product, bounding the float32 scratch memory of a query
+SCORE_CHUNK_SIZE = 16384
+
+def train_product_quantizer(
+    vectors: np.ndarray,
+    n_subvectors: int,
+    n_centroids: int = 256,
+    iterations: int = 10,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Learn one k-means codebook per subvector.
+
+    Args:
+        vectors: (n, dimension) training vectors
+        n_subvectors: Number of subvectors (must divide the dimension)
+        n_centroids: Centroids per codebook (at most 256, one byte per code)
+        iterations: Number of Lloyd iterations
+        seed: Random seed for initialization
+
+    Returns:
+        (n_subvectors, n_centroids, dimension // n_subvectors) codebooks
+    """
+    rng = np.random.default_rng(seed)
+    n, dimension = vectors.shape
+    n_centroids = min(n_centroids, n)
+    sub_dimension = dimension // n_subvectors
+    codebooks = np.empty((n_subvectors, n_centroids, sub_dimension), dtype=np.float32)
+
+    for j in range(n_subvectors):
+        sub = vectors[:, j * sub_dimension:(j + 1) * sub_dimension]
+        centroids = sub[rng.choice(n, n_centroids, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = _nearest_centroids(sub, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sub)
+            counts = np.bincount(assignments, minlength=n_centroids)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty centroids with random points
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sub[rng.choice(n, len(empty), replace=False)]
+        codebooks[j] = centroids
+    return codebooks
+
+def _nearest_centroids(sub: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest (Euclidean) centroid for each row."""
+    assignments = np.empty(len(sub), dtype=np.int64)
+    squared_norms = (centroids ** 2).sum(axis=1)
+    for i in range(0, len(sub), SCORE_CHUNK_SIZE):
+        chunk = sub[i:i + SCORE_CHUNK_SIZE]
+        assignments[i:i + SCORE_CHUNK_SIZE] = np.argmin(squared_norms - 2 * chunk @ centroids.T, axis=1)
+    return assignments
+
+def _encode_product(vectors: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Encode each subvector as the index of its nearest centroid."""
+    n_subvectors, _, sub_dimension = codebooks.shape
+    codes = np.empty((len(vectors), n_subvectors), dtype=np.uint8)
+    for j in range(n_subvectors):
+        codes[:, j] = _nearest_centroids(vectors[:, j * sub_dimension:(j + 1) * sub_dimension], codebooks[j])
+    return codes
+
+class _QuantizedNamespace(abc.ABC):
+    """Vectors of one namespace stored as compact codes.
+
+    Queries score every row from its codes. With rerank > 0 the original
+    float32 vectors are kept too, and the best rerank candidates are
+    re-scored exactly. Originals that are only read for re-ranking live in
+    a disk-backed memory map (a temporary file in spill_dir, or the saved
+    vectors.npy once loaded), so they only cost resident memory for the
+    pages of re-ranked rows.
+    """
+
+    kind = ""
+    code_dtype: Any = np.uint8
+
+    def __init__(
+        self,
+        dimension: int,
+        rerank: int = 0,
+        capacity: int = 1024,
+        spill_dir: Optional[str] = None,
+        **options: Any
+    ):
+        """
+        Initialize the namespace.
+
+        Args:
+            dimension: Vector dimension
+            rerank: Candidates re-scored with the original vectors (0 disables)
+            capacity: Initial row capacity
+            spill_dir: Directory for the disk-backed originals (the system
+                temporary directory if None)
+        """
+        self.dimension = dimension
+        self.rerank = rerank
+        self.spill_dir = spill_dir
+        self.ids: List[str] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self.positions: Dict[str, int] = {}
+        self.codes = np.zeros((capacity, self.code_size), dtype=self.code_dtype)
+        self.originals: Optional[np.ndarray] = (
+            self._allocate_originals(capacity) if self.keeps_originals else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    @abc.abstractmethod
+    def code_size(self) -> int:
+        """Bytes of code per vector."""
+
+    @property
+    def keeps_originals(self) -> bool:
+        """Whether the original float32 vectors are stored."""
+        return self.rerank > 0
+
+    @property
+    def spills_originals(self) -> bool:
+        """Whether the originals are only read for re-ranking, and so kept on disk."""
+        return self.rerank > 0
+
+    def _allocate_originals(self, capacity: int) -> np.ndarray:
+        """Allocate zeroed storage for original vectors, disk-backed when they spill."""
+        if not self.spills_originals:
+            return np.zeros((capacity, self.dimension), dtype=np.float32)
+        # The map keeps the unlinked file alive; the OS pages rows in on demand
+        with tempfile.TemporaryFile(dir=self.spill_dir) as f:
+            return np.memmap(f, dtype=np.float32, mode="w+", shape=(max(capacity, 1), self.dimension))
+
+    @abc.abstractmethod
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode unit vectors into codes."""
+
+    @abc.abstractmethod
+    def _approximate_scores(self, vector: np.ndarray, size: int) -> np.ndarray:
+        """Approximate inner products of the query with the first size rows."""
+
+    def _reserve(self, size: int) -> None:
+        """Grow the storage geometrically so appends are amortized O(1)."""
+        if size <= len(self.codes):
+            return
+        capacity = max(size, len(self.codes) * 2, 1024)
+        count = len(self.ids)
+        codes = np.zeros((capacity, self.code_size), dtype=self.code_dtype)
+        codes[:count] = self.codes[:count]
+        self.codes = codes
+        if self.originals is not None:
+            originals = self._allocate_originals(capacity)
+            originals[:count] = self.originals[:count]
+            self.originals = originals
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: List[Dict[str, Any]]) -> None:
+        """Insert or overwrite rows; vectors must already be normalized."""
+        # Later duplicates of an ID within one call win
+        latest = {vector_id: i for i, vector_id in enumerate(ids)}
+        rows = sorted(latest.values())
+        self._reserve(len(self.ids) + len(rows))
+
+        positions = np.empty(len(rows), dtype=np.int64)
+        for n, i in enumerate(rows):
+            position = self.positions.get(ids[i])
+            if position is None:
+                position = len(self.ids)
+                self.positions[ids[i]] = position
+                self.ids.append(ids[i])
+                self.metadata.append(metadata[i])
+            else:
+                self.metadata[position] = metadata[i]
+            positions[n] = position
+
+        vectors = vectors[rows]
+        self.codes[positions] = self._encode(vectors)
+        if self.originals is not None:
+            self.originals[positions] = vectors
+
+    def delete(self, ids: List[str]) -> int:
+        """Delete rows by ID, moving the last row into each freed slot."""
+        deleted = 0
+        for vector_id in ids:
+            position = self.positions.pop(vector_id, None)
+            if position is None:
+                continue
+            last = len(self.ids) - 1
+            if position != last:
+                self.codes[position] = self.codes[last]
+                if self.originals is not None:
+                    self.originals[position] = self.originals[last]
+                self.ids[position] = self.ids[last]
+                self.metadata[position] = self.metadata[last]
+                self.positions[self.ids[position]] = position
+            self.ids.pop()
+            self.metadata.pop()
+            deleted += 1
+        return deleted
+
+    def matching_ids(self, filter: Dict[str, Any]) -> List[str]:
+        """IDs whose metadata satisfies a filter."""
+        return [
+            vector_id for vector_id, meta in zip(self.ids, self.metadata)
+            if metadata_matches(meta, filter)
+        ]
+
+    def query(self, vector: np.ndarray, top_k: int, filter: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Approximate cosine search over the codes, optionally re-ranked exactly."""
+        size = len(self.ids)
+        if not size:
+            return []
+
+        scores = self._approximate_scores(vector, size)
+        if filter:
+            mask = np.fromiter(
+                (metadata_matches(meta, filter) for meta in self.metadata),
+                dtype=bool,
+                count=size
+            )
+            scores = np.where(mask, scores, -np.inf)
+            top_k = min(top_k, int(mask.sum()))
+
+        if self.originals is not None and self.rerank > top_k:
+            candidates, _ = select_top_k(scores, self.rerank)
+            candidates = candidates[np.isfinite(scores[candidates])]
+            order, best = select_top_k(self.originals[candidates] @ vector, top_k)
+            indices = candidates[order]
+        else:
+            indices, best = select_top_k(scores, top_k)
+        return [
+            {"id": self.ids[i], "score": float(score), "metadata": self.metadata[i]}
+            for i, score in zip(indices, best)
+        ]
+
+    def _codebook_bytes(self) -> int:
+        """Bytes of codec-specific arrays (codebooks) held in memory."""
+        return 0
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Bytes used by the stored rows.
+
+        Originals in a memory map are counted as mapped, not resident: only
+        the pages of rows actually re-ranked are read into memory.
+
+        Returns:
+            Code, codebook, resident original and mapped original bytes, the
+            resident total and resident bytes per vector
+        """
+        size = len(self.ids)
+        code_bytes = size * self.code_size * self.codes.itemsize
+        codebook_bytes = self._codebook_bytes()
+        original_bytes = size * self.dimension * 4 if self.originals is not None else 0
+        mapped = isinstance(self.originals, np.memmap)
+        resident_bytes = code_bytes + codebook_bytes + (0 if mapped else original_bytes)
+        return {
+            "code_bytes": code_bytes,
+            "codebook_bytes": codebook_bytes,
+            "original_bytes": 0 if mapped else original_bytes,
+            "mapped_bytes": original_bytes if mapped else 0,
+            "resident_bytes": resident_bytes,
+            "bytes_per_vector": resident_bytes // size if size else 0,
+        }
+
+    def _save_arrays(self, directory: str) -> None:
+        """Write codec-specific arrays (codebooks) next to the codes."""
+
+    def _load_arrays(self, directory: str) -> None:
+        """Read codec-specific arrays written by _save_arrays()."""
+
+    def save(self, directory: str) -> None:
+        """Write the namespace to a directory."""
+        size = len(self)
+        save_array(os.path.join(directory, "codes.npy"), self.codes[:size])
+        if self.originals is not None:
+            save_array(os.path.join(directory, "vectors.npy"), self.originals[:size])
+        self._save_arrays(directory)
+        save_json(os.path.join(directory, "records.json"), {"ids": self.ids, "metadata": self.metadata})
+
+    @classmethod
+    def load(cls, directory: str, dimension: int, **options: Any) -> "_QuantizedNamespace":
+        """Read a namespace written by save(), memory-mapping the original vectors."""
+        with open(os.path.join(directory, "records.json")) as f:
+            records = json.load(f)
+        space = cls(dimension, capacity=0, **options)
+        space._load_arrays(directory)
+        space.codes = np.load(os.path.join(directory, "codes.npy"))
+        vectors_path = os.path.join(directory, "vectors.npy")
+        if space.originals is not None:
+            if not os.path.exists(vectors_path):
+                raise ValueError(f"Namespace at {directory} was saved without original vectors")
+            space.originals = np.load(vectors_path, mmap_mode="c")
+        space.ids = records["ids"]
+        space.metadata = records["metadata"]
+        space.positions = {vector_id: i for i, vector_id in enumerate(space.ids)}
+        return space
+
+class Int8Namespace(_QuantizedNamespace):
+    """Scalar-quantized namespace: one int8 per dimension (4x smaller).
+
+    Each row is scaled so its largest component maps to +/-127. Stored
+    vectors are unit-norm, so the scale is recovered at query time from the
+    norm of the codes rather than stored per row.
+    """
+
+    kind = "int8"
+    code_dtype = np.int8
+
+    @property
+    def code_size(self) -> int:
+        """Bytes of code per vector."""
+        return self.dimension
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Scale each row so its largest component maps to +/-127."""
+        peaks = np.abs(vectors).max(axis=1)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        return np.rint(vectors / scales[:, None]).astype(np.int8)
+
+    def _approximate_scores(self, vector: np.ndarray, size: int) -> np.ndarray:
+        """Decode and score the codes chunk by chunk, normalizing each row."""
+        scores = np.empty(size, dtype=np.float32)
+        for i in range(0, size, SCORE_CHUNK_SIZE):
+            end = min(i + SCORE_CHUNK_SIZE, size)
+            chunk = self.codes[i:end].astype(np.float32)
+            norms = np.sqrt(np.einsum("ij,ij->i", chunk, chunk))
+            scores[i:end] = (chunk @ vector) / np.where(norms > 0, norms, 1.0)
+        return scores
+
+class PQNamespace(_QuantizedNamespace):
+    """Product-quantized namespace: one byte per subvector.
+
+    Until min_train_size vectors have been added, rows are kept in full
+    precision and searched exactly; at that size the codebooks are trained
+    and every row is encoded. Queries sum per-subvector lookup tables
+    (asymmetric distance computation), so codes are never decoded.
+
+    Like IVFNamespace, training is split into training_snapshot(), fit()
+    and apply_training() so the index can fit the codebooks off the event
+    loop; rows written in the meantime are re-encoded when it is applied.
+    """
+
+    kind = "pq"
+
+    def __init__(
+        self,
+        dimension: int,
+        rerank: int = 0,
+        capacity: int = 1024,
+        n_subvectors: int = 96,
+        min_train_size: int = 10000,
+        seed: int = 0,
+        spill_dir: Optional[str] = None
+    ):
+        """
+        Initialize the namespace.
+
+        Args:
+            dimension: Vector dimension
+            rerank: Candidates re-scored with the original vectors (0 disables)
+            capacity: Initial row capacity
+            n_subvectors: Subvectors (code bytes) per vector; must divide the dimension
+            min_train_size: Vector count at which codebooks are trained
+            seed: Random seed for training
+            spill_dir: Directory for the disk-backed originals (the system
+                temporary directory if None)
+        """
+        if dimension % n_subvectors:
+            raise ValueError(f"Dimension {dimension} is not divisible by {n_subvectors} subvectors")
+        self.n_subvectors = n_subvectors
+        self.min_train_size = min_train_size
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None
+        # IDs written since the training snapshot (None when not training)
+        self._changed: Optional[set] = None
+        super().__init__(dimension, rerank=rerank, capacity=capacity, spill_dir=spill_dir)
+
+    @property
+    def code_size(self) -> int:
+        """Bytes of code per vector."""
+        return self.n_subvectors
+
+    @property
+    def trained(self) -> bool:
+        """Whether the codebooks have been trained."""
+        return self.codebooks is not None
+
+    @property
+    def keeps_originals(self) -> bool:
+        """Originals are kept until training, and afterwards only for re-ranking."""
+        return self.rerank > 0 or not self.trained
+
+    @property
+    def spills_originals(self) -> bool:
+        """Untrained rows are searched from the originals, so they stay in memory until training."""
+        return self.rerank > 0 and self.trained
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode each subvector as its nearest centroid (zeros before training)."""
+        if self.trained:
+            return _encode_product(vectors, self.codebooks)
+        return np.zeros((len(vectors), self.n_subvectors), dtype=np.uint8)
+
+    @property
+    def needs_training(self) -> bool:
+        """Whether the namespace has reached the size at which codebooks are trained."""
+        return not self.trained and len(self) >= self.min_train_size
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: List[Dict[str, Any]]) -> None:
+        """Insert or overwrite rows, remembering them if a training is in flight."""
+        super().upsert(ids, vectors, metadata)
+        if self._changed is not None:
+            self._changed.update(ids)
+
+    def training_snapshot(self) -> Tuple[List[str], np.ndarray]:
+        """Copy the IDs and full-precision rows for fit()."""
+        size = len(self)
+        self._changed = set()
+        return list(self.ids), np.array(self.originals[:size])
+
+    def fit(self, snapshot: Tuple[List[str], np.ndarray]) -> Dict[str, Any]:
+        """
+        Train codebooks on a snapshot and encode it (safe in a worker thread).
+
+        Args:
+            snapshot: (ids, vectors) returned by training_snapshot()
+
+        Returns:
+            The snapshot IDs, codebooks and codes
+        """
+        ids, vectors = snapshot
+        rng = np.random.default_rng(self.seed)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), 65536), replace=False)]
+        codebooks = train_product_quantizer(sample, self.n_subvectors, seed=self.seed)
+        return {"ids": ids, "codebooks": codebooks, "codes": _encode_product(vectors, codebooks)}
+
+    def apply_training(self, fitted: Dict[str, Any]) -> None:
+        """
+        Install codebooks returned by fit() and encode every row.
+
+        Rows written since the snapshot, and rows moved by deletes, are
+        matched by ID; only rows upserted in the meantime are encoded here.
+        """
+        changed, self._changed = self._changed or set(), None
+        size = len(self)
+        self.codebooks = fitted["codebooks"]
+        if not changed and self.ids == fitted["ids"]:
+            self.codes[:size] = fitted["codes"]
+        else:
+            snapshot_rows = {vector_id: row for row, vector_id in enumerate(fitted["ids"])}
+            rows = np.fromiter(
+                (-1 if vector_id in changed else snapshot_rows.get(vector_id, -1) for vector_id in self.ids),
+                dtype=np.int64,
+                count=size
+            )
+            known = rows >= 0
+            self.codes[:size][known] = fitted["codes"][rows[known]]
+            stale = np.flatnonzero(~known)
+            if len(stale):
+                self.codes[stale] = _encode_product(self.originals[stale], self.codebooks)
+        if not self.keeps_originals:
+            self.originals = None
+        elif not isinstance(self.originals, np.memmap):
+            originals = self._allocate_originals(len(self.codes))
+            originals[:size] = self.originals[:size]
+            self.originals = originals
+        logger.info(f"Trained product quantizer with {self.n_subvectors} subvectors over {size} vectors")
+
+    def train(self) -> None:
+        """Train the codebooks on the stored vectors and encode every row."""
+        self.apply_training(self.fit(self.training_snapshot()))
+
+    def _approximate_scores(self, vector: np.ndarray, size: int) -> np.ndarray:
+        """Sum per-subvector inner products looked up by code."""
+        if not self.trained:
+            return self.originals[:size] @ vector
+        sub_dimension = self.dimension // self.n_subvectors
+        # (n_subvectors, n_centroids) inner products of each query subvector with each centroid
+        tables = np.einsum("jcd,jd->jc", self.codebooks, vector.reshape(self.n_subvectors, sub_dimension))
+        scores = np.zeros(size, dtype=np.float32)
+        for j in range(self.n_subvectors):
+            scores += tables[j][self.codes[:size, j]]
+        return scores
+
+    def _codebook_bytes(self) -> int:
+        """Bytes of the trained codebooks."""
+        return self.codebooks.nbytes if self.trained else 0
+
+    def _save_arrays(self, directory: str) -> None:
+        """Write the codebooks, if trained (untrained rows are saved as full vectors)."""
+        if self.trained:
+            save_array(os.path.join(directory, "codebooks.npy"), self.codebooks)
+
+    def _load_arrays(self, directory: str) -> None:
+        """Read the codebooks, if the namespace was trained."""
+        codebooks_path = os.path.join(directory, "codebooks.npy")
+        if os.path.exists(codebooks_path):
+            self.codebooks = np.load(codebooks_path)
+            if not self.keeps_originals:
+                self.originals = None
+
+class QuantizedVectorIndex(LocalVectorIndex):
+    """Local vector index storing compressed vectors (int8 or product-quantized)."""
+
+    def __init__(
+        self,
+        dimension: int = 1536,
+        path: Optional[str] = None,
+        codec: str = "int8",
+        rerank: int = 0,
+        n_subvectors: int = 96,
+        min_train_size: int = 10000,
+        seed: int = 0,
+        spill_dir: Optional[str] = None
+    ):
+        """
+        Initialize the quantized index.
+
+        Args:
+            dimension: Vector dimension
+            path: Directory to load from and save to (optional)
+            codec: "int8" (~4x smaller, near-exact) or "pq" (dimension/n_subvectors
+                   times 4 smaller codes, requires rerank)
+            rerank: Candidates re-scored with full-precision vectors (0 disables;
+                    keeps the originals in a disk-backed memory map). PQ codes
+                    alone rank too poorly to use, so "pq" needs rerank > 0
+            n_subvectors: Code bytes per vector for "pq"
+            min_train_size: Namespace size at which "pq" codebooks are trained
+            seed: Random seed for "pq" training
+            spill_dir: Directory for the re-ranking originals' backing files
+                       (the system temporary directory if None)
+        """
+        if codec == "int8":
+            self._namespace_class = Int8Namespace
+            options: Dict[str, Any] = {"rerank": rerank, "spill_dir": spill_dir}
+        elif codec == "pq":
+            if rerank <= 0:
+                raise ValueError("The pq codec needs rerank > 0 (LOCAL_INDEX_RERANK) for usable recall")
+            self._namespace_class = PQNamespace
+            options = {
+                "rerank": rerank,
+                "n_subvectors": n_subvectors,
+                "min_train_size": min_train_size,
+                "seed": seed,
+                "spill_dir": spill_dir,
+            }
+        else:
+            raise ValueError(f"Unsupported vector codec: {codec}")
+        super().__init__(dimension, path, **options)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Bytes used by stored vectors across all namespaces.
+
+        Returns:
+            Code, codebook, resident original, mapped original and resident
+            total bytes, and vector count
+        """
+        usage = dict.fromkeys(
+            ("code_bytes", "codebook_bytes", "original_bytes", "mapped_bytes", "resident_bytes", "vectors"), 0
+        )
+        for space in self._namespaces.values():
+            space_usage = space.memory_usage()
+            for key in usage:
+                if key != "vectors":
+                    usage[key] += space_usage[key]
+            usage["vectors"] += len(space)
+        return usage
@@ -0,0 +1,166 @@
+"""
+Query cache module for reusing recent vector search results.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class QueryCache:
+    """In-memory LRU cache of query results with a TTL and per-namespace invalidation."""
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 300.0, decimals: int = 4):
+        """
+        Initialize the query cache.
+
+        Args:
+            max_entries: Maximum number of result sets kept
+            ttl: Seconds a result set stays valid
+            decimals: Decimal places query vectors are rounded to before
+                hashing, so near-identical vectors share an entry
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._scale = 10 ** decimals
+        self._entries: "OrderedDict[str, Tuple[float, str, List[Dict[str, Any]]]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "expirations": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def make_key(
+        self,
+        vector: Union[Sequence[float], np.ndarray],
+        top_k: int,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Build the cache key for a query.
+
+        Args:
+            vector: Query vector (normalized by the caller)
+            top_k: Number of results requested
+            namespace: Namespace queried
+            filter: Metadata filter
+
+        Returns:
+            Hex digest identifying (quantized vector, top_k, namespace, filter)
+        """
+        quantized = np.round(np.asarray(vector, dtype=np.float64) * self._scale).astype(np.int32)
+        digest = hashlib.sha256(quantized.tobytes())
+        digest.update(json.dumps([top_k, namespace or "", filter], sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def generation(self, namespace: Optional[str]) -> int:
+        """
+        Get the write generation of a namespace.
+
+        Capture it before running a query and pass it to set(), so results
+        of a query that raced with a write are not cached.
+        """
+        with self._lock:
+            return self._generations.get(namespace or "", 0)
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up a result set.
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            Copy of the cached matches, or None on a miss or expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] >= self._ttl:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return list(entry[2])
+
+    def set(
+        self,
+        key: str,
+        namespace: Optional[str],
+        matches: List[Dict[str, Any]],
+        generation: Optional[int] = None
+    ) -> None:
+        """
+        Store a result set.
+
+        Args:
+            key: Cache key from make_key()
+            namespace: Namespace the results came from
+            matches: Query matches to cache
+            generation: Namespace generation captured before the query; the
+                results are dropped if the namespace was written since
+        """
+        namespace = namespace or ""
+        with self._lock:
+            if generation is not None and generation != self._generations.get(namespace, 0):
+                return
+            self._entries[key] = (time.monotonic(), namespace, list(matches))
+            self._entries.move_to_end(key)
+            self._stats["writes"] += 1
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, namespace: Optional[str]) -> int:
+        """
+        Drop every cached result of a namespace.
+
+        Args:
+            namespace: Namespace that was written to
+
+        Returns:
+            Number of entries removed
+        """
+        namespace = namespace or ""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            stale = [key for key, entry in self._entries.items() if entry[1] == namespace]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} cached queries for namespace {namespace or 'default'}")
+        return len(stale)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Hit/miss/eviction counters, hit ratio and current size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
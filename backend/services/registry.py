@@ -0,0 +1,240 @@
+"""
+Service registry module for building service clients on first use.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+ShutdownHook = Callable[[Any], Union[None, Awaitable[None]]]
+
+class ServiceRegistry:
+    """Registry of lazily built service singletons with startup/shutdown hooks."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._shutdown_hooks: Dict[str, ShutdownHook] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        shutdown: Optional[ShutdownHook] = None
+    ) -> None:
+        """
+        Register a service.
+
+        Args:
+            name: Service name
+            factory: Zero-argument callable building the service
+            shutdown: Optional callable (sync or async) run on the built
+                service at shutdown
+        """
+        with self._lock:
+            self._factories[name] = factory
+            if shutdown is not None:
+                self._shutdown_hooks[name] = shutdown
+
+    def register_module(
+        self,
+        name: str,
+        module: str,
+        attribute: Optional[str] = None,
+        shutdown: Optional[ShutdownHook] = None
+    ) -> None:
+        """
+        Register a module-level singleton, imported on first use.
+
+        Args:
+            name: Service name
+            module: Dotted module path defining the singleton
+            attribute: Singleton attribute name (defaults to the service name)
+            shutdown: Optional callable run on the service at shutdown
+        """
+        self.register(
+            name,
+            lambda: getattr(importlib.import_module(module), attribute or name),
+            shutdown=shutdown
+        )
+
+    def get(self, name: str) -> Any:
+        """
+        Get a service, building it on first use.
+
+        Args:
+            name: Registered service name
+
+        Returns:
+            The service instance
+
+        Raises:
+            KeyError: If no service is registered under the name
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown service: {name}")
+                self._instances[name] = self._factories[name]()
+                logger.info(f"Service {name} initialized")
+            return self._instances[name]
+
+    def is_built(self, name: str) -> bool:
+        """Check whether a service has been built."""
+        return name in self._instances
+
+    @property
+    def names(self) -> List[str]:
+        """Get the registered service names."""
+        return list(self._factories)
+
+    async def startup(self, names: Optional[List[str]] = None) -> None:
+        """
+        Build services ahead of first use, from worker threads.
+
+        Args:
+            names: Services to build (none if None, so startup stays fast)
+        """
+        for name in names or []:
+            await asyncio.to_thread(self.get, name)
+
+    async def shutdown(self) -> None:
+        """Run the shutdown hooks of built services, in reverse build order."""
+        for name in reversed(list(self._instances)):
+            hook = self._shutdown_hooks.get(name)
+            if hook is None:
+                continue
+            try:
+                result = hook(self._instances[name])
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error shutting down service {name}: {str(e)}")
+        with self._lock:
+            self._instances.clear()
+
+def _lexical_index_path() -> Optional[str]:
+    """File the BM25 index is persisted to: LEXICAL_INDEX_PATH, else next to LOCAL_INDEX_DIR."""
+    from config.settings import get_settings
+    settings = get_settings()
+    if settings.LEXICAL_INDEX_PATH:
+        return settings.LEXICAL_INDEX_PATH
+    if settings.LOCAL_INDEX_DIR:
+        return os.path.join(settings.LOCAL_INDEX_DIR, "lexical.json")
+    return None
+
+def _build_lexical_index() -> Any:
+    """Create the BM25 index configured in settings, loading it if it was saved."""
+    from config.settings import get_settings
+    from .lexical_index import LexicalIndex
+    settings = get_settings()
+    return LexicalIndex(k1=settings.LEXICAL_BM25_K1, b=settings.LEXICAL_BM25_B, path=_lexical_index_path())
+
+async def _save_lexical_index(index: Any) -> None:
+    """Persist the BM25 index, snapshotting it on the event loop and writing it in a thread."""
+    if not index.path:
+        return
+    await asyncio.to_thread(index.save, index.path, index.to_dict())
+
+def _build_local_index() -> Any:
+    """Create the in-process vector index configured by LOCAL_INDEX_TYPE."""
+    from .vector_store import create_local_index
+    return create_local_index()
+
+async def _save_local_index(index: Any) -> None:
+    """Let background training finish, then persist the index to LOCAL_INDEX_DIR."""
+    from config.settings import get_settings
+    directory = get_settings().LOCAL_INDEX_DIR
+    if not directory:
+        return
+    await index.wait_for_training()
+    await asyncio.to_thread(index.save, directory)
+
+async def _save_pinecone_mirror(service: Any) -> None:
+    """Persist the Pinecone service's local mirror like the local index, if it has one."""
+    if service.mirror is not None:
+        await _save_local_index(service.mirror)
+
+def _build_hybrid_retriever() -> Any:
+    """Create the hybrid retriever over the configured vector store."""
+    from config.settings import get_settings
+    from .hybrid_search import HybridRetriever
+    from .vector_store import get_vector_store
+    settings = get_settings()
+    return HybridRetriever(
+        registry.get("lexical_index"),
+        get_vector_store(),
+        registry.get("embeddings_service"),
+        candidates=settings.HYBRID_CANDIDATES,
+        rrf_k=settings.HYBRID_RRF_K
+    )
+
+def _build_upload_manager() -> Any:
+    """Create the context upload manager."""
+    from config.settings import get_settings
+    from .uploads import UploadManager
+    return UploadManager(get_settings().UPLOAD_SPOOL_DIR)
+
+def _build_job_queue() -> Any:
+    """Create the job queue and register the job handlers."""
+    from config.settings import get_settings
+    from .delegation import run_delegation_job
+    from .jobs import JobQueue, JobStore
+    from .uploads import run_upload_job
+    settings = get_settings()
+    queue = JobQueue(
+        JobStore(settings.JOB_QUEUE_PATH),
+        default_concurrency=settings.JOB_DEFAULT_CONCURRENCY,
+        concurrency=settings.JOB_CONCURRENCY,
+        visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        poll_interval=settings.JOB_POLL_INTERVAL,
+        retry_base_delay=settings.JOB_RETRY_BASE_DELAY,
+        retry_max_delay=settings.JOB_RETRY_MAX_DELAY
+    )
+    queue.register("context_upload", run_upload_job)
+    queue.register("delegation", run_delegation_job)
+    return queue
+
+async def _stop_job_queue(queue: Any) -> None:
+    """Stop the job workers and close the job store."""
+    await queue.stop()
+    queue.close()
+
+async def _close_db_client(service: Any) -> None:
+    """Close the shared Supabase data client (idempotent, so both data services can use it)."""
+    from db.client import close_async_client
+    await close_async_client()
+
+registry = ServiceRegistry()
+registry.register_module("supabase", "services.supabase", shutdown=_close_db_client)
+registry.register_module("pinecone", "services.pinecone", shutdown=_save_pinecone_mirror)
+registry.register_module("autogen_service", "services.autogen")
+registry.register_module("embeddings_service", "services.embeddings", shutdown=lambda service: service.close())
+registry.register_module("db", "db.database", shutdown=_close_db_client)
+registry.register("local_index", lambda: _build_local_index(), shutdown=_save_local_index)
+registry.register("lexical_index", lambda: _build_lexical_index(), shutdown=_save_lexical_index)
+registry.register("hybrid_retriever", lambda: _build_hybrid_retriever())
+registry.register("upload_manager", lambda: _build_upload_manager())
+registry.register("job_queue", lambda: _build_job_queue(), shutdown=_stop_job_queue)
+
+def get_service(name: str) -> Any:
+    """
+    Get a registered service, building it on first use.
+
+    Args:
+        name: Service name (e.g. "pinecone", "embeddings_service")
+
+    Returns:
+        The service instance
+    """
+    return registry.get(name)
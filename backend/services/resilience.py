@@ -0,0 +1,195 @@
+"""
+Resilience module for retrying remote calls and failing fast while a backend is down.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            name: Backend name used in logs and errors
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to wait before letting a trial call through
+        """
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        """Get the current state: "closed", "open" or "half_open"."""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self._reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        Check that a call may proceed.
+
+        Returns:
+            Whether this call took the half-open trial slot; pass it to
+            record_success, record_failure or release
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a
+                trial call already in flight
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            self._stats["rejected"] += 1
+            raise CircuitOpenError(f"Circuit breaker for {self.name} is open")
+        trial = state == "half_open"
+        if trial:
+            self._trial_in_flight = True
+        self._stats["calls"] += 1
+        return trial
+
+    def record_success(self, trial: bool = False) -> None:
+        """
+        Close the circuit after a successful call.
+
+        Args:
+            trial: Whether the call held the half-open trial slot
+        """
+        if self._opened_at is not None:
+            logger.info(f"Circuit breaker for {self.name} closed")
+        self._failures = 0
+        self._opened_at = None
+        if trial:
+            self._trial_in_flight = False
+
+    def record_failure(self, trial: bool = False) -> None:
+        """
+        Count a failed call, opening the circuit at the threshold.
+
+        A failed trial call reopens the circuit; only it frees the trial
+        slot, so a call started before the circuit opened cannot let a
+        second trial through.
+
+        Args:
+            trial: Whether the call held the half-open trial slot
+        """
+        self._stats["failures"] += 1
+        self._failures += 1
+        if trial:
+            self._trial_in_flight = False
+        if trial or (self._opened_at is None and self._failures >= self._failure_threshold):
+            logger.warning(
+                f"Circuit breaker for {self.name} opened after {self._failures} consecutive failures"
+            )
+            self._opened_at = time.monotonic()
+            self._stats["opened"] += 1
+
+    def release(self, trial: bool) -> None:
+        """
+        Give up a call without recording an outcome.
+
+        Args:
+            trial: Whether the call held the half-open trial slot (freed if so)
+        """
+        if trial:
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get circuit breaker statistics.
+
+        Returns:
+            Current state, consecutive failures and call counters
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["state"] = self.state
+        stats["consecutive_failures"] = self._failures
+        return stats
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Compute a "full jitter" exponential backoff delay.
+
+    Args:
+        attempt: Zero-based number of the attempt that just failed
+        base_delay: Delay cap for the first retry, in seconds
+        max_delay: Upper bound for any delay, in seconds
+
+    Returns:
+        Random delay between 0 and min(max_delay, base_delay * 2 ** attempt)
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+async def retry_async(
+    fn: Callable[[], Awaitable[T]],
+    attempts: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 10.0,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    breaker: Optional[CircuitBreaker] = None,
+    description: str = "call"
+) -> T:
+    """
+    Await a call, retrying transient failures with jittered backoff.
+
+    Args:
+        fn: Zero-argument coroutine function performing one attempt
+        attempts: Maximum number of attempts
+        base_delay: Backoff delay cap for the first retry, in seconds
+        max_delay: Upper bound for any backoff delay, in seconds
+        retry_on: Exception types that are retried and count as backend failures
+        breaker: Optional circuit breaker guarding the backend
+        description: What is being called, for logs
+
+    Returns:
+        Result of the first successful attempt
+
+    Raises:
+        CircuitOpenError: If the breaker rejects an attempt
+        Exception: The last error once attempts are exhausted, or any
+            error that is not retryable
+    """
+    for attempt in range(attempts):
+        trial = breaker.before_call() if breaker is not None else False
+        try:
+            result = await fn()
+        except retry_on as e:
+            if breaker is not None:
+                breaker.record_failure(trial)
+            if attempt + 1 >= attempts:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(
+                f"Retrying {description} in {delay:.2f}s after attempt {attempt + 1}/{attempts} failed: {str(e)}"
+            )
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release(trial)
+            raise
+        except Exception:
+            # A non-retryable error means the backend answered; it is not down
+            if breaker is not None:
+                breaker.record_success(trial)
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success(trial)
+            return result
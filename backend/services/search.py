@@ -0,0 +1,162 @@
+"""
+Search module for scatter-gather vector queries and rank fusion.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QueryFn = Callable[..., Awaitable[List[Any]]]
+
+def _metadata(match: Any) -> Dict[str, Any]:
+    """Metadata of a match (dict or Pinecone ScoredVector)."""
+    if isinstance(match, dict):
+        metadata = match.get("metadata")
+    else:
+        metadata = getattr(match, "metadata", None)
+    return metadata or {}
+
+def _as_dict(match: Any, namespace: Optional[str]) -> Dict[str, Any]:
+    """Convert a match (dict or Pinecone ScoredVector) to a dict tagged with its namespace."""
+    return {
+        "id": match["id"],
+        "score": float(match["score"]),
+        "metadata": _metadata(match),
+        "namespace": namespace or "",
+    }
+
+def merge_matches(shards: Sequence[Tuple[Optional[str], List[Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Merge matches from several namespaces into one ranking.
+
+    Args:
+        shards: (namespace, matches) pairs for a single query vector
+        top_k: Number of results to keep
+
+    Returns:
+        Matches sorted by descending score, each ID kept once (at its best
+        score), with the namespace it came from
+    """
+    best: Dict[str, Dict[str, Any]] = {}
+    for namespace, matches in shards:
+        for match in matches:
+            match = _as_dict(match, namespace)
+            current = best.get(match["id"])
+            if current is None or match["score"] > current["score"]:
+                best[match["id"]] = match
+    return sorted(best.values(), key=lambda match: match["score"], reverse=True)[:top_k]
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[List[Any]],
+    top_k: int = 5,
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fuse several rankings of the same items by reciprocal rank.
+
+    Each item scores sum(weight / (k + rank)) over the rankings it appears
+    in, so items ranked well by several retrievers rise to the top without
+    having to calibrate their raw scores against each other.
+
+    Args:
+        rankings: Match lists ('id', 'score', 'metadata'), each best first
+        top_k: Number of fused results to return
+        k: Rank smoothing constant (60 in the original RRF paper)
+        weights: Optional weight per ranking (default 1.0 each)
+
+    Returns:
+        Matches with the fused 'score' and each ranking's rank under 'ranks'
+        (None where the item was not retrieved), best first
+    """
+    weights = list(weights) if weights is not None else [1.0] * len(rankings)
+    fused: Dict[str, Dict[str, Any]] = {}
+    for n, (ranking, weight) in enumerate(zip(rankings, weights)):
+        for rank, match in enumerate(ranking, start=1):
+            entry = fused.get(match["id"])
+            if entry is None:
+                entry = {
+                    "id": match["id"],
+                    "score": 0.0,
+                    "metadata": _metadata(match),
+                    "ranks": [None] * len(rankings),
+                }
+                fused[match["id"]] = entry
+            if entry["ranks"][n] is None:
+                entry["ranks"][n] = rank
+                entry["score"] += weight / (k + rank)
+    return sorted(fused.values(), key=lambda match: match["score"], reverse=True)[:top_k]
+
+async def scatter_gather(
+    query_fn: QueryFn,
+    query_vectors: Sequence[Union[List[float], np.ndarray]],
+    namespaces: Sequence[Optional[str]],
+    top_k: int = 5,
+    filter: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+    max_concurrency: int = 8
+) -> Dict[str, Any]:
+    """
+    Run every query vector against every namespace concurrently and merge.
+
+    Shards (one query against one namespace) that fail or miss the deadline
+    are reported and left out, so slow namespaces only degrade the result.
+
+    Args:
+        query_fn: Single-query search (query_vector, top_k, namespace, filter)
+        query_vectors: Query vectors (list or numpy rows)
+        namespaces: Namespaces to search (None for the default namespace)
+        top_k: Number of merged results per query vector
+        filter: Optional metadata filter applied in every namespace
+        timeout: Deadline in seconds for the whole search (None waits for all)
+        max_concurrency: Shard queries in flight at once
+
+    Returns:
+        Overall status ("success", "partial" or "failed"), one merged match
+        list per query vector, and the shards that failed or timed out
+    """
+    namespaces = list(namespaces) or [None]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_shard(vector: Any, namespace: Optional[str]) -> List[Any]:
+        async with semaphore:
+            return await query_fn(vector, top_k, namespace, filter)
+
+    shards = {
+        asyncio.ensure_future(run_shard(vector, namespace)): (i, namespace)
+        for i, vector in enumerate(query_vectors)
+        for namespace in namespaces
+    }
+    if not shards:
+        return {"status": "success", "results": [], "failed": []}
+
+    done, pending = await asyncio.wait(shards, timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    per_query: List[List[Tuple[Optional[str], List[Any]]]] = [[] for _ in query_vectors]
+    failed = []
+    for task, (i, namespace) in shards.items():
+        if task in pending:
+            failed.append({"query": i, "namespace": namespace or "", "error": "timed out"})
+        elif task.exception() is not None:
+            failed.append({"query": i, "namespace": namespace or "", "error": str(task.exception())})
+        else:
+            per_query[i].append((namespace, task.result()))
+
+    if failed:
+        logger.warning(f"{len(failed)} of {len(shards)} search shards failed or timed out")
+    if not failed:
+        status = "success"
+    elif len(failed) < len(shards):
+        status = "partial"
+    else:
+        status = "failed"
+
+    return {
+        "status": status,
+        "results": [merge_matches(shard_results, top_k) for shard_results in per_query],
+        "failed": failed,
+    }
@@ -0,0 +1,165 @@
+"""
+Vectorized similarity helpers for ranking, top-k selection and pairwise comparison.
+"""
+from typing import List, Sequence, Tuple, Union
+import numpy as np
+
+VectorLike = Union[Sequence[float], np.ndarray]
+MatrixLike = Union[Sequence[Sequence[float]], np.ndarray]
+
+def normalize_rows(matrix: MatrixLike, copy: bool = True) -> np.ndarray:
+    """
+    Scale every row of a matrix to unit length.
+
+    Args:
+        matrix: (n, dimension) vectors
+        copy: Normalize a copy (otherwise a float32 array is normalized in place)
+
+    Returns:
+        float32 matrix of unit rows; zero rows stay zero
+    """
+    if copy:
+        array = np.array(matrix, dtype=np.float32, ndmin=2)
+    else:
+        array = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    np.divide(array, norms, out=array, where=norms > 0)
+    return array
+
+def normalize_vector(vector: VectorLike) -> np.ndarray:
+    """
+    Scale a vector to unit length.
+
+    Args:
+        vector: Vector to normalize
+
+    Returns:
+        float32 unit vector; a zero vector stays zero
+    """
+    return normalize_rows(vector)[0]
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the k highest scores without sorting the whole array.
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of results to return
+
+    Returns:
+        (indices, scores) of the best k entries, best first
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=scores.dtype)
+
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order, scores[order]
+
+class SimilarityIndex:
+    """Cosine similarity over a fixed set of vectors that are normalized once."""
+
+    def __init__(self, vectors: MatrixLike, normalized: bool = False):
+        """
+        Initialize the index.
+
+        Args:
+            vectors: (n, dimension) candidate vectors
+            normalized: Whether the vectors already have unit length
+        """
+        if normalized:
+            self._matrix = np.asarray(vectors, dtype=np.float32)
+        else:
+            self._matrix = normalize_rows(vectors)
+
+    def __len__(self) -> int:
+        """Number of indexed vectors."""
+        return len(self._matrix)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Get the normalized candidate matrix."""
+        return self._matrix
+
+    def scores(self, query: VectorLike) -> np.ndarray:
+        """
+        Score every candidate against a query with one matrix-vector product.
+
+        Args:
+            query: Query vector
+
+        Returns:
+            Cosine similarity per candidate
+        """
+        if not len(self._matrix):
+            return np.empty(0, dtype=np.float32)
+        return self._matrix @ normalize_vector(query)
+
+    def top_k(self, query: VectorLike, k: int) -> List[Tuple[int, float]]:
+        """
+        Find the candidates most similar to a query.
+
+        Args:
+            query: Query vector
+            k: Number of results to return
+
+        Returns:
+            (candidate index, score) pairs, best first
+        """
+        indices, scores = top_k(self.scores(query), k)
+        return [(int(i), float(score)) for i, score in zip(indices, scores)]
+
+    def pairwise(self) -> np.ndarray:
+        """
+        Compute the all-pairs cosine similarity matrix.
+
+        Returns:
+            (n, n) float32 similarity matrix
+        """
+        return self._matrix @ self._matrix.T
+
+def cosine_scores(query: VectorLike, candidates: MatrixLike) -> np.ndarray:
+    """
+    Cosine similarity between a query and each candidate.
+
+    Args:
+        query: Query vector
+        candidates: (n, dimension) candidate vectors
+
+    Returns:
+        1-D array of n scores (0.0 for zero vectors)
+    """
+    return SimilarityIndex(candidates).scores(query)
+
+def pairwise_similarity(vectors: MatrixLike) -> np.ndarray:
+    """
+    All-pairs cosine similarity, e.g. for deduplication or clustering.
+
+    Args:
+        vectors: (n, dimension) vectors
+
+    Returns:
+        (n, n) float32 similarity matrix
+    """
+    return SimilarityIndex(vectors).pairwise()
+
+def duplicate_pairs(vectors: MatrixLike, threshold: float = 0.95) -> List[Tuple[int, int, float]]:
+    """
+    Find pairs of near-duplicate vectors.
+
+    Args:
+        vectors: (n, dimension) vectors
+        threshold: Minimum cosine similarity for a pair to count as duplicate
+
+    Returns:
+        (i, j, score) tuples with i < j, most similar first
+    """
+    similarity = pairwise_similarity(vectors)
+    rows, cols = np.nonzero(np.triu(similarity >= threshold, k=1))
+    scores = similarity[rows, cols]
+    order = np.argsort(-scores, kind="stable")
+    return [(int(rows[i]), int(cols[i]), float(scores[i])) for i in order]
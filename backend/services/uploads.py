@@ -0,0 +1,369 @@
+"""
+Upload module for spooling context files to disk and processing them in the background.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from fastapi import UploadFile
+from pydantic import Field
+from config.settings import get_settings
+from models.base import TimestampedModel
+
+if TYPE_CHECKING:
+    from .jobs import Job
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+UPLOAD_STAGES = ("queued", "extracting", "chunking", "embedding", "completed", "failed")
+
+# Chunks are measured with this model's tokenizer (cl100k_base, shared by the OpenAI embedding models)
+CHUNK_TOKENIZER_MODEL = "text-embedding-3-small"
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES."""
+
+class UploadJob(TimestampedModel):
+    """State of an uploaded context file and its background processing."""
+    id: str
+    title: str
+    description: Optional[str] = None
+    filename: str
+    content_type: Optional[str] = None
+    namespace: Optional[str] = None
+    size: int = 0  # Bytes
+    sha256: str
+    status: str = "queued"  # One of UPLOAD_STAGES
+    duplicate: bool = False  # True when the response points at an earlier upload of the same file
+    chunks_total: int = 0
+    chunks_done: int = 0
+    progress: float = 0.0  # 0.0 to 1.0
+    error: Optional[str] = None
+    vector_ids: List[str] = Field(default_factory=list)
+
+async def spool_upload(
+    file: UploadFile,
+    directory: str,
+    block_size: int = 1 << 20,
+    max_bytes: Optional[int] = None
+) -> Tuple[str, str, int]:
+    """
+    Copy an upload to a spool file in fixed-size blocks, hashing it on the way.
+
+    Args:
+        file: Uploaded file
+        directory: Spool directory (created if missing)
+        block_size: Bytes read and written per step
+        max_bytes: Reject uploads larger than this (None for no limit)
+
+    Returns:
+        Spool file path, SHA-256 hex digest and size in bytes
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds max_bytes
+    """
+    os.makedirs(directory, exist_ok=True)
+    suffix = os.path.splitext(file.filename or "")[1]
+    fd, path = tempfile.mkstemp(dir=directory, suffix=suffix)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = await file.read(block_size)
+                if not block:
+                    break
+                size += len(block)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                digest.update(block)
+                await asyncio.to_thread(out.write, block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest(), size
+
+def extract_text(path: str, content_type: Optional[str] = None) -> str:
+    """
+    Extract the text of a spooled upload (blocking; run it in a thread).
+
+    Args:
+        path: Spool file
+        content_type: MIME type reported by the client
+
+    Returns:
+        Document text
+    """
+    if path.lower().endswith(".pdf") or content_type == "application/pdf":
+        from pdfminer.high_level import extract_text as extract_pdf_text
+        return extract_pdf_text(path)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+class UploadManager:
+    """Accepts uploads, deduplicates them by namespace and content hash and processes them in the background."""
+
+    def __init__(
+        self,
+        spool_dir: str,
+        embeddings: Any = None,
+        vector_store: Any = None,
+        max_jobs: int = 1000,
+        lexical_index: Any = None
+    ):
+        """
+        Initialize the upload manager.
+
+        Args:
+            spool_dir: Directory uploads are spooled to until processed
+            embeddings: EmbeddingsService (the registered one if None)
+            vector_store: Vector store (the configured one if None)
+            max_jobs: Finished jobs remembered for status queries
+            lexical_index: BM25 index fed the same chunks (the registered one if None)
+        """
+        self._spool_dir = spool_dir
+        self._embeddings = embeddings
+        self._vector_store = vector_store
+        self._lexical_index = lexical_index
+        self._max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, UploadJob]" = OrderedDict()
+        # (namespace, content hash) -> job ID; uploads are only shared within a namespace
+        self._by_hash: Dict[Tuple[str, str], str] = {}
+        self._paths: Dict[str, str] = {}
+
+    async def accept(
+        self,
+        file: UploadFile,
+        title: str,
+        description: Optional[str] = None,
+        namespace: Optional[str] = None
+    ) -> UploadJob:
+        """
+        Spool an upload and register a job for it.
+
+        If the same content was already uploaded to the same namespace (and
+        did not fail), the spool file is dropped and the earlier job is
+        returned with duplicate set, so nothing is processed twice. The
+        same file uploaded to another namespace is processed separately.
+
+        Args:
+            file: Uploaded file
+            title: Context title
+            description: Optional description
+            namespace: Optional vector store namespace
+
+        Returns:
+            The new job (status "queued") or the earlier job for the same content
+
+        Raises:
+            UploadTooLargeError: If the upload exceeds UPLOAD_MAX_BYTES
+        """
+        path, digest, size = await spool_upload(
+            file,
+            self._spool_dir,
+            block_size=settings.UPLOAD_BLOCK_SIZE,
+            max_bytes=settings.UPLOAD_MAX_BYTES
+        )
+
+        key = self._dedup_key(namespace, digest)
+        existing = self._jobs.get(self._by_hash.get(key, ""))
+        if existing is not None and existing.status != "failed":
+            os.remove(path)
+            logger.info(f"Upload {file.filename} duplicates context {existing.id}")
+            return existing.model_copy(update={"duplicate": True})
+
+        job = UploadJob(
+            id=str(uuid.uuid4()),
+            title=title,
+            description=description,
+            filename=file.filename or os.path.basename(path),
+            content_type=file.content_type,
+            namespace=namespace,
+            size=size,
+            sha256=digest,
+        )
+        self._jobs[job.id] = job
+        self._by_hash[key] = job.id
+        self._paths[job.id] = path
+        self._evict()
+        logger.info(f"Spooled upload {job.filename} ({size} bytes) as job {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[UploadJob]:
+        """Get a job by ID."""
+        return self._jobs.get(job_id)
+
+    def job_payload(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get what a queued job needs to process an upload, even after a restart.
+
+        Args:
+            job_id: Job returned by accept
+
+        Returns:
+            JSON-serializable dict with the upload and its spool file path
+        """
+        return {"upload": self._jobs[job_id].model_dump(mode="json"), "path": self._paths[job_id]}
+
+    def restore(self, payload: Dict[str, Any]) -> UploadJob:
+        """
+        Track an upload from a job payload, unless it is already tracked.
+
+        Args:
+            payload: Dict returned by job_payload
+
+        Returns:
+            The tracked job
+        """
+        upload = UploadJob(**payload["upload"])
+        if upload.id not in self._jobs:
+            self._jobs[upload.id] = upload
+            self._by_hash.setdefault(self._dedup_key(upload.namespace, upload.sha256), upload.id)
+        self._paths.setdefault(upload.id, payload["path"])
+        return self._jobs[upload.id]
+
+    async def process(self, job_id: str, keep_spool: bool = False) -> UploadJob:
+        """
+        Extract, chunk, embed and upsert a spooled upload, updating its progress.
+
+        Args:
+            job_id: Job returned by accept
+            keep_spool: Keep the spool file if processing fails (for a retry)
+
+        Returns:
+            The finished job (status "completed" or "failed")
+        """
+        job = self._jobs[job_id]
+        path = self._paths.pop(job_id)
+        job.chunks_done, job.progress, job.error, job.vector_ids = 0, 0.0, None, []
+        try:
+            self._advance(job, "extracting")
+            text = await asyncio.to_thread(extract_text, path, job.content_type)
+
+            self._advance(job, "chunking")
+            # Imported here so the upload routes do not load numpy at startup
+            from .embedding_batching import TokenCounter
+            counter = TokenCounter(CHUNK_TOKENIZER_MODEL)
+            chunks = [
+                chunk for chunk, _ in await asyncio.to_thread(
+                    counter.split, text, settings.UPLOAD_CHUNK_TOKENS, settings.UPLOAD_CHUNK_OVERLAP
+                )
+                if chunk.strip()
+            ]
+            del text
+            job.chunks_total = len(chunks)
+
+            self._advance(job, "embedding")
+            embeddings, vector_store, lexical_index = self._resolve_services()
+            # Upsert each slice as soon as it is embedded
+            async for offset, rows in embeddings.stream_embeddings(
+                chunks, chunk_size=settings.UPLOAD_EMBED_BATCH_SIZE, as_array=True
+            ):
+                ids = [f"{job.sha256[:16]}:{n}" for n in range(offset, offset + len(rows))]
+                metadata = [
+                    {
+                        "context_id": job.id,
+                        "title": job.title,
+                        "source": job.filename,
+                        "chunk": n,
+                        "text": chunks[n],
+                    }
+                    for n in range(offset, offset + len(rows))
+                ]
+                result = await vector_store.upsert_matrix(ids, rows, metadata, namespace=job.namespace)
+                if isinstance(result, dict) and result.get("status", "success") != "success":
+                    raise RuntimeError(f"Upserting chunks {offset}-{offset + len(rows)} failed")
+                lexical_index.add_texts(ids, chunks[offset:offset + len(rows)], metadata, namespace=job.namespace)
+                job.vector_ids.extend(ids)
+                job.chunks_done += len(rows)
+                job.progress = job.chunks_done / job.chunks_total
+                job.update_timestamp()
+
+            job.progress = 1.0
+            self._advance(job, "completed")
+            logger.info(f"Processed upload {job.id}: {job.chunks_total} chunks")
+        except Exception as e:
+            logger.error(f"Error processing upload {job.id}: {str(e)}")
+            job.error = str(e)
+            self._advance(job, "failed")
+        finally:
+            if os.path.exists(path) and not (keep_spool and job.status == "failed"):
+                os.remove(path)
+        return job
+
+    def _advance(self, job: UploadJob, status: str) -> None:
+        """Move a job to the next stage."""
+        job.status = status
+        job.update_timestamp()
+
+    def _resolve_services(self) -> Tuple[Any, Any, Any]:
+        """Get the embeddings service, vector store and lexical index, building them on first use."""
+        from .registry import get_service
+        if self._embeddings is None:
+            self._embeddings = get_service("embeddings_service")
+        if self._vector_store is None:
+            from .vector_store import get_vector_store
+            self._vector_store = get_vector_store()
+        if self._lexical_index is None:
+            self._lexical_index = get_service("lexical_index")
+        return self._embeddings, self._vector_store, self._lexical_index
+
+    @staticmethod
+    def _dedup_key(namespace: Optional[str], digest: str) -> Tuple[str, str]:
+        """Key under which uploads of the same content are shared."""
+        return namespace or "", digest
+
+    def _evict(self) -> None:
+        """Forget the oldest finished jobs beyond max_jobs."""
+        finished = [
+            job_id for job_id, job in self._jobs.items() if job.status in ("completed", "failed")
+        ]
+        for job_id in finished[:max(0, len(self._jobs) - self._max_jobs)]:
+            job = self._jobs.pop(job_id)
+            key = self._dedup_key(job.namespace, job.sha256)
+            if self._by_hash.get(key) == job_id:
+                del self._by_hash[key]
+
+def upload_from_job(job: "Job") -> UploadJob:
+    """
+    Describe an upload from its queue job, when the manager no longer tracks it (e.g. after a restart).
+
+    Args:
+        job: "context_upload" job
+
+    Returns:
+        The upload with the job's status and error
+    """
+    upload = UploadJob(**job.payload["upload"])
+    upload.status = "queued" if job.status == "running" else job.status
+    upload.error = job.error
+    if job.status == "completed":
+        upload.progress = 1.0
+        upload.chunks_total = upload.chunks_done = (job.result or {}).get("chunks", 0)
+    return upload
+
+async def run_upload_job(job: "Job") -> Dict[str, Any]:
+    """
+    Job queue handler processing a spooled upload (job type "context_upload").
+
+    Args:
+        job: Job whose payload came from UploadManager.job_payload
+
+    Returns:
+        Chunk count of the processed upload
+
+    Raises:
+        RuntimeError: If processing failed (the queue retries the job)
+    """
+    from .registry import get_service
+    manager = get_service("upload_manager")
+    upload = manager.restore(job.payload)
+    upload = await manager.process(upload.id, keep_spool=job.attempts < job.max_attempts)
+    if upload.status == "failed":
+        raise RuntimeError(upload.error)
+    return {"chunks": upload.chunks_total}
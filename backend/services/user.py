@@ -33,7 +33,9 @@ class UserService(BaseService[User]):
         Returns:
             Updated user if found, None otherwise
         """
-        user = await self.get(user_id)
+        # Read the current row, not a cached copy, so the merge never
+        # drops preferences written since the user was cached
+        user = await self.repository.get_by_id(user_id, use_cache=False)
         if not user:
             return None
             
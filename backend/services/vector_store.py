@@ -0,0 +1,75 @@
+"""
+Vector store selection module.
+"""
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Union
+from config.settings import get_settings
+from .local_index import LocalVectorIndex
+from .ann_index import ANNVectorIndex
+from .quantized_index import QuantizedVectorIndex
+from .registry import get_service
+
+if TYPE_CHECKING:
+    from .pinecone import PineconeService
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+def create_local_index() -> LocalVectorIndex:
+    """
+    Create the local index configured by LOCAL_INDEX_TYPE and LOCAL_INDEX_DIR.
+    
+    Returns:
+        An exact LocalVectorIndex, an approximate ANNVectorIndex for "ivf",
+        or a compressed QuantizedVectorIndex for "int8" and "pq"
+    """
+    if settings.LOCAL_INDEX_TYPE in ("int8", "pq"):
+        return QuantizedVectorIndex(
+            path=settings.LOCAL_INDEX_DIR,
+            codec=settings.LOCAL_INDEX_TYPE,
+            rerank=settings.LOCAL_INDEX_RERANK,
+            n_subvectors=settings.LOCAL_INDEX_PQ_SUBVECTORS,
+            min_train_size=settings.LOCAL_INDEX_MIN_TRAIN_SIZE
+        )
+    if settings.LOCAL_INDEX_TYPE == "ivf":
+        return ANNVectorIndex(
+            path=settings.LOCAL_INDEX_DIR,
+            nlist=settings.LOCAL_INDEX_NLIST,
+            nprobe=settings.LOCAL_INDEX_NPROBE,
+            min_train_size=settings.LOCAL_INDEX_MIN_TRAIN_SIZE
+        )
+    if settings.LOCAL_INDEX_TYPE != "flat":
+        raise ValueError(f"Unsupported local index type: {settings.LOCAL_INDEX_TYPE}")
+    return LocalVectorIndex(path=settings.LOCAL_INDEX_DIR)
+
+def get_vector_store() -> Union["PineconeService", LocalVectorIndex]:
+    """
+    Get the configured vector store.
+    
+    Both backends expose upsert_vectors, upsert_matrix, query_vectors,
+    query_many, delete_vectors and get_stats, so callers can use either.
+    
+    Returns:
+        The in-process index if VECTOR_STORE_BACKEND is "local", otherwise Pinecone
+    """
+    if settings.VECTOR_STORE_BACKEND == "local":
+        # Registered with a shutdown hook that saves it to LOCAL_INDEX_DIR
+        return get_service("local_index")
+    
+    return get_service("pinecone")
+
+async def check_vector_store_ready() -> Dict[str, Any]:
+    """
+    Report whether the configured vector store is usable, without blocking.
+    
+    A Pinecone store that is not connected yet starts connecting in the
+    background and reports not ready until it succeeds.
+    
+    Returns:
+        "ready" flag, backend name and the last connection error, if any
+    """
+    if settings.VECTOR_STORE_BACKEND == "local":
+        get_vector_store()
+        return {"ready": True, "backend": "local"}
+    
+    return {**await get_service("pinecone").check_ready(), "backend": "pinecone"}
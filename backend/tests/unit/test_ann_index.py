@@ -0,0 +1,155 @@
+"""
+Unit tests for the approximate (IVF) vector index.
+"""
+import asyncio
+import os
+import threading
+import pytest
+import numpy as np
+from services import ann_index
+from services.ann_index import ANNVectorIndex
+from services.local_index import LocalVectorIndex
+
+def clustered_vectors(n, dimension=32, clusters=50, seed=0):
+    """Generate clustered unit vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    vectors = centers[rng.integers(0, clusters, n)] + 0.5 * rng.normal(size=(n, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+@pytest.fixture
+def corpus():
+    """Fixture for a clustered corpus and its IDs."""
+    vectors = clustered_vectors(5000)
+    return [f"v{i}" for i in range(len(vectors))], vectors
+
+class TestANNVectorIndex:
+    """Tests for the ANNVectorIndex class."""
+
+    @pytest.mark.asyncio
+    async def test_recall_against_exact_search(self, corpus):
+        """Test that IVF search finds most of the exact top-k."""
+        ids, vectors = corpus
+        exact = LocalVectorIndex(dimension=32)
+        approximate = ANNVectorIndex(dimension=32, min_train_size=1000, nprobe=16)
+        await exact.upsert_matrix(ids, vectors)
+        await approximate.upsert_matrix(ids, vectors)
+        await approximate.wait_for_training()
+
+        hits = 0
+        queries = clustered_vectors(50, seed=1)
+        for query in queries:
+            expected = {m["id"] for m in await exact.query_vectors(query, top_k=10)}
+            found = {m["id"] for m in await approximate.query_vectors(query, top_k=10)}
+            hits += len(expected & found)
+
+        assert approximate._namespaces[""].trained
+        assert hits / (10 * len(queries)) >= 0.9
+
+    @pytest.mark.asyncio
+    async def test_tombstoned_deletes_and_updates(self, corpus):
+        """Test that deleted and overwritten vectors are never returned."""
+        ids, vectors = corpus
+        index = ANNVectorIndex(dimension=32, min_train_size=1000)
+        await index.upsert_matrix(ids, vectors, namespace="ns")
+        await index.wait_for_training()
+
+        target = vectors[0]
+        await index.delete_vectors(ids=["v0"], namespace="ns")
+        await index.upsert_matrix(["v1"], -target[None, :], namespace="ns")
+        matches = await index.query_vectors(target, top_k=10, namespace="ns")
+
+        assert "v0" not in {m["id"] for m in matches}
+        assert "v1" not in {m["id"] for m in matches}
+        assert (await index.get_stats("ns"))["vector_count"] == len(ids) - 1
+
+    @pytest.mark.asyncio
+    async def test_filtered_query_widens_probe(self, corpus):
+        """Test that selective filters still return enough matches."""
+        ids, vectors = corpus
+        metadata = [{"bucket": i % 100} for i in range(len(ids))]
+        index = ANNVectorIndex(dimension=32, min_train_size=1000, nprobe=1)
+        await index.upsert_matrix(ids, vectors, metadata)
+        await index.wait_for_training()
+
+        matches = await index.query_vectors(vectors[0], top_k=10, filter={"bucket": 7})
+
+        assert len(matches) == 10
+        assert all(m["metadata"]["bucket"] == 7 for m in matches)
+
+    @pytest.mark.asyncio
+    async def test_save_and_load(self, corpus, tmp_path):
+        """Test that a saved index answers queries identically after loading."""
+        ids, vectors = corpus
+        index = ANNVectorIndex(dimension=32, min_train_size=1000)
+        await index.upsert_matrix(ids, vectors)
+        await index.wait_for_training()
+        await index.delete_vectors(ids=["v3"])
+        index.save(str(tmp_path))
+
+        loaded = ANNVectorIndex(dimension=32, path=str(tmp_path), min_train_size=1000)
+        before = await index.query_vectors(vectors[5], top_k=5)
+        after = await loaded.query_vectors(vectors[5], top_k=5)
+
+        assert [m["id"] for m in after] == [m["id"] for m in before]
+        assert (await loaded.get_stats())["total_vector_count"] == len(ids) - 1
+        await loaded.upsert_matrix(["new"], vectors[:1])
+        assert (await loaded.query_vectors(vectors[0], top_k=1))[0]["score"] == pytest.approx(1.0)
+
+
+    @pytest.mark.asyncio
+    async def test_load_change_save_in_place(self, corpus, tmp_path):
+        """Test that a memory-mapped index saved back to its own directory stays queryable."""
+        ids, vectors = corpus
+        index = ANNVectorIndex(dimension=32, min_train_size=1000)
+        await index.upsert_matrix(ids[:3000], vectors[:3000])
+        await index.wait_for_training()
+        index.save(str(tmp_path))
+
+        loaded = ANNVectorIndex(dimension=32, path=str(tmp_path), min_train_size=1000)
+        await loaded.delete_vectors(ids=ids[:1500])
+        loaded.save(str(tmp_path))
+        matches = await loaded.query_vectors(vectors[2000], top_k=1)
+        assert matches[0]["id"] == "v2000"
+
+        reloaded = ANNVectorIndex(dimension=32, path=str(tmp_path), min_train_size=1000)
+        assert (await reloaded.get_stats())["total_vector_count"] == 1500
+        assert (await reloaded.query_vectors(vectors[2999], top_k=1))[0]["id"] == "v2999"
+        assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path / "__default__"))
+
+    @pytest.mark.asyncio
+    async def test_training_runs_off_the_event_loop(self, corpus, monkeypatch):
+        """Test that upserts return before clustering, search exactly meanwhile and reconcile later writes."""
+        ids, vectors = corpus
+        started, release = threading.Event(), threading.Event()
+        kmeans = ann_index.spherical_kmeans
+
+        def blocking_kmeans(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return kmeans(*args, **kwargs)
+
+        monkeypatch.setattr(ann_index, "spherical_kmeans", blocking_kmeans)
+        exact = LocalVectorIndex(dimension=32)
+        index = ANNVectorIndex(dimension=32, min_train_size=1000, nprobe=1)
+        await exact.upsert_matrix(ids[:4000], vectors[:4000])
+        await index.upsert_matrix(ids[:4000], vectors[:4000])
+        await asyncio.to_thread(started.wait, 5)
+
+        space = index._namespaces[""]
+        assert not space.trained
+        expected = await exact.query_vectors(vectors[10], top_k=10)
+        assert await index.query_vectors(vectors[10], top_k=10) == expected
+
+        # Writes made while the clustering runs must survive it being applied
+        await index.upsert_matrix(ids[4000:], vectors[4000:])
+        await index.delete_vectors(ids=["v0"])
+        await index.upsert_matrix(["v1"], -vectors[1][None, :])
+        release.set()
+        await index.wait_for_training()
+
+        assert space.trained and space.trained_size == len(ids) - 1
+        assert len(space) == len(ids) - 1
+        assert (await index.query_vectors(vectors[4500], top_k=1))[0]["id"] == "v4500"
+        assert (await index.query_vectors(-vectors[1], top_k=1))[0]["id"] == "v1"
+        assert "v0" not in {m["id"] for m in await index.query_vectors(vectors[0], top_k=10)}
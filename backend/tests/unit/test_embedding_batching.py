@@ -0,0 +1,59 @@
+"""
+Unit tests for embedding batch packing, windowing and pooling.
+"""
+import pytest
+import numpy as np
+from services.embedding_batching import TokenCounter, pack_batches, pool_embeddings
+
+@pytest.fixture
+def estimating_counter():
+    """Fixture for a token counter that uses the character estimate."""
+    counter = TokenCounter("test-model")
+    counter._loaded = True
+    counter._encoding = None
+    return counter
+
+class TestPackBatches:
+    """Tests for pack_batches."""
+
+    def test_respects_token_budget(self):
+        """Test that batches close before exceeding the token budget."""
+        items = [("a", 40), ("b", 40), ("c", 40), ("d", 100)]
+        assert pack_batches(items, max_tokens=100, max_inputs=10) == [["a", "b"], ["c"], ["d"]]
+
+    def test_respects_input_limit(self):
+        """Test that batches close at the input count limit."""
+        items = [(i, 1) for i in range(5)]
+        assert pack_batches(items, max_tokens=100, max_inputs=2) == [[0, 1], [2, 3], [4]]
+
+class TestTokenCounter:
+    """Tests for TokenCounter windowing."""
+
+    def test_split_windows_overlap_and_cover_text(self, estimating_counter):
+        """Test that windows respect the size limit and cover the whole text."""
+        text = "".join(chr(ord("a") + i % 26) for i in range(100))
+        windows = estimating_counter.split(text, max_tokens=10, overlap=2)
+
+        assert all(tokens <= 10 for _, tokens in windows)
+        assert windows[0][0] == text[:30]
+        assert windows[1][0].startswith(text[24:30])
+        assert windows[-1][0].endswith(text[-5:])
+
+class TestPoolEmbeddings:
+    """Tests for pool_embeddings."""
+
+    def test_weighted_mean_is_unit_length(self):
+        """Test that mean pooling weights windows and normalizes the result."""
+        pooled = pool_embeddings([[1.0, 0.0], [0.0, 1.0]], weights=[3, 1])
+        assert np.isclose(np.linalg.norm(pooled), 1.0)
+        assert pooled[0] > pooled[1]
+
+    def test_max_and_first(self):
+        """Test the max and first pooling strategies."""
+        assert pool_embeddings([[3.0, 0.0], [0.0, 4.0]], strategy="max").tolist() == pytest.approx([0.6, 0.8])
+        assert pool_embeddings([[2.0, 0.0], [0.0, 1.0]], strategy="first").tolist() == pytest.approx([1.0, 0.0])
+
+    def test_unknown_strategy(self):
+        """Test that an unknown strategy is rejected."""
+        with pytest.raises(ValueError):
+            pool_embeddings([[1.0]], strategy="median")
@@ -0,0 +1,76 @@
+"""
+Unit tests for the embedding cache.
+"""
+import threading
+import pytest
+import numpy as np
+from services.embedding_cache import EmbeddingCache
+
+class TestEmbeddingCache:
+    """Tests for the EmbeddingCache class."""
+
+    def test_key_normalizes_whitespace(self):
+        """Test that keys ignore insignificant whitespace but include model and dimension."""
+        key = EmbeddingCache.make_key("model", 3, "hello   world")
+        assert key == EmbeddingCache.make_key("model", 3, " hello world\n")
+        assert key != EmbeddingCache.make_key("other-model", 3, "hello world")
+        assert key != EmbeddingCache.make_key("model", 4, "hello world")
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted at the size cap."""
+        cache = EmbeddingCache(max_entries=2)
+        await cache.set("a", np.ones(3))
+        await cache.set("b", np.ones(3))
+        await cache.get("a")
+        await cache.set("c", np.ones(3))
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") is not None
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["memory_entries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_restart(self, tmp_path):
+        """Test that vectors persist on disk and are promoted back into memory."""
+        cache = EmbeddingCache(max_entries=10, path=str(tmp_path))
+        await cache.set("a", np.array([1.0, 2.0, 3.0]))
+        cache.close()
+
+        reopened = EmbeddingCache(max_entries=10, path=str(tmp_path))
+        vector = await reopened.get("a")
+        assert vector.tolist() == [1.0, 2.0, 3.0]
+        assert reopened.stats()["disk_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disk_size_cap(self, tmp_path):
+        """Test that the disk store evicts the oldest entries beyond its cap."""
+        cache = EmbeddingCache(max_entries=1, path=str(tmp_path), max_disk_entries=2)
+        for key in ["a", "b", "c"]:
+            await cache.set(key, np.ones(3))
+
+        stats = cache.stats()
+        assert stats["disk_entries"] == 2
+        assert stats["disk_evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_runs_off_the_event_loop(self, tmp_path, monkeypatch):
+        """Test that SQLite reads and writes run in worker threads and the row count is kept, not queried."""
+        cache = EmbeddingCache(max_entries=1, path=str(tmp_path), max_disk_entries=3)
+        threads = []
+        for name in ("_read_disk", "_write_disk"):
+            method = getattr(cache, name)
+            monkeypatch.setattr(
+                cache, name, lambda *args, method=method: threads.append(threading.get_ident()) or method(*args)
+            )
+
+        await cache.set_many([("a", np.ones(3)), ("b", np.ones(3))])
+        await cache.set_many([("b", np.zeros(3)), ("c", np.ones(3))])
+        assert (await cache.get("b")).tolist() == [0.0, 0.0, 0.0]
+        assert len(threads) == 3 and threading.get_ident() not in threads
+        assert cache.stats()["disk_entries"] == 3
+        cache.close()
+
+        reopened = EmbeddingCache(path=str(tmp_path), max_disk_entries=3)
+        assert reopened.stats()["disk_entries"] == 3
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Unit tests for the embedding request coalescer.
+"""
+import asyncio
+import pytest
+from services.embedding_coalescer import EmbeddingCoalescer
+
+class RecordingEmbedder:
+    """Fake batched embedding function that records each call."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    async def __call__(self, texts, model=None):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("embedding backend down")
+        return [[float(len(text))] for text in texts]
+
+class TestEmbeddingCoalescer:
+    """Tests for the EmbeddingCoalescer class."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_batch(self):
+        """Test that concurrent requests are sent as one deduplicated batch."""
+        embedder = RecordingEmbedder()
+        coalescer = EmbeddingCoalescer(embedder, window_ms=10, max_batch_size=100)
+
+        results = await asyncio.gather(*[
+            coalescer.embed(text) for text in ["a", "bb", "a", "ccc", "bb "]
+        ])
+
+        assert results == [[1.0], [2.0], [1.0], [3.0], [2.0]]
+        assert embedder.calls == [["a", "bb", "ccc"]]
+        stats = coalescer.stats()
+        assert stats["requests"] == 5
+        assert stats["deduplicated"] == 2
+        assert stats["batches"] == 1
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size_flushes_early(self):
+        """Test that reaching the batch size sends without waiting for the window."""
+        embedder = RecordingEmbedder()
+        coalescer = EmbeddingCoalescer(embedder, window_ms=10000, max_batch_size=2)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(coalescer.embed("a"), coalescer.embed("bb")),
+            timeout=1
+        )
+
+        assert results == [[1.0], [2.0]]
+        assert embedder.calls == [["a", "bb"]]
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_every_caller(self):
+        """Test that a failed batch fails each waiting caller."""
+        coalescer = EmbeddingCoalescer(RecordingEmbedder(fail=True), window_ms=1)
+
+        results = await asyncio.gather(
+            coalescer.embed("a"), coalescer.embed("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_running_and_collected_batches(self):
+        """Test that batch tasks are tracked until done and cancelled on close."""
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def blocking_embedder(texts, model=None):
+            started.set()
+            await release.wait()
+            return [[0.0] for _ in texts]
+
+        coalescer = EmbeddingCoalescer(blocking_embedder, window_ms=10000, max_batch_size=1)
+        running = asyncio.ensure_future(coalescer.embed("a"))
+        await started.wait()
+        assert len(coalescer._tasks) == 1
+
+        coalescer._max_batch_size = 100
+        collected = asyncio.ensure_future(coalescer.embed("b"))
+        await asyncio.sleep(0)
+        await coalescer.close()
+
+        assert not coalescer._tasks
+        for caller in (running, collected):
+            with pytest.raises(asyncio.CancelledError):
+                await caller
\ No newline at end of file
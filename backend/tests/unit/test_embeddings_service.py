@@ -0,0 +1,175 @@
+"""
+Unit tests for the embeddings service.
+"""
+import asyncio
+import httpx
+import openai
+import pytest
+import numpy as np
+from unittest.mock import MagicMock
+from services.embedding_cache import EmbeddingCache
+from services.embeddings import EmbeddingsService, settings
+
+class FakeEmbeddingsAPI:
+    """Fake async embeddings endpoint that records calls and concurrency."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.fail_texts = set()
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, model, input, encoding_format):
+        self.calls.append(list(input))
+        if self.fail_texts & set(input):
+            raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later batches finish first to exercise reordering
+            await asyncio.sleep(self.delay / len(self.calls))
+            response = MagicMock()
+            response.data = [MagicMock(embedding=[float(len(text)), 1.0, 0.0]) for text in input]
+            return response
+        finally:
+            self.in_flight -= 1
+
+@pytest.fixture
+def fake_api():
+    """Fixture for the fake embeddings endpoint."""
+    return FakeEmbeddingsAPI()
+
+@pytest.fixture
+def embeddings_service(fake_api):
+    """Fixture for an embeddings service with a fake client and memory-only cache."""
+    service = EmbeddingsService(cache=EmbeddingCache(max_entries=1000))
+    service._dimension = 3
+    service._client = MagicMock()
+    service._client.embeddings.create = fake_api.create
+    return service
+
+class TestEmbeddingsService:
+    """Tests for the EmbeddingsService class."""
+
+    @pytest.mark.asyncio
+    async def test_only_misses_go_to_api(self, embeddings_service, fake_api):
+        """Test that cached texts are not re-embedded and order is preserved."""
+        await embeddings_service.get_embeddings(["alpha", "be"])
+        result = await embeddings_service.get_embeddings(["be", "", "gamma", "alpha", "gamma"])
+
+        assert [vector[0] for vector in result] == [2.0, 0.0, 5.0, 5.0, 5.0]
+        assert result[1] == [0.0, 0.0, 0.0]
+        assert len(fake_api.calls) == 2
+        assert fake_api.calls[1] == ["gamma"]
+
+    @pytest.mark.asyncio
+    async def test_cache_stats(self, embeddings_service):
+        """Test that the service reports cache statistics."""
+        await embeddings_service.get_embeddings(["alpha"])
+        await embeddings_service.get_embeddings(["alpha"])
+
+        stats = embeddings_service.cache_stats()
+        assert stats["enabled"] is True
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_batches_keep_order(self, embeddings_service, fake_api):
+        """Test that batches run concurrently up to the limit and results stay in order."""
+        fake_api.delay = 0.05
+        embeddings_service._batch_size = 2
+        embeddings_service._max_concurrency = 3
+        texts = ["x" * n for n in range(1, 13)]
+
+        result = await embeddings_service.get_embeddings(texts)
+
+        assert [vector[0] for vector in result] == [float(n) for n in range(1, 13)]
+        assert len(fake_api.calls) == 6
+        assert fake_api.max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_consecutive_slices(self, embeddings_service):
+        """Test that streamed slices cover the input in order."""
+        embeddings_service._batch_size = 2
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+        offsets = []
+        async for offset, chunk in embeddings_service.stream_embeddings(texts):
+            assert [vector[0] for vector in chunk] == [float(len(t)) for t in texts[offset:offset + len(chunk)]]
+            offsets.append(offset)
+
+        assert offsets == [0, 2, 4]
+
+    @pytest.mark.asyncio
+    async def test_token_budget_packing_and_long_text_pooling(self, embeddings_service, fake_api):
+        """Test that requests fill the token budget and oversized texts are pooled."""
+        counter = embeddings_service._get_token_counter(embeddings_service._model)
+        counter._loaded = True
+        counter._encoding = None
+        embeddings_service._max_tokens = 10
+        embeddings_service._window_overlap = 0
+        embeddings_service._max_request_tokens = 20
+        long_text = "y" * 75
+
+        result = await embeddings_service.get_embeddings(["a" * 30, "b" * 30, long_text])
+
+        # Two 10-token inputs fit per request; the long text becomes three windows
+        assert [len(call) for call in fake_api.calls] == [2, 2, 1]
+        assert [len(text) for text in fake_api.calls[1]] == [30, 30]
+        assert len(result) == 3
+        assert np.isclose(np.linalg.norm(result[2]), 1.0)
+        assert result[0] == [30.0, 1.0, 0.0]
+
+    @pytest.mark.asyncio
+    async def test_get_embedding_coalesces_concurrent_calls(self, embeddings_service, fake_api):
+        """Test that concurrent single-text calls become one API request."""
+        results = await asyncio.gather(*[
+            embeddings_service.get_embedding(text) for text in ["a", "bb", "a", ""]
+        ])
+
+        assert [vector[0] for vector in results] == [1.0, 2.0, 1.0, 0.0]
+        assert fake_api.calls == [["a", "bb"]]
+
+    @pytest.mark.asyncio
+    async def test_as_array_returns_float32_matrix(self, embeddings_service):
+        """Test that array mode returns a contiguous float32 matrix with zero rows for empty text."""
+        matrix = await embeddings_service.get_embeddings(["a", "", "ccc"], as_array=True)
+
+        assert isinstance(matrix, np.ndarray)
+        assert matrix.dtype == np.float32
+        assert matrix.shape == (3, 3)
+        assert matrix.flags["C_CONTIGUOUS"]
+        assert matrix[:, 0].tolist() == [1.0, 0.0, 3.0]
+        assert not matrix[1].any()
+
+    @pytest.mark.asyncio
+    async def test_precomputed_vectors_skip_embedding(self, embeddings_service, fake_api):
+        """Test that similarity APIs accept vectors without calling the API."""
+        query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+        candidates = np.array([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0], [1.0, 1.0, 0.0]], dtype=np.float32)
+
+        scores = await embeddings_service.batch_similarity(query, candidates)
+        ranked = await embeddings_service.top_k_similar(query, candidates, k=2)
+
+        assert scores == pytest.approx([0.0, 1.0, 0.7071], abs=1e-4)
+        assert [index for index, _ in ranked] == [1, 2]
+        assert fake_api.calls == []
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_does_not_redo_finished_batches(self, embeddings_service, fake_api, monkeypatch):
+        """Test that only the failing batch is retried and finished batches are kept."""
+        monkeypatch.setattr(settings, "RETRY_BASE_DELAY", 0)
+        embeddings_service._batch_size = 1
+        fake_api.fail_texts = {"beta"}
+
+        with pytest.raises(openai.APIConnectionError):
+            await embeddings_service.get_embeddings(["alpha", "beta", "gamma"])
+        assert sorted(map(tuple, fake_api.calls)) == [("alpha",), ("beta",), ("beta",), ("beta",), ("gamma",)]
+
+        fake_api.fail_texts = set()
+        fake_api.calls = []
+        result = await embeddings_service.get_embeddings(["alpha", "beta", "gamma"])
+
+        assert [vector[0] for vector in result] == [5.0, 4.0, 5.0]
+        assert fake_api.calls == [["beta"]]
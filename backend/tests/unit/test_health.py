@@ -3,7 +3,7 @@ Unit tests for the health endpoint.
 """
 from fastapi.testclient import TestClient
 import pytest
-from main import app
+from main import app, settings
 
 client = TestClient(app)
 
@@ -15,4 +15,11 @@ def test_health_endpoint():
     assert "status" in data
     assert data["status"] == "ok"
     assert "name" in data
-    assert "version" in data 
\ No newline at end of file
+    assert "version" in data 
+
+def test_ready_endpoint_with_local_vector_store(monkeypatch):
+    """Test that the readiness endpoint reports a usable local vector store."""
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "local")
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["vector_store"] == {"ready": True, "backend": "local"}
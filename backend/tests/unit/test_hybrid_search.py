@@ -0,0 +1,83 @@
+"""
+Unit tests for hybrid retrieval.
+"""
+import pytest
+import numpy as np
+from services.hybrid_search import HybridRetriever, is_keyword_query
+from services.lexical_index import LexicalIndex
+from services.local_index import LocalVectorIndex
+from services.search import reciprocal_rank_fusion
+
+class FakeEmbeddings:
+    """Fake embeddings service returning fixed vectors per text."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    async def get_embedding(self, text):
+        self.calls.append(text)
+        return self.vectors[text]
+
+async def build_retriever():
+    """Build a retriever over three texts in both indexes."""
+    lexical = LexicalIndex()
+    lexical.add_texts(["a", "b", "c"], ["Status of PRJ-1042", "hiring plan for Q3", "vendor contract renewal"])
+    vectors = LocalVectorIndex(dimension=2)
+    await vectors.upsert_matrix(["a", "b", "c"], np.array([[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]))
+    embeddings = FakeEmbeddings({"how are we doing on recruiting": [0.1, 1.0]})
+    return HybridRetriever(lexical, vectors, embeddings, candidates=3), embeddings
+
+def test_is_keyword_query():
+    """Test the keyword-like query heuristic."""
+    assert is_keyword_query("PRJ-1042")
+    assert is_keyword_query("Jane Doe")
+    assert is_keyword_query('"vendor contract"')
+    assert not is_keyword_query("what did we decide about PRJ-1042")
+    assert not is_keyword_query("hiring plan")
+
+def test_reciprocal_rank_fusion():
+    """Test that items ranked by both retrievers are fused to the top."""
+    fused = reciprocal_rank_fusion(
+        [[{"id": "a", "score": 9.0}, {"id": "b", "score": 1.0}], [{"id": "b", "score": 0.9}]],
+        top_k=2
+    )
+    assert [match["id"] for match in fused] == ["b", "a"]
+    assert fused[0]["ranks"] == [2, 1]
+
+class TestHybridRetriever:
+    """Tests for the HybridRetriever class."""
+
+    @pytest.mark.asyncio
+    async def test_keyword_query_skips_embeddings(self):
+        """Test that keyword-like queries are answered without an embeddings call."""
+        retriever, embeddings = await build_retriever()
+        matches = await retriever.search("PRJ-1042", top_k=2)
+
+        assert matches[0]["id"] == "a"
+        assert embeddings.calls == []
+
+    @pytest.mark.asyncio
+    async def test_natural_language_query_is_fused(self):
+        """Test that other queries combine lexical and vector rankings."""
+        retriever, embeddings = await build_retriever()
+        matches = await retriever.search("how are we doing on recruiting", top_k=3)
+
+        assert embeddings.calls == ["how are we doing on recruiting"]
+        assert matches[0]["id"] == "b"
+        assert matches[0]["ranks"] == [None, 1]
+
+    @pytest.mark.asyncio
+    async def test_keyword_query_is_fused_until_lexical_index_covers_namespace(self):
+        """Test that auto mode searches both indexes while vectors are missing from the lexical index."""
+        retriever, embeddings = await build_retriever()
+        embeddings.vectors["PRJ-1042"] = [1.0, 0.0]
+        await retriever._vector_store.upsert_matrix(["d"], np.array([[1.0, 0.1]]))
+
+        matches = await retriever.search("PRJ-1042", top_k=2)
+        assert embeddings.calls == ["PRJ-1042"]
+        assert {match["id"] for match in matches} == {"a", "d"}
+
+        retriever._lexical.add_texts(["d"], ["Notes on PRJ-1042"])
+        await retriever.search("PRJ-1042", top_k=2)
+        assert embeddings.calls == ["PRJ-1042"]
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+Unit tests for the backend's cold import time.
+"""
+import os
+import subprocess
+import sys
+from benchmarks.import_time import measure_cold_import
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Generous enough for slow CI machines; override with IMPORT_TIME_BUDGET_SECONDS
+IMPORT_TIME_BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET_SECONDS", "3.0"))
+
+HEAVY_MODULES = ["autogen", "openai", "pinecone", "numpy", "supabase"]
+
+def imported_modules(code):
+    """Run code in a fresh interpreter and return which heavy modules it imported."""
+    script = f"import sys; {code}; print('imported:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+    ).stdout
+    line = next(line for line in output.splitlines() if line.startswith("imported:"))
+    return [name for name in line[len("imported:"):].split(",") if name]
+
+def test_cold_import_of_main_within_budget(monkeypatch):
+    """Test that importing the app stays under the import-time budget."""
+    monkeypatch.chdir(BACKEND_DIR)
+    assert measure_cold_import("main") < IMPORT_TIME_BUDGET_SECONDS
+
+def test_importing_app_and_services_builds_nothing():
+    """Test that importing the app and services package loads no heavy client library."""
+    assert imported_modules("import main, services") == []
+
+def test_service_is_built_on_first_access():
+    """Test that accessing a service imports its client library."""
+    assert "pinecone" in imported_modules("import services; services.pinecone")
@@ -0,0 +1,180 @@
+"""
+Unit tests for the durable job queue and worker pool.
+"""
+import asyncio
+import time
+import pytest
+from services.jobs import JobQueue, JobStore
+from services.registry import registry
+
+async def wait_for_status(queue, job_id, status, timeout=5.0):
+    """Poll a job until it reaches a status."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job.status == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} is {job.status}, expected {status}")
+
+class TestJobStore:
+    """Tests for the SQLite job store."""
+
+    def test_jobs_survive_reopen_and_claim_by_priority(self, tmp_path):
+        """Test that queued jobs persist and the highest priority is claimed first."""
+        path = str(tmp_path / "jobs.sqlite3")
+        store = JobStore(path)
+        low = store.enqueue("ingest", {"n": 1}, priority=0)
+        high = store.enqueue("ingest", {"n": 2}, priority=5)
+        store.enqueue("ingest", {"n": 3}, priority=9, delay=60)
+        store.enqueue("other", {"n": 4}, priority=10)
+        store.close()
+
+        store = JobStore(path)
+        first = store.claim(["ingest"], visibility_timeout=30)
+        assert first.id == high and first.payload == {"n": 2}
+        assert first.status == "running" and first.attempts == 1
+        assert store.claim(["ingest"], visibility_timeout=30).id == low
+        assert store.claim(["ingest"], visibility_timeout=30) is None
+        assert store.counts() == {"ingest": {"queued": 1, "running": 2}, "other": {"queued": 1}}
+
+    def test_expired_lease_is_reclaimed_until_attempts_run_out(self):
+        """Test the visibility timeout: an abandoned job runs again, then fails."""
+        store = JobStore(":memory:")
+        job_id = store.enqueue("ingest", {}, max_attempts=2)
+
+        assert store.claim(["ingest"], visibility_timeout=0.05).attempts == 1
+        assert store.claim(["ingest"], visibility_timeout=0.05) is None
+        time.sleep(0.06)
+        assert store.claim(["ingest"], visibility_timeout=0.05).attempts == 2
+        time.sleep(0.06)
+        assert store.claim(["ingest"], visibility_timeout=0.05) is None
+        assert store.get(job_id).status == "failed"
+
+class TestJobQueue:
+    """Tests for the asyncio worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_failed_jobs_are_retried_with_backoff(self):
+        """Test that a failing handler is retried and its result recorded."""
+        queue = JobQueue(JobStore(":memory:"), poll_interval=0.01, retry_base_delay=0.01, retry_max_delay=0.01)
+        calls = []
+
+        async def flaky(job):
+            calls.append(job.attempts)
+            if job.attempts < 2:
+                raise RuntimeError("temporary")
+            return {"echo": job.payload["x"]}
+
+        queue.register("flaky", flaky)
+        await queue.start()
+        try:
+            job_id = await queue.enqueue("flaky", {"x": 7})
+            job = await wait_for_status(queue, job_id, "completed")
+            assert calls == [1, 2]
+            assert job.result == {"echo": 7} and job.error is None
+
+            failing = await queue.enqueue("flaky", {"x": 0}, max_attempts=1)
+            job = await wait_for_status(queue, failing, "failed")
+            assert job.error == "temporary"
+        finally:
+            await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_limited_per_type(self):
+        """Test that each job type runs at most its configured number of jobs at once."""
+        queue = JobQueue(JobStore(":memory:"), default_concurrency=3, poll_interval=0.01)
+        running = {"slow": 0, "fast": 0}
+        peak = {"slow": 0, "fast": 0}
+
+        def handler(job_type):
+            async def run(job):
+                running[job_type] += 1
+                peak[job_type] = max(peak[job_type], running[job_type])
+                await asyncio.sleep(0.02)
+                running[job_type] -= 1
+            return run
+
+        queue.register("slow", handler("slow"), concurrency=1)
+        queue.register("fast", handler("fast"))
+        await queue.start()
+        try:
+            ids = [await queue.enqueue(job_type, {}) for job_type in ["slow", "fast"] * 6]
+            for job_id in ids:
+                await wait_for_status(queue, job_id, "completed")
+            assert peak == {"slow": 1, "fast": 3}
+            assert (await queue.stats())["workers"] == {"slow": 1, "fast": 3}
+        finally:
+            await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_returns_running_jobs_to_the_queue(self):
+        """Test that jobs interrupted by a shutdown run again without losing an attempt."""
+        store = JobStore(":memory:")
+        queue = JobQueue(store, poll_interval=0.01)
+        started = asyncio.Event()
+
+        async def hang(job):
+            started.set()
+            await asyncio.sleep(60)
+
+        queue.register("hang", hang)
+        with pytest.raises(ValueError):
+            await queue.enqueue("unknown", {})
+        await queue.start()
+        job_id = await queue.enqueue("hang", {})
+        await started.wait()
+        await queue.stop()
+
+        job = store.get(job_id)
+        assert job.status == "queued" and job.attempts == 0
+
+@pytest.fixture
+def delegated_rows(monkeypatch):
+    """Rows upserted into delegated_tasks through a fake Supabase client."""
+    from services.supabase import SupabaseService
+    rows = {}
+
+    class FakeTable:
+        def upsert(self, row):
+            self.row = row
+            return self
+
+        async def execute(self):
+            rows[self.row["id"]] = self.row
+            return type("Response", (), {"data": [self.row]})()
+
+    client = type("Client", (), {"from_": lambda self, name: FakeTable()})()
+    monkeypatch.setitem(registry._instances, "supabase", SupabaseService(client))
+    return rows
+
+class TestDelegation:
+    """Tests for the delegation job handler."""
+
+    @pytest.mark.asyncio
+    async def test_retried_delegation_is_recorded_once(self, delegated_rows):
+        """Test that running the same delegation job twice leaves one row."""
+        from services import delegation
+        rows = delegated_rows
+        store = JobStore(":memory:")
+        job = store.get(store.enqueue("delegation", {"task": "Book the offsite"}))
+
+        await delegation.run_delegation_job(job)
+        await delegation.run_delegation_job(job)
+        assert rows == {job.id: {"id": job.id, "task": "Book the offsite"}}
+
+    def test_delegate_route_without_job_queue(self, delegated_rows, monkeypatch):
+        """Test that /delegate records the task in the background when the queue is disabled."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from routes import delegate
+
+        monkeypatch.setattr(delegate.settings, "JOB_QUEUE_ENABLED", False)
+        app = FastAPI()
+        app.include_router(delegate.router)
+
+        response = TestClient(app).post("/delegate", params={"task": "Book the offsite"})
+        assert response.status_code == 202
+        body = response.json()
+        assert body["job_id"] is None
+        assert delegated_rows == {body["id"]: {"id": body["id"], "task": "Book the offsite"}}
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Unit tests for the BM25 lexical index.
+"""
+from models.document import Document
+from services.lexical_index import LexicalIndex, tokenize
+
+class TestLexicalIndex:
+    """Tests for the LexicalIndex class."""
+
+    def test_tokenize_keeps_identifiers_and_parts(self):
+        """Test that compound identifiers are indexed whole and by part."""
+        assert tokenize("See PRJ-1042, then ask jane.doe") == [
+            "see", "prj-1042", "prj", "1042", "then", "ask", "jane.doe", "jane", "doe"
+        ]
+
+    def test_bm25_ranking_and_filters(self):
+        """Test that rarer, more frequent terms rank higher and filters apply."""
+        index = LexicalIndex()
+        index.add_texts(
+            ["a", "b", "c"],
+            ["budget review budget", "budget for PRJ-7", "team offsite plan"],
+            [{"team": "x"}, {"team": "y"}, {"team": "x"}]
+        )
+
+        assert [m["id"] for m in index.search("budget")] == ["a", "b"]
+        assert [m["id"] for m in index.search("prj-7 budget")][0] == "b"
+        assert [m["id"] for m in index.search("budget", filter={"team": "y"})] == ["b"]
+        assert index.search("nothing") == []
+
+    def test_incremental_updates_and_documents(self):
+        """Test that re-adding and removing texts keeps postings consistent."""
+        index = LexicalIndex()
+        document = Document(id="d1", title="Q3 roadmap", content="Launch PRJ-9", user_id="u1")
+        index.add_documents([document], namespace="u1")
+        index.add_texts(["d1"], ["Q4 roadmap"], namespace="u1")
+
+        assert index.search("prj-9", namespace="u1") == []
+        assert index.search("q4", namespace="u1")[0]["id"] == "d1"
+        assert index.remove(["d1"], namespace="u1") == 1
+        assert index.get_stats("u1") == {"namespace": "u1", "text_count": 0, "term_count": 0}
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Test that a saved index is reloaded with the same rankings and metadata."""
+        path = str(tmp_path / "lexical.json")
+        index = LexicalIndex(path=path)
+        index.add_texts(["a", "b"], ["budget review budget", "budget for PRJ-7"], [{"team": "x"}, {}], namespace="n")
+        index.save()
+
+        reloaded = LexicalIndex(path=path)
+        assert reloaded.count("n") == 2 and not reloaded.has_namespace("other")
+        assert reloaded.search("budget", namespace="n") == index.search("budget", namespace="n")
+        assert reloaded.search("prj-7", namespace="n", filter={"team": "x"}) == []
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Unit tests for the in-process local vector index.
+"""
+import os
+import pytest
+import numpy as np
+from services.local_index import LocalVectorIndex, metadata_matches
+
+@pytest.fixture
+def index():
+    """Fixture for a small 4-dimensional local index."""
+    return LocalVectorIndex(dimension=4)
+
+def records():
+    """Build a few vector records with metadata."""
+    return [
+        {"id": "a", "values": [1.0, 0.0, 0.0, 0.0], "metadata": {"user_id": "u1", "year": 2023}},
+        {"id": "b", "values": [0.9, 0.1, 0.0, 0.0], "metadata": {"user_id": "u2", "year": 2024}},
+        {"id": "c", "values": [0.0, 1.0, 0.0, 0.0], "metadata": {"user_id": "u1", "year": 2024, "tags": ["x", "y"]}},
+    ]
+
+class TestMetadataFilter:
+    """Tests for Pinecone-style metadata filters."""
+
+    def test_operators(self):
+        """Test implicit equality, comparison, membership and boolean operators."""
+        metadata = {"user_id": "u1", "year": 2024, "tags": ["x", "y"]}
+
+        assert metadata_matches(metadata, {"user_id": "u1"})
+        assert metadata_matches(metadata, {"year": {"$gte": 2024, "$lt": 2025}})
+        assert metadata_matches(metadata, {"tags": {"$in": ["y", "z"]}})
+        assert not metadata_matches(metadata, {"tags": {"$nin": ["y"]}})
+        assert metadata_matches(metadata, {"$or": [{"user_id": "u2"}, {"year": 2024}]})
+        assert not metadata_matches(metadata, {"$and": [{"user_id": "u1"}, {"year": 2023}]})
+
+class TestLocalVectorIndex:
+    """Tests for the LocalVectorIndex class."""
+
+    @pytest.mark.asyncio
+    async def test_query_ranks_by_cosine(self, index):
+        """Test that queries return the nearest vectors with scores and metadata."""
+        await index.upsert_vectors(records(), namespace="ns")
+        matches = await index.query_vectors([1.0, 0.0, 0.0, 0.0], top_k=2, namespace="ns")
+
+        assert [match["id"] for match in matches] == ["a", "b"]
+        assert matches[0]["score"] == pytest.approx(1.0)
+        assert matches[0]["metadata"]["user_id"] == "u1"
+        assert await index.query_vectors([1.0, 0.0, 0.0, 0.0], namespace="other") == []
+
+    @pytest.mark.asyncio
+    async def test_query_with_filter(self, index):
+        """Test that metadata filters restrict the candidates."""
+        await index.upsert_vectors(records())
+        matches = await index.query_vectors([1.0, 0.0, 0.0, 0.0], top_k=5, filter={"user_id": "u1"})
+
+        assert [match["id"] for match in matches] == ["a", "c"]
+
+    @pytest.mark.asyncio
+    async def test_upsert_overwrites_and_delete(self, index):
+        """Test overwriting by ID and deleting by ID and filter."""
+        await index.upsert_vectors(records())
+        await index.upsert_vectors([{"id": "a", "values": [0.0, 0.0, 1.0, 0.0], "metadata": {"user_id": "u3"}}])
+        assert (await index.get_stats())["total_vector_count"] == 3
+
+        await index.delete_vectors(ids=["b"])
+        await index.delete_vectors(filter={"user_id": "u3"})
+        matches = await index.query_vectors([1.0, 1.0, 1.0, 0.0], top_k=5)
+
+        assert [match["id"] for match in matches] == ["c"]
+
+    @pytest.mark.asyncio
+    async def test_save_and_load_memory_mapped(self, index, tmp_path):
+        """Test that a saved index is loaded memory-mapped and stays writable."""
+        await index.upsert_matrix(["a", "b"], np.eye(4, dtype=np.float32)[:2], namespace="ns")
+        index.save(str(tmp_path))
+
+        loaded = LocalVectorIndex(dimension=4, path=str(tmp_path))
+        assert isinstance(loaded._namespaces["ns"].matrix, np.memmap)
+        assert (await loaded.get_stats("ns"))["vector_count"] == 2
+
+        await loaded.upsert_vectors([{"id": "c", "values": [0.0, 0.0, 1.0, 0.0]}], namespace="ns")
+        matches = await loaded.query_vectors([0.0, 0.0, 1.0, 0.0], top_k=1, namespace="ns")
+        assert matches[0]["id"] == "c"
+
+    @pytest.mark.asyncio
+    async def test_load_save_load_in_place(self, tmp_path):
+        """Test that saving a memory-mapped index back to its own directory keeps every vector."""
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((1000, 16)).astype(np.float32)
+        index = LocalVectorIndex(dimension=16)
+        await index.upsert_matrix([f"v{i}" for i in range(1000)], vectors, namespace="ns")
+        index.save(str(tmp_path))
+
+        loaded = LocalVectorIndex(dimension=16, path=str(tmp_path))
+        expected = np.array(loaded._namespaces["ns"].matrix[:1000])
+        loaded.save(str(tmp_path))
+        await loaded.upsert_vectors([{"id": "extra", "values": [1.0] * 16}], namespace="ns")
+        loaded.save(str(tmp_path))
+
+        reloaded = LocalVectorIndex(dimension=16, path=str(tmp_path))
+        assert (await reloaded.get_stats("ns"))["vector_count"] == 1001
+        np.testing.assert_array_equal(reloaded._namespaces["ns"].matrix[:1000], expected)
+        matches = await reloaded.query_vectors(vectors[7].tolist(), top_k=1, namespace="ns")
+        assert matches[0]["id"] == "v7"
+        assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path / "ns"))
@@ -0,0 +1,354 @@
+"""
+Unit tests for the Pinecone service.
+"""
+import asyncio
+import json
+import threading
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch, MagicMock
+from tenacity import wait_none
+from services.local_index import LocalVectorIndex
+from services.pinecone import PineconeService, settings
+
+class FakeIndex:
+    """Fake Pinecone index that records upserts and the threads they run on."""
+
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.calls = []
+        self.queries = 0
+        self.attempts = 0
+        self.threads = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=None, show_progress=False):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.threads.add(threading.get_ident())
+            self.attempts += 1
+        try:
+            time.sleep(0.02)
+            if self.fail_ids & {vector["id"] for vector in vectors}:
+                raise RuntimeError("upsert rejected")
+            self.calls.append(vectors)
+            return {"upserted_count": len(vectors)}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def query(self, vector, top_k, namespace=None, filter=None, include_metadata=True):
+        with self._lock:
+            self.queries += 1
+            self.threads.add(threading.get_ident())
+        return {"matches": [{"id": "v0", "score": 1.0}]}
+
+    def delete(self, **kwargs):
+        with self._lock:
+            self.threads.add(threading.get_ident())
+        if self.fail_ids:
+            raise RuntimeError("delete rejected")
+        return {}
+
+    def describe_index_stats(self):
+        with self._lock:
+            self.threads.add(threading.get_ident())
+        return {"namespaces": {"ns": {"vector_count": 3}}}
+
+def make_vectors(count, dimension=4):
+    """Build vector records with small metadata."""
+    return [
+        {"id": f"v{i}", "values": [float(i)] * dimension, "metadata": {"n": i}}
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def pinecone_service(monkeypatch):
+    """Fixture for a Pinecone service with a mocked client and no retry delay."""
+    monkeypatch.setattr(settings, "RETRY_BASE_DELAY", 0)
+    with patch('services.pinecone.Pinecone') as mock_client:
+        mock_client.return_value.list_indexes.return_value = []
+        service = PineconeService()
+    return service
+
+class TestUpsertVectors:
+    """Tests for batched, concurrent upserts."""
+
+    @pytest.mark.asyncio
+    async def test_batches_run_concurrently_off_loop(self, pinecone_service, monkeypatch):
+        """Test that batches are bounded by count and run in worker threads."""
+        index = FakeIndex()
+        pinecone_service._index = index
+        monkeypatch.setattr(settings, "PINECONE_UPSERT_BATCH_SIZE", 3)
+        monkeypatch.setattr(settings, "PINECONE_UPSERT_CONCURRENCY", 2)
+
+        result = await pinecone_service.upsert_vectors(make_vectors(10), namespace="ns")
+
+        assert result["status"] == "success"
+        assert result["upserted"] == 10
+        assert sum(len(call) for call in index.calls) == 10
+        assert max(len(call) for call in index.calls) <= 3
+        assert len(result["batches"]) == 4
+        assert index.max_in_flight == 2
+        assert threading.get_ident() not in index.threads
+
+    @pytest.mark.asyncio
+    async def test_batches_bounded_by_payload_size(self, pinecone_service, monkeypatch):
+        """Test that large vectors are split by estimated payload bytes."""
+        index = FakeIndex()
+        pinecone_service._index = index
+        vectors = make_vectors(6, dimension=100)
+        size = PineconeService._estimate_payload_bytes(vectors[0])
+        monkeypatch.setattr(settings, "PINECONE_UPSERT_MAX_BYTES", size * 2)
+
+        result = await pinecone_service.upsert_vectors(vectors)
+
+        assert result["status"] == "success"
+        assert all(len(call) <= 2 for call in index.calls)
+        assert len(result["batches"]) == 3
+
+    def test_payload_estimate_covers_serialized_size(self):
+        """Test that the payload estimate is never below the JSON the request carries."""
+        rng = np.random.default_rng(0)
+        embedding = rng.normal(size=1536).astype(np.float32)
+        records = [
+            {"id": "doc-1#0", "values": embedding / np.linalg.norm(embedding), "metadata": {"text": "x" * 500}},
+            {"id": "tiny", "values": (rng.normal(size=1536) * 1e-6).astype(np.float32)},
+            {"id": "caf\u00e9 \"quoted\"", "values": [-1.2345678901234567e-308] * 8, "metadata": {}},
+        ]
+
+        for record in records:
+            serialized = len(json.dumps(PineconeService._to_wire([record])[0]))
+            estimate = PineconeService._estimate_payload_bytes(record)
+            assert serialized <= estimate
+        # Typical embeddings are not overestimated by much either
+        first = len(json.dumps(PineconeService._to_wire(records[:1])[0]))
+        assert PineconeService._estimate_payload_bytes(records[0]) < 1.3 * first
+
+    @pytest.mark.asyncio
+    async def test_partial_failure_reports_failed_ids(self, pinecone_service, monkeypatch):
+        """Test that a failing batch is reported without failing the others."""
+        index = FakeIndex(fail_ids={"v4"})
+        pinecone_service._index = index
+        monkeypatch.setattr(settings, "PINECONE_UPSERT_BATCH_SIZE", 3)
+
+        result = await pinecone_service.upsert_vectors(make_vectors(9))
+
+        assert result["status"] == "partial"
+        assert result["upserted"] == 6
+        assert result["failed"] == 3
+        failed = [batch for batch in result["batches"] if batch["status"] == "failed"]
+        assert failed == [{
+            "batch": 1,
+            "count": 3,
+            "status": "failed",
+            "error": "upsert rejected",
+            "ids": ["v3", "v4", "v5"],
+        }]
+
+    @pytest.mark.asyncio
+    async def test_checkpoint_resumes_after_partial_failure(self, pinecone_service, monkeypatch):
+        """Test that a second attempt with the checkpoint only sends unfinished batches."""
+        index = FakeIndex(fail_ids={"v4"})
+        pinecone_service._index = index
+        monkeypatch.setattr(settings, "PINECONE_UPSERT_BATCH_SIZE", 3)
+        checkpoint = set()
+
+        first = await pinecone_service.upsert_vectors(make_vectors(9), checkpoint=checkpoint)
+        index.fail_ids = set()
+        index.calls = []
+        second = await pinecone_service.upsert_vectors(make_vectors(9), checkpoint=checkpoint)
+
+        assert first["status"] == "partial"
+        assert second["status"] == "success"
+        assert second["skipped"] == 6
+        assert [[vector["id"] for vector in call] for call in index.calls] == [["v3", "v4", "v5"]]
+        assert checkpoint == {f"v{i}" for i in range(9)}
+
+    @pytest.mark.asyncio
+    async def test_circuit_breaker_fails_fast(self, pinecone_service, monkeypatch):
+        """Test that batches fail fast without calling Pinecone once the breaker opens."""
+        index = FakeIndex(fail_ids={f"v{i}" for i in range(10)})
+        pinecone_service._index = index
+        monkeypatch.setattr(settings, "PINECONE_UPSERT_BATCH_SIZE", 1)
+        monkeypatch.setattr(settings, "PINECONE_UPSERT_CONCURRENCY", 1)
+
+        result = await pinecone_service.upsert_vectors(make_vectors(10))
+
+        assert result["status"] == "failed"
+        assert pinecone_service._breaker.state == "open"
+        # 5 consecutive failures open the breaker; the rest never reach the index
+        assert index.attempts == 5
+        assert "Circuit breaker for pinecone is open" in result["batches"][-1]["error"]
+
+class TestQueryCache:
+    """Tests for cached query results."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_is_served_from_cache(self, pinecone_service):
+        """Test that a repeated query does not reach Pinecone."""
+        index = FakeIndex()
+        pinecone_service._index = index
+
+        first = await pinecone_service.query_vectors([1.0, 0.0, 0.0], top_k=3, namespace="ns")
+        second = await pinecone_service.query_vectors([2.0, 0.0, 0.0], top_k=3, namespace="ns")
+
+        assert first == second == [{"id": "v0", "score": 1.0}]
+        assert index.queries == 1
+        assert pinecone_service.query_cache_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_namespace(self, pinecone_service):
+        """Test that upserts and deletes drop cached results for their namespace."""
+        index = FakeIndex()
+        pinecone_service._index = index
+        query = [1.0, 0.0, 0.0, 0.0]
+
+        await pinecone_service.query_vectors(query, namespace="ns")
+        await pinecone_service.query_vectors(query, namespace="other")
+        await pinecone_service.upsert_vectors(make_vectors(2), namespace="ns")
+        await pinecone_service.query_vectors(query, namespace="ns")
+        await pinecone_service.query_vectors(query, namespace="other")
+        await pinecone_service.delete_vectors(ids=["v0"], namespace="ns")
+        await pinecone_service.query_vectors(query, namespace="ns")
+
+        assert index.queries == 4
+
+class TestDeleteVectors:
+    """Tests for deletes and stats."""
+
+    @pytest.mark.asyncio
+    async def test_delete_and_stats_run_off_loop(self, pinecone_service):
+        """Test that deletes and index stats are sent from worker threads."""
+        index = FakeIndex()
+        pinecone_service._index = index
+
+        await pinecone_service.delete_vectors(ids=["v0"], namespace="ns")
+        assert (await pinecone_service.get_stats("ns"))["vector_count"] == 3
+        assert index.threads and threading.get_ident() not in index.threads
+
+    @pytest.mark.asyncio
+    async def test_failed_delete_keeps_the_mirror(self, pinecone_service, monkeypatch):
+        """Test that the local mirror only drops vectors once Pinecone has deleted them."""
+        monkeypatch.setattr(PineconeService.delete_vectors.retry, "wait", wait_none())
+        index = FakeIndex(fail_ids={"v0"})
+        pinecone_service._index = index
+        pinecone_service._mirror = LocalVectorIndex(dimension=4)
+        pinecone_service._mirror_namespaces = {"hot"}
+        await pinecone_service._mirror.upsert_vectors(make_vectors(2), namespace="hot")
+
+        with pytest.raises(Exception):
+            await pinecone_service.delete_vectors(ids=["v0"], namespace="hot")
+        assert (await pinecone_service._mirror.get_stats("hot"))["vector_count"] == 2
+
+        index.fail_ids = set()
+        await pinecone_service.delete_vectors(ids=["v0"], namespace="hot")
+        assert (await pinecone_service._mirror.get_stats("hot"))["vector_count"] == 1
+
+class TestMirror:
+    """Tests for namespaces mirrored in a local index."""
+
+    @pytest.mark.asyncio
+    async def test_empty_mirror_falls_back_to_pinecone(self, pinecone_service):
+        """Test that a mirrored namespace is queried in Pinecone until the mirror holds it."""
+        index = FakeIndex()
+        pinecone_service._index = index
+        pinecone_service._mirror = LocalVectorIndex(dimension=4)
+        pinecone_service._mirror_namespaces = {"hot"}
+        query = [1.0, 0.0, 0.0, 0.0]
+
+        assert await pinecone_service.query_vectors(query, namespace="hot") == [{"id": "v0", "score": 1.0}]
+        assert index.queries == 1
+
+        await pinecone_service.upsert_vectors(make_vectors(3), namespace="hot")
+        matches = await pinecone_service.query_vectors(query, top_k=3, namespace="hot")
+        assert index.queries == 1 and len(matches) == 3
+
+    @pytest.mark.asyncio
+    async def test_mirror_is_saved_off_the_event_loop(self, pinecone_service, tmp_path, monkeypatch):
+        """Test that the shutdown hook saves the mirror to LOCAL_INDEX_DIR from a worker thread."""
+        from config.settings import get_settings
+        from services.registry import _save_pinecone_mirror
+
+        monkeypatch.setattr(get_settings(), "LOCAL_INDEX_DIR", str(tmp_path))
+        pinecone_service._index = FakeIndex()
+        pinecone_service._mirror = mirror = LocalVectorIndex(dimension=4)
+        pinecone_service._mirror_namespaces = {"hot"}
+        await pinecone_service.upsert_vectors(make_vectors(3), namespace="hot")
+        threads = []
+        save = mirror.save
+        monkeypatch.setattr(mirror, "save", lambda path: threads.append(threading.get_ident()) or save(path))
+
+        await _save_pinecone_mirror(pinecone_service)
+
+        assert threads and threading.get_ident() not in threads
+        reloaded = LocalVectorIndex(dimension=4, path=str(tmp_path))
+        assert (await reloaded.get_stats("hot"))["vector_count"] == 3
+
+class TestQueryMany:
+    """Tests for multi-query, multi-namespace search."""
+
+    @pytest.mark.asyncio
+    async def test_queries_every_namespace_off_loop(self, pinecone_service):
+        """Test that each vector is queried in each namespace from worker threads."""
+        index = FakeIndex()
+        pinecone_service._index = index
+
+        result = await pinecone_service.query_many(
+            [[1.0, 0.0], [0.0, 1.0]], namespaces=["personal", "team"], top_k=3
+        )
+
+        assert result["status"] == "success"
+        assert index.queries == 4
+        assert threading.get_ident() not in index.threads
+        # The same ID from both namespaces is returned once per query
+        assert [len(matches) for matches in result["results"]] == [1, 1]
+
+class TestConnection:
+    """Tests for lazy, non-blocking connection."""
+
+    def test_construction_does_not_connect(self):
+        """Test that creating the service makes no network calls."""
+        with patch('services.pinecone.Pinecone') as mock_client:
+            service = PineconeService()
+        mock_client.assert_not_called()
+        assert not service.is_ready
+
+    @pytest.mark.asyncio
+    async def test_new_index_is_polled_until_ready(self, monkeypatch):
+        """Test that a created index is polled for readiness instead of a fixed sleep."""
+        monkeypatch.setattr(settings, "PINECONE_READY_POLL_INTERVAL", 0)
+        service = PineconeService()
+        with patch('services.pinecone.Pinecone') as mock_client:
+            client = mock_client.return_value
+            client.list_indexes.return_value = []
+            client.describe_index.side_effect = [
+                MagicMock(status={"ready": False}),
+                MagicMock(status={"ready": True}),
+            ]
+            index = await service.get_index()
+
+        client.create_index.assert_called_once()
+        assert client.describe_index.call_count == 2
+        assert index is client.Index.return_value
+        assert service.is_ready
+
+    @pytest.mark.asyncio
+    async def test_check_ready_connects_in_background(self):
+        """Test that readiness is reported immediately while connecting in the background."""
+        service = PineconeService()
+        with patch('services.pinecone.Pinecone') as mock_client:
+            mock_client.return_value.list_indexes.side_effect = RuntimeError("unreachable")
+            assert await service.check_ready() == {"ready": False, "error": None}
+            await asyncio.gather(service._connect_task, return_exceptions=True)
+            assert await service.check_ready() == {"ready": False, "error": "unreachable"}
+
+            mock_client.return_value.list_indexes.side_effect = None
+            mock_client.return_value.list_indexes.return_value = [MagicMock()]
+            mock_client.return_value.list_indexes.return_value[0].name = settings.PINECONE_INDEX_NAME
+            await service._connect_task
+            assert await service.check_ready() == {"ready": True}
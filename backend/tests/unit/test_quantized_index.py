@@ -0,0 +1,148 @@
+"""
+Unit tests for the compressed (int8 / PQ) vector index.
+"""
+import asyncio
+import threading
+import pytest
+import numpy as np
+from services import quantized_index
+from services.local_index import LocalVectorIndex
+from services.quantized_index import QuantizedVectorIndex
+
+def clustered_vectors(n, dimension=32, clusters=50, seed=0):
+    """Generate clustered unit vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    vectors = centers[rng.integers(0, clusters, n)] + 0.5 * rng.normal(size=(n, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+async def recall(index, vectors, top_k=10):
+    """Recall@k of an index against exact search over the same vectors."""
+    ids = [f"v{i}" for i in range(len(vectors))]
+    exact = LocalVectorIndex(dimension=vectors.shape[1])
+    await exact.upsert_matrix(ids, vectors)
+    await index.upsert_matrix(ids, vectors)
+    await index.wait_for_training()
+
+    hits = 0
+    queries = clustered_vectors(50, dimension=vectors.shape[1], seed=1)
+    for query in queries:
+        expected = {m["id"] for m in await exact.query_vectors(query, top_k=top_k)}
+        found = {m["id"] for m in await index.query_vectors(query, top_k=top_k)}
+        hits += len(expected & found)
+    return hits / (top_k * len(queries))
+
+class TestQuantizedVectorIndex:
+    """Tests for the QuantizedVectorIndex class."""
+
+    @pytest.mark.asyncio
+    async def test_int8_recall_and_memory(self):
+        """Test that int8 codes use 4x less resident memory at near-exact recall."""
+        index = QuantizedVectorIndex(dimension=32, codec="int8")
+        assert await recall(index, clustered_vectors(3000)) >= 0.95
+
+        usage = index.memory_usage()
+        assert usage["original_bytes"] == 0
+        assert usage["resident_bytes"] * 4 <= usage["vectors"] * 32 * 4
+
+    @pytest.mark.asyncio
+    async def test_pq_with_rerank(self):
+        """Test that PQ trains at the threshold and requires re-ranking for recall."""
+        with pytest.raises(ValueError, match="rerank"):
+            QuantizedVectorIndex(dimension=32, codec="pq", n_subvectors=8, min_train_size=1000)
+        index = QuantizedVectorIndex(
+            dimension=32, codec="pq", n_subvectors=8, min_train_size=1000, rerank=100
+        )
+
+        assert await recall(index, clustered_vectors(3000)) >= 0.95
+        space = index._namespaces[""]
+        assert space.trained
+        assert isinstance(space.originals, np.memmap)
+        usage = index.memory_usage()
+        assert usage["code_bytes"] == 3000 * 8
+        assert usage["original_bytes"] == 0
+        assert usage["mapped_bytes"] == 3000 * 32 * 4
+        assert usage["resident_bytes"] == usage["code_bytes"] + space.codebooks.nbytes
+        assert usage["resident_bytes"] * 4 < usage["vectors"] * 32 * 4
+
+    @pytest.mark.asyncio
+    async def test_rerank_originals_are_disk_backed(self, tmp_path):
+        """Test that int8 re-ranking reads originals from a memory map in the spill directory."""
+        index = QuantizedVectorIndex(dimension=32, codec="int8", rerank=50, spill_dir=str(tmp_path))
+        assert await recall(index, clustered_vectors(3000)) >= 0.99
+
+        assert isinstance(index._namespaces[""].originals, np.memmap)
+        usage = index.memory_usage()
+        assert usage["original_bytes"] == 0
+        assert usage["resident_bytes"] == usage["code_bytes"] == 3000 * 32
+
+    @pytest.mark.asyncio
+    async def test_pq_trains_off_the_event_loop(self, monkeypatch):
+        """Test that PQ upserts return before training and later writes are encoded with the codebooks."""
+        started, release = threading.Event(), threading.Event()
+        train = quantized_index.train_product_quantizer
+
+        def blocking_train(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return train(*args, **kwargs)
+
+        monkeypatch.setattr(quantized_index, "train_product_quantizer", blocking_train)
+        vectors = clustered_vectors(2000)
+        ids = [f"v{i}" for i in range(len(vectors))]
+        index = QuantizedVectorIndex(dimension=32, codec="pq", n_subvectors=8, min_train_size=1000, rerank=50)
+        await index.upsert_matrix(ids[:1500], vectors[:1500])
+        await asyncio.to_thread(started.wait, 5)
+
+        space = index._namespaces[""]
+        assert not space.trained
+        assert (await index.query_vectors(vectors[7], top_k=1))[0]["score"] == pytest.approx(1.0)
+
+        await index.upsert_matrix(ids[1500:], vectors[1500:])
+        await index.delete_vectors(ids=["v0", "v1"])
+        await index.upsert_matrix(["v2"], -vectors[2][None, :])
+        release.set()
+        await index.wait_for_training()
+
+        assert space.trained and len(space) == len(ids) - 2
+        expected = space._encode(space.originals[:len(space)])
+        assert np.array_equal(space.codes[:len(space)], expected)
+        assert (await index.query_vectors(-vectors[2], top_k=1))[0]["id"] == "v2"
+
+    @pytest.mark.asyncio
+    async def test_deletes_filters_and_persistence(self, tmp_path):
+        """Test updates, deletes and metadata filters survive a save/load round trip."""
+        vectors = clustered_vectors(200)
+        ids = [f"v{i}" for i in range(len(vectors))]
+        metadata = [{"even": i % 2 == 0} for i in range(len(vectors))]
+        index = QuantizedVectorIndex(dimension=32, codec="int8", rerank=20)
+        await index.upsert_matrix(ids, vectors, metadata, namespace="ns")
+        await index.delete_vectors(ids=["v0"], namespace="ns")
+        index.save(str(tmp_path))
+
+        loaded = QuantizedVectorIndex(dimension=32, path=str(tmp_path), codec="int8", rerank=20)
+        matches = await loaded.query_vectors(vectors[0], top_k=5, namespace="ns", filter={"even": True})
+
+        assert "v0" not in [m["id"] for m in matches]
+        assert all(m["metadata"]["even"] for m in matches)
+        assert matches[0]["score"] >= matches[-1]["score"]
+        with pytest.raises(ValueError):
+            QuantizedVectorIndex(dimension=32, path=str(tmp_path), codec="pq", n_subvectors=8, rerank=20)
+
+    @pytest.mark.asyncio
+    async def test_load_save_load_keeps_reranked_originals(self, tmp_path):
+        """Test that memory-mapped originals survive being saved back to their own directory."""
+        vectors = clustered_vectors(1000)
+        ids = [f"v{i}" for i in range(len(vectors))]
+        index = QuantizedVectorIndex(dimension=32, codec="int8", rerank=10)
+        await index.upsert_matrix(ids, vectors, namespace="ns")
+        index.save(str(tmp_path))
+
+        loaded = QuantizedVectorIndex(dimension=32, path=str(tmp_path), codec="int8", rerank=10)
+        assert isinstance(loaded._namespaces["ns"].originals, np.memmap)
+        loaded.save(str(tmp_path))
+
+        reloaded = QuantizedVectorIndex(dimension=32, path=str(tmp_path), codec="int8", rerank=10)
+        np.testing.assert_array_equal(reloaded._namespaces["ns"].originals, index._namespaces["ns"].originals[:1000])
+        matches = await reloaded.query_vectors(vectors[3], top_k=1, namespace="ns")
+        assert matches[0]["id"] == "v3" and matches[0]["score"] == pytest.approx(1.0)
@@ -0,0 +1,47 @@
+"""
+Unit tests for the query result cache.
+"""
+import pytest
+from unittest.mock import patch
+from services.query_cache import QueryCache
+
+class TestQueryCache:
+    """Tests for the QueryCache class."""
+
+    def test_key_quantizes_vector_and_includes_query_options(self):
+        """Test that near-identical vectors share a key but options do not."""
+        cache = QueryCache(decimals=3)
+        key = cache.make_key([0.6, 0.8], 5, "ns", {"type": "doc"})
+        assert key == cache.make_key([0.60001, 0.79999], 5, "ns", {"type": "doc"})
+        assert key != cache.make_key([0.61, 0.8], 5, "ns", {"type": "doc"})
+        assert key != cache.make_key([0.6, 0.8], 10, "ns", {"type": "doc"})
+        assert key != cache.make_key([0.6, 0.8], 5, "other", {"type": "doc"})
+        assert key != cache.make_key([0.6, 0.8], 5, "ns", None)
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries older than the TTL are misses."""
+        cache = QueryCache(ttl=10)
+        with patch("services.query_cache.time.monotonic", return_value=100.0):
+            cache.set("k", "ns", [{"id": "a"}])
+        with patch("services.query_cache.time.monotonic", return_value=105.0):
+            assert cache.get("k") == [{"id": "a"}]
+        with patch("services.query_cache.time.monotonic", return_value=111.0):
+            assert cache.get("k") is None
+
+        stats = cache.stats()
+        assert stats["expirations"] == 1
+        assert stats["hit_ratio"] == pytest.approx(0.5)
+
+    def test_invalidate_drops_namespace_and_stale_writes(self):
+        """Test that invalidation only affects one namespace and rejects racing results."""
+        cache = QueryCache()
+        cache.set("a", "ns", [{"id": "a"}])
+        cache.set("b", "other", [{"id": "b"}])
+        generation = cache.generation("ns")
+
+        assert cache.invalidate("ns") == 1
+        cache.set("c", "ns", [{"id": "c"}], generation=generation)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == [{"id": "b"}]
+        assert cache.get("c") is None
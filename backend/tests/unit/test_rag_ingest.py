@@ -0,0 +1,225 @@
+"""
+Unit tests for the streaming RAG ingestion pipeline.
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+
+# rag/ lives at the repository root, next to backend/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+
+from rag.ingest import IngestionPipeline, chunk_text, ingest_directory, ingest_documents, iter_documents
+from rag.manifest import IngestionManifest
+from services.lexical_index import LexicalIndex
+
+class FakeStore:
+    """Vector store recording upserts."""
+
+    def __init__(self, delay: float = 0.0):
+        self.vectors = {}
+        self.delay = delay
+        self.deletes = []
+        self.fail_deletes = False
+
+    async def upsert_matrix(self, ids, matrix, metadata=None, namespace=None):
+        await asyncio.sleep(self.delay)
+        for i, vector_id in enumerate(ids):
+            self.vectors[vector_id] = (namespace, matrix[i], metadata[i])
+        return {"status": "success", "count": len(ids)}
+
+    async def delete_vectors(self, ids=None, namespace=None):
+        self.deletes.append(len(ids))
+        if self.fail_deletes:
+            raise RuntimeError("delete failed")
+        for vector_id in ids:
+            self.vectors.pop(vector_id, None)
+        return {"status": "success", "count": len(ids)}
+
+class FakeEmbeddings:
+    """Embeddings service returning one-hot-ish vectors."""
+
+    def __init__(self):
+        self.batches = []
+        self.texts = []
+
+    async def get_embeddings(self, texts, as_array=False):
+        self.batches.append(len(texts))
+        self.texts.extend(texts)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+def write_docs(directory, count, words=300):
+    for n in range(count):
+        with open(os.path.join(directory, f"doc{n}.txt"), "w") as f:
+            f.write(" ".join(f"word{n}-{i}" for i in range(words)))
+
+class TestIngestion:
+    """Tests for document listing, chunking and the pipeline."""
+
+    def test_listing_is_backward_compatible(self, tmp_path):
+        """Test that ingest_documents still lists only top-level PDFs."""
+        (tmp_path / "a.pdf").write_bytes(b"")
+        (tmp_path / "b.txt").write_text("x")
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "sub" / "c.pdf").write_bytes(b"")
+
+        assert ingest_documents(str(tmp_path)) == [str(tmp_path / "a.pdf")]
+        assert sorted(iter_documents(str(tmp_path), (".pdf", ".txt"), recursive=True)) == sorted(
+            [str(tmp_path / "a.pdf"), str(tmp_path / "b.txt"), str(tmp_path / "sub" / "c.pdf")]
+        )
+
+    def test_chunk_text_overlaps_on_word_boundaries(self):
+        """Test that chunks respect the size, overlap and word boundaries."""
+        text = " ".join(f"w{i:03d}" for i in range(100))
+        chunks = list(chunk_text(text, chunk_size=50, overlap=10))
+
+        assert all(len(chunk) <= 50 for chunk in chunks)
+        assert all(len(word) == 4 for chunk in chunks for word in chunk.split())
+        assert chunks[0].startswith("w000") and chunks[-1].endswith("w099")
+        assert chunks[1].split()[0] in chunks[0]
+        with pytest.raises(ValueError):
+            next(chunk_text(text, chunk_size=10, overlap=10))
+
+    @pytest.mark.asyncio
+    async def test_pipeline_ingests_every_chunk_with_backpressure(self, tmp_path):
+        """Test that a slow upsert stage fills the bounded queues without losing chunks."""
+        write_docs(str(tmp_path), 6)
+        (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+        store = FakeStore(delay=0.01)
+        embeddings = FakeEmbeddings()
+
+        stats = await ingest_directory(
+            str(tmp_path), embeddings, store, namespace="team",
+            executor=ThreadPoolExecutor(2), workers=2,
+            chunk_size=200, chunk_overlap=20, embed_batch_size=8, embed_concurrency=2, queue_size=4
+        )
+
+        expected = sum(
+            len(list(chunk_text((tmp_path / f"doc{n}.txt").read_text(), 200, 20))) for n in range(6)
+        )
+        assert len(store.vectors) == expected == stats["upsert"]["items"] == stats["chunk"]["items"]
+        assert stats["extract"]["items"] == 6 and stats["extract"]["errors"] == 1
+        assert max(embeddings.batches) <= 8
+        assert stats["embed"]["max_queue"] <= 4
+        assert stats["chunk"]["blocked_seconds"] > 0
+        namespace, _, metadata = next(iter(store.vectors.values()))
+        assert namespace == "team" and {"source", "document_id", "chunk", "text"} <= set(metadata)
+
+    @pytest.mark.asyncio
+    async def test_pipeline_survives_embedding_failures(self, tmp_path):
+        """Test that a failed embeddings batch is counted and the rest still land."""
+        write_docs(str(tmp_path), 2, words=20)
+        store = FakeStore()
+        calls = 0
+
+        async def embed(texts):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("rate limited")
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+        pipeline = IngestionPipeline(
+            embed=embed,
+            upsert=store.upsert_matrix,
+            executor=ThreadPoolExecutor(1),
+            chunk_size=60,
+            chunk_overlap=0,
+            embed_batch_size=2,
+            embed_concurrency=1
+        )
+        stats = await pipeline.run(iter_documents(str(tmp_path), (".txt",)))
+
+        assert stats["embed"]["errors"] > 0
+        assert stats["upsert"]["items"] == len(store.vectors) == stats["chunk"]["items"] - stats["embed"]["errors"]
+
+    @pytest.mark.asyncio
+    async def test_pipeline_extracts_in_worker_processes(self, tmp_path):
+        """Test the default process-pool extraction path."""
+        write_docs(str(tmp_path), 3, words=10)
+        store = FakeStore()
+
+        stats = await ingest_directory(str(tmp_path), FakeEmbeddings(), store, workers=2)
+
+        assert stats["extract"]["items"] == 3
+        assert len(store.vectors) == 3
+
+    @pytest.mark.asyncio
+    async def test_reingestion_only_touches_what_changed(self, tmp_path):
+        """Test that unchanged files are skipped and only changed chunks are embedded or deleted."""
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        write_docs(str(docs), 3)
+        manifest_path = str(tmp_path / "manifest.json")
+        store = FakeStore()
+        options = {"executor": ThreadPoolExecutor(2), "chunk_size": 200, "chunk_overlap": 20, "delete_batch_size": 2}
+
+        first = await ingest_directory(str(docs), FakeEmbeddings(), store, manifest=manifest_path, **options)
+        initial = dict(store.vectors)
+        assert first["documents"]["ingested"] == 3
+
+        embeddings = FakeEmbeddings()
+        second = await ingest_directory(str(docs), embeddings, store, manifest=manifest_path, **options)
+        assert embeddings.texts == []
+        assert second["documents"]["unchanged"] == 3 and second["extract"]["skipped"] == 3
+        assert store.vectors == initial
+
+        # Rewrite the tail of one document and remove another
+        text = (docs / "doc0.txt").read_text()
+        (docs / "doc0.txt").write_text(text[:len(text) // 2] + " something new at the end")
+        (docs / "doc2.txt").unlink()
+        embeddings = FakeEmbeddings()
+        third = await ingest_directory(str(docs), embeddings, store, manifest=manifest_path, **options)
+
+        expected = {
+            chunk
+            for n in (0, 1)
+            for chunk in chunk_text((docs / f"doc{n}.txt").read_text(), 200, 20)
+        }
+        assert {metadata["text"] for _, _, metadata in store.vectors.values()} == expected
+        assert len(store.vectors) == len(expected)
+        assert 0 < len(embeddings.texts) < len(list(chunk_text((docs / "doc0.txt").read_text(), 200, 20)))
+        assert third["chunk"]["skipped"] > 0
+        assert third["documents"] == {"ingested": 1, "unchanged": 1, "failed": 0, "removed": 1}
+        assert max(store.deletes) <= 2
+        assert len(IngestionManifest(manifest_path)) == 2
+
+    @pytest.mark.asyncio
+    async def test_lexical_index_follows_the_vector_store(self, tmp_path):
+        """Test that stored chunks are added to the BM25 index and deleted chunks removed from it."""
+        write_docs(str(tmp_path), 2, words=50)
+        manifest = IngestionManifest()
+        store = FakeStore()
+        lexical = LexicalIndex()
+        options = {"executor": ThreadPoolExecutor(1), "chunk_size": 200, "chunk_overlap": 20}
+
+        await ingest_directory(str(tmp_path), FakeEmbeddings(), store, "team", manifest=manifest, lexical_index=lexical, **options)
+        assert lexical.get_stats("team")["text_count"] == len(store.vectors)
+        match = lexical.search("word1-7", top_k=1, namespace="team")[0]
+        assert match["id"] in store.vectors and match["metadata"]["text"] == store.vectors[match["id"]][2]["text"]
+
+        (tmp_path / "doc1.txt").unlink()
+        await ingest_directory(str(tmp_path), FakeEmbeddings(), store, "team", manifest=manifest, lexical_index=lexical, **options)
+        assert lexical.get_stats("team")["text_count"] == len(store.vectors) > 0
+        sources = {m["metadata"]["source"] for m in lexical.search("word1-7", top_k=100, namespace="team")}
+        assert sources == {str(tmp_path / "doc0.txt")}
+
+    @pytest.mark.asyncio
+    async def test_failed_deletes_are_retried(self, tmp_path):
+        """Test that vector IDs whose deletion failed are kept and deleted on the next run."""
+        write_docs(str(tmp_path), 2, words=20)
+        manifest = IngestionManifest()
+        store = FakeStore()
+        await ingest_directory(str(tmp_path), FakeEmbeddings(), store, manifest=manifest, executor=ThreadPoolExecutor(1))
+
+        (tmp_path / "doc1.txt").unlink()
+        store.fail_deletes = True
+        stats = await ingest_directory(str(tmp_path), FakeEmbeddings(), store, manifest=manifest, executor=ThreadPoolExecutor(1))
+        assert stats["delete"]["errors"] == 1 and manifest.pending_deletes
+
+        store.fail_deletes = False
+        stats = await ingest_directory(str(tmp_path), FakeEmbeddings(), store, manifest=manifest, executor=ThreadPoolExecutor(1))
+        assert stats["delete"]["items"] == 1 and not manifest.pending_deletes
+        assert len(store.vectors) == 1
@@ -0,0 +1,88 @@
+"""
+Unit tests for the service registry.
+"""
+import sys
+import pytest
+from services.registry import (
+    ServiceRegistry,
+    _build_lexical_index,
+    _build_local_index,
+    _save_lexical_index,
+    _save_local_index
+)
+
+class TestServiceRegistry:
+    """Tests for the ServiceRegistry class."""
+
+    def test_service_built_once_on_first_use(self):
+        """Test that the factory runs on first get and the instance is reused."""
+        registry = ServiceRegistry()
+        built = []
+        registry.register("service", lambda: built.append(1) or object())
+
+        assert not registry.is_built("service")
+        first = registry.get("service")
+        assert registry.get("service") is first
+        assert built == [1]
+        with pytest.raises(KeyError):
+            registry.get("missing")
+
+    @pytest.mark.asyncio
+    async def test_startup_and_shutdown_hooks(self):
+        """Test that startup builds the given services and shutdown only closes built ones."""
+        registry = ServiceRegistry()
+        closed = []
+
+        async def close_async(service):
+            closed.append(service)
+
+        registry.register("a", lambda: "a", shutdown=closed.append)
+        registry.register("b", lambda: "b", shutdown=close_async)
+        registry.register("c", lambda: "c", shutdown=closed.append)
+
+        await registry.startup(["a", "b"])
+        await registry.shutdown()
+
+        assert closed == ["b", "a"]
+        assert not registry.is_built("a")
+
+    @pytest.mark.asyncio
+    async def test_local_vector_store_is_saved_at_shutdown(self, tmp_path, monkeypatch):
+        """Test that the local vector store is a registered service saved to LOCAL_INDEX_DIR at shutdown."""
+        from config.settings import get_settings
+        from services.local_index import LocalVectorIndex
+        from services.vector_store import get_vector_store
+
+        settings = get_settings()
+        monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "local")
+        monkeypatch.setattr(settings, "LOCAL_INDEX_TYPE", "flat")
+        monkeypatch.setattr(settings, "LOCAL_INDEX_DIR", str(tmp_path))
+        registry = ServiceRegistry()
+        registry.register("local_index", _build_local_index, shutdown=_save_local_index)
+        # The services package re-exports the registry instance under the module's name
+        monkeypatch.setattr(sys.modules["services.registry"], "registry", registry)
+
+        store = get_vector_store()
+        assert store is get_vector_store() is registry.get("local_index")
+        await store.upsert_vectors([{"id": "a", "values": [1.0] * 1536}])
+        await registry.shutdown()
+
+        reloaded = LocalVectorIndex(path=str(tmp_path))
+        assert (await reloaded.get_stats())["total_vector_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lexical_index_is_restored_after_restart(self, tmp_path, monkeypatch):
+        """Test that the BM25 index is saved next to LOCAL_INDEX_DIR at shutdown and loaded when rebuilt."""
+        from config.settings import get_settings
+
+        settings = get_settings()
+        monkeypatch.setattr(settings, "LEXICAL_INDEX_PATH", None)
+        monkeypatch.setattr(settings, "LOCAL_INDEX_DIR", str(tmp_path))
+        registry = ServiceRegistry()
+        registry.register("lexical_index", _build_lexical_index, shutdown=_save_lexical_index)
+
+        registry.get("lexical_index").add_texts(["a"], ["Status of PRJ-1042"], namespace="team")
+        await registry.shutdown()
+
+        assert (tmp_path / "lexical.json").exists()
+        assert registry.get("lexical_index").search("prj-1042", namespace="team")[0]["id"] == "a"
\ No newline at end of file
@@ -0,0 +1,417 @@
+"""
+Unit tests for the repository layer.
+"""
+import json
+import httpx
+import pytest
+from pydantic import BaseModel
+from unittest.mock import patch
+from db.database import Database
+from models.conversation import Conversation, ConversationSummary, Message
+from models.document import Document, DocumentSummary
+from models.task import Task, TaskStatus
+from repositories import base as base_module
+from repositories import cache as cache_module
+from repositories.cache import MISS, EntityCache
+from repositories.conversation import ConversationRepository
+from repositories.document import DocumentRepository
+from repositories.task import TaskRepository
+from repositories.user import UserRepository
+from services.user import UserService
+
+OPERATORS = {
+    'eq': lambda a, b: a == b,
+    'gte': lambda a, b: a is not None and a >= b,
+    'lte': lambda a, b: a is not None and a <= b,
+    'in': lambda a, b: a in b,
+    'cs': lambda a, b: set(b) <= set(a or []),
+}
+
+class FakeDatabase:
+    """In-memory stand-in for Database.execute, recording every request."""
+
+    def __init__(self):
+        self.tables = {}
+        self.requests = []
+
+    def _match(self, row, filters):
+        return all(OPERATORS[f['operator']](row.get(f['column']), f['value']) for f in filters or [])
+
+    def _after(self, row, after):
+        """Keyset condition of Database.execute, evaluated in Python."""
+        value, row_value, row_id = after['value'], row.get(after['column']), row['id']
+        if after['descending']:
+            if value is None:
+                return row_value is None and row_id < after['id']
+            return row_value is None or row_value < value or (row_value == value and row_id < after['id'])
+        if value is None:
+            return row_value is not None or row_id > after['id']
+        return row_value is not None and (row_value > value or (row_value == value and row_id > after['id']))
+
+    def _sort(self, rows, order_by):
+        for spec in reversed(order_by if isinstance(order_by, list) else []):
+            desc = spec.get('order') == 'desc'
+            nulls_first = desc if spec.get('nullsfirst') is None else spec['nullsfirst']
+            rows.sort(
+                key=lambda row: (
+                    row.get(spec['column']) is None if nulls_first == desc else row.get(spec['column']) is not None,
+                    row.get(spec['column']) or ''
+                ),
+                reverse=desc
+            )
+        return rows
+
+    async def execute(self, table, query_type, data=None, timeout=None, **kwargs):
+        self.requests.append((table, query_type, data, kwargs))
+        rows = self.tables.setdefault(table, {})
+        if query_type == 'select':
+            selected = [
+                dict(row) for row in rows.values()
+                if self._match(row, kwargs.get('filters'))
+                and (not kwargs.get('keyset_after') or self._after(row, kwargs['keyset_after']))
+            ]
+            selected = self._sort(selected, kwargs.get('order_by'))[:kwargs.get('limit')]
+            if kwargs.get('columns'):
+                selected = [{column: row[column] for column in kwargs['columns'].split(',') if column in row} for row in selected]
+            return selected
+        if query_type in ('insert', 'upsert'):
+            written = []
+            for item in data if isinstance(data, list) else [data]:
+                row = {**rows.get(item.get('id'), {}), **item} if query_type == 'upsert' else dict(item)
+                row.setdefault('id', f"id-{len(rows)}")
+                rows[row['id']] = row
+                written.append(dict(row))
+            return written
+        matched = [row for row in rows.values() if self._match(row, kwargs.get('filters'))]
+        if query_type == 'update':
+            for row in matched:
+                row.update(data)
+            return [dict(row) for row in matched]
+        for row in matched:
+            del rows[row['id']]
+        return matched
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Fixture routing the repositories to an in-memory database."""
+    database = FakeDatabase()
+    monkeypatch.setattr(base_module, "db", database)
+    return database
+
+def make_tasks(count, **fields):
+    return [Task(title=f"Task {n}", user_id="u1", **fields) for n in range(count)]
+
+class TestBulkOperations:
+    """Tests for create_many, upsert_many, update_many and delete_many."""
+
+    @pytest.mark.asyncio
+    async def test_create_many_sends_one_request_per_chunk(self, fake_db):
+        """Test that bulk inserts are chunked and return typed models."""
+        tasks = await TaskRepository().create_many(make_tasks(5), chunk_size=2)
+
+        assert [request[1] for request in fake_db.requests] == ['insert'] * 3
+        assert [len(request[2]) for request in fake_db.requests] == [2, 2, 1]
+        assert all(isinstance(task, Task) and task.id for task in tasks)
+        assert [task.title for task in tasks] == [f"Task {n}" for n in range(5)]
+        assert 'id' not in fake_db.requests[0][2][0]
+
+    @pytest.mark.asyncio
+    async def test_upsert_many_updates_existing_rows(self, fake_db):
+        """Test that upserts replace rows with the same key and insert the rest."""
+        repository = TaskRepository()
+        existing = await repository.create_many(make_tasks(2))
+        existing[0].title = "Renamed"
+
+        result = await repository.upsert_many([existing[0], *make_tasks(1)], chunk_size=10)
+
+        assert len(result) == 2 and result[0].title == "Renamed"
+        assert len(fake_db.tables['tasks']) == 3
+        assert fake_db.requests[-1][3] == {'on_conflict': 'id'}
+
+    @pytest.mark.asyncio
+    async def test_update_and_delete_many_by_ids_and_filters(self, fake_db):
+        """Test bulk updates and deletes by ID chunks and by filters."""
+        repository = TaskRepository()
+        tasks = await repository.create_many(make_tasks(5))
+        fake_db.requests.clear()
+
+        done = await repository.mark_completed_many([task.id for task in tasks[:3]] + ["missing"])
+        assert len(fake_db.requests) == 1
+        assert {task.id for task in done} == {task.id for task in tasks[:3]}
+        assert all(task.status == TaskStatus.COMPLETED for task in done)
+
+        updated = await repository.update_many(
+            {'priority': 'high'}, filters=[{'column': 'status', 'operator': 'eq', 'value': 'pending'}]
+        )
+        assert {task.id for task in updated} == {task.id for task in tasks[3:]}
+
+        fake_db.requests.clear()
+        assert await repository.delete_many([task.id for task in tasks], chunk_size=2) == 5
+        assert len(fake_db.requests) == 3 and fake_db.tables['tasks'] == {}
+
+        with pytest.raises(ValueError):
+            await repository.delete_many()
+
+    @pytest.mark.asyncio
+    async def test_document_tags_are_set_in_bulk(self, fake_db):
+        """Test that DocumentRepository tags many documents at once."""
+        repository = DocumentRepository()
+        documents = await repository.create_many([
+            Document(title=f"Doc {n}", content="text", user_id="u1") for n in range(3)
+        ])
+
+        tagged = await repository.set_tags([document.id for document in documents[:2]], ["board"])
+        assert [document.tags for document in tagged] == [["board"], ["board"]]
+        found = await repository.get_user_documents("u1", tags=["board"])
+        assert {document.id for document in found} == {document.id for document in tagged}
+
+class TestKeysetPagination:
+    """Tests for cursor pagination and lazy iteration."""
+
+    async def seed(self, repository, count=23):
+        """Create tasks whose updated_at values tie and include NULLs."""
+        stamps = [None, "2024-01-01T00:00:00", "2024-01-02T00:00:00", "2024-01-02T00:00:00"]
+        return await repository.create_many([
+            {'id': f"t{n:02d}", 'title': f"Task {n}", 'user_id': 'u1', 'updated_at': stamps[n % 4]}
+            for n in range(count)
+        ])
+
+    @pytest.mark.asyncio
+    async def test_iteration_visits_every_row_once_in_order(self, fake_db):
+        """Test that lazily fetched pages cover every row once, newest first and NULLs last."""
+        repository = TaskRepository()
+        tasks = await self.seed(repository)
+        fake_db.requests.clear()
+
+        pages = [page async for page in repository.iter_pages(page_size=4)]
+        ids = [task.id for page in pages for task in page]
+
+        dated = sorted((task for task in tasks if task.updated_at), key=lambda t: (t.updated_at, t.id), reverse=True)
+        undated = sorted((task.id for task in tasks if not task.updated_at), reverse=True)
+        assert ids == [task.id for task in dated] + undated
+        assert [len(page) for page in pages] == [4, 4, 4, 4, 4, 3]
+        assert len(fake_db.requests) == 6
+        assert [task.id async for task in repository.iterate(page_size=5)] == ids
+
+    @pytest.mark.asyncio
+    async def test_ascending_order_and_page_cursors(self, fake_db):
+        """Test ascending keyset order (NULLs first) through get_page and get_all."""
+        repository = TaskRepository()
+        repository.sort_descending = False
+        tasks = await self.seed(repository, count=10)
+
+        first = await repository.get_page(limit=6)
+        rest = await repository.get_all(limit=100, after=first.next_cursor)
+        ids = [task.id for task in first.items + rest]
+
+        undated = sorted(task.id for task in tasks if not task.updated_at)
+        dated = sorted((task for task in tasks if task.updated_at), key=lambda t: (t.updated_at, t.id))
+        assert ids == undated + [task.id for task in dated]
+        assert (await repository.get_page(limit=6, after=first.next_cursor)).next_cursor is None
+
+        with pytest.raises(ValueError):
+            await repository.filter([], order_by='title', after=first.next_cursor)
+        with pytest.raises(ValueError):
+            await repository.get_all(after="not a cursor")
+
+class TestProjection:
+    """Tests for column projection and summary models."""
+
+    @pytest.mark.asyncio
+    async def test_document_lists_leave_out_content(self, fake_db):
+        """Test that document lists select summary columns only, unless content is asked for."""
+        repository = DocumentRepository()
+        await repository.create_many([
+            Document(title=f"Doc {n}", content="x" * 10_000, user_id="u1", tags=["board"]) for n in range(3)
+        ])
+
+        summaries = await repository.get_user_documents("u1", tags=["board"])
+        assert len(summaries) == 3 and all(type(doc) is DocumentSummary for doc in summaries)
+        columns = fake_db.requests[-1][3]['columns'].split(',')
+        assert 'content' not in columns and {'id', 'title', 'tags', 'updated_at'} <= set(columns)
+
+        full = await repository.get_user_documents("u1", with_content=True)
+        assert all(doc.content == "x" * 10_000 for doc in full)
+        assert fake_db.requests[-1][3]['columns'] is None
+
+    @pytest.mark.asyncio
+    async def test_conversation_lists_leave_out_messages(self, fake_db):
+        """Test that conversation lists skip the embedded messages."""
+        repository = ConversationRepository()
+        await repository.create_many([
+            Conversation(
+                user_id="u1", title=f"Chat {n}", updated_at="2024-01-01T00:00:00",
+                messages=[Message(content="hello", role="user")] * 50
+            )
+            for n in range(2)
+        ])
+
+        summaries = await repository.get_user_conversations("u1")
+        assert [type(conversation) for conversation in summaries] == [ConversationSummary] * 2
+        assert 'messages' not in fake_db.requests[-1][3]['columns'].split(',')
+        assert len((await repository.get_user_conversations("u1", with_messages=True))[0].messages) == 50
+
+    @pytest.mark.asyncio
+    async def test_projected_pages_keep_their_cursors(self, fake_db):
+        """Test that lazy iteration works with a projection."""
+        repository = DocumentRepository()
+        await repository.create_many([Document(title=f"Doc {n}", content="text", user_id="u1") for n in range(7)])
+
+        ids = [doc.id async for doc in repository.iterate(page_size=3, projection=DocumentSummary)]
+        assert sorted(ids) == sorted(fake_db.tables['documents'])
+
+        class Titles(BaseModel):
+            title: str
+
+        with pytest.raises(ValueError, match="must include id and updated_at"):
+            await repository.get_all(projection=Titles)
+
+@pytest.fixture
+def user_cache(monkeypatch):
+    """Fixture giving the repositories a fresh shared entity cache."""
+    cache = EntityCache(ttls={'users': 60.0}, negative_ttl=60.0)
+    monkeypatch.setattr(cache_module, "_default_cache", cache)
+    return cache
+
+def selects(fake_db):
+    return sum(1 for request in fake_db.requests if request[1] == 'select')
+
+class TestEntityCache:
+    """Tests for the read-through entity cache."""
+
+    def test_lru_ttl_and_racing_writes(self, monkeypatch):
+        """Test eviction, expiry, per-table TTLs and generation checks."""
+        now = [0.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = EntityCache(max_entries=2, ttls={'users': 10.0, 'tasks': 1.0}, negative_ttl=2.0)
+
+        cache.set('users', 'id', 'a', 'A', record_id='a')
+        cache.set('tasks', 'id', 't', 'T', record_id='t')
+        cache.set('documents', 'id', 'd', 'D', record_id='d')
+        assert not cache.caches('documents') and cache.get('documents', 'id', 'd') is MISS
+        now[0] = 1.5
+        assert cache.get('users', 'id', 'a') == 'A' and cache.get('tasks', 'id', 't') is MISS
+
+        cache.set('users', 'email', 'b@x.io', None)
+        cache.set('users', 'id', 'c', 'C', record_id='c')
+        assert cache.get('users', 'id', 'a') is MISS
+        now[0] = 4.0
+        assert cache.get('users', 'email', 'b@x.io') is MISS and cache.get('users', 'id', 'c') == 'C'
+
+        generation = cache.generation('users')
+        cache.invalidate('users', 'c')
+        cache.set('users', 'id', 'c', 'stale', record_id='c', generation=generation)
+        assert cache.get('users', 'id', 'c') is MISS
+
+        stats = cache.stats()
+        assert stats['hits'] == 2 and stats['evictions'] == 1 and stats['expirations'] == 2
+        assert 0 < stats['hit_ratio'] < 1
+
+    @pytest.mark.asyncio
+    async def test_user_lookups_are_served_from_memory(self, fake_db, user_cache):
+        """Test that repeated ID and email lookups, found or not, reach the database once."""
+        repository = UserRepository()
+        user = await repository.create({'email': 'ada@example.com', 'full_name': 'Ada'})
+
+        for _ in range(3):
+            assert (await repository.get_by_id(user.id)).full_name == 'Ada'
+            assert (await repository.get_by_email('ada@example.com')).id == user.id
+            assert await repository.get_by_email('nobody@example.com') is None
+        assert selects(fake_db) == 3
+
+        cached = await repository.get_by_id(user.id)
+        cached.full_name = 'Changed'
+        assert (await repository.get_by_id(user.id)).full_name == 'Ada'
+
+        await repository.create({'email': 'nobody@example.com', 'full_name': 'Nobody'})
+        assert (await repository.get_by_email('nobody@example.com')).full_name == 'Nobody'
+
+        stats = repository.cache_stats()
+        assert stats['enabled'] and stats['hits'] == 6 and stats['negative_hits'] == 2
+        assert TaskRepository().cache_stats() == {'enabled': False}
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_cached_users(self, fake_db, user_cache):
+        """Test that update_preferences merges into the current row, not a cached copy, and writes invalidate."""
+        service = UserService()
+        user = await service.repository.create({'email': 'ada@example.com', 'full_name': 'Ada'})
+        await service.get(user.id)
+        fake_db.requests.clear()
+
+        await service.update_preferences(user.id, {'theme': 'dark'})
+        assert selects(fake_db) == 1
+
+        # Another process changes the row while this one holds it cached
+        await service.get(user.id)
+        fake_db.tables['users'][user.id]['preferences'] = {'theme': 'dark', 'language': 'fr'}
+        updated = await service.update_preferences(user.id, {'digest': 'daily'})
+        assert updated.preferences == {'theme': 'dark', 'language': 'fr', 'digest': 'daily'}
+        assert (await service.get_by_email('ada@example.com')).preferences == updated.preferences
+        assert (await service.get(user.id)).preferences == updated.preferences
+
+        await service.delete(user.id)
+        assert await service.get(user.id) is None
+        assert await service.get_by_email('ada@example.com') is None
+
+class TestDatabaseBulkRequests:
+    """Tests for the PostgREST requests bulk operations send."""
+
+    @pytest.mark.asyncio
+    async def test_bulk_requests_are_single_statements(self):
+        """Test that bulk inserts, ID updates and filtered deletes are one request each."""
+        from postgrest import AsyncPostgrestClient
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            body = json.loads(request.content) if request.content else {}
+            return httpx.Response(200, json=body if isinstance(body, list) else [body])
+
+        client = AsyncPostgrestClient(
+            "https://x.supabase.co/rest/v1",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        database = Database()
+        with patch('db.database.get_async_client', return_value=client):
+            await database.execute('tasks', 'insert', [{'title': 'a'}, {'title': 'b'}])
+            await database.execute('tasks', 'upsert', [{'id': '1'}], on_conflict='id')
+            await database.execute(
+                'tasks', 'update', {'status': 'completed'},
+                filters=[{'column': 'id', 'operator': 'in', 'value': ['1', '2']}]
+            )
+            await database.execute('tasks', 'delete', filters=[{'column': 'user_id', 'operator': 'eq', 'value': 'u1'}])
+            with pytest.raises(ValueError):
+                await database.execute('tasks', 'delete')
+
+        assert [request.method for request in requests] == ['POST', 'POST', 'PATCH', 'DELETE']
+        assert json.loads(requests[0].content) == [{'title': 'a'}, {'title': 'b'}]
+        assert requests[1].url.params['on_conflict'] == 'id'
+        assert requests[2].url.params['id'] == 'in.(1,2)'
+        assert requests[3].url.params['user_id'] == 'eq.u1'
+
+    @pytest.mark.asyncio
+    async def test_keyset_request(self):
+        """Test the order and seek condition sent for a page after a cursor."""
+        from postgrest import AsyncPostgrestClient
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json=[])
+
+        client = AsyncPostgrestClient(
+            "https://x.supabase.co/rest/v1",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        repository = TaskRepository()
+        cursor = repository.cursor(Task(id="t1", title="x", user_id="u1", updated_at="2024-01-02T03:04:05Z"))
+        with patch('db.database.get_async_client', return_value=client):
+            await repository.filter([{'column': 'user_id', 'operator': 'eq', 'value': 'u1'}], limit=10, after=cursor)
+
+        params = requests[0].url.params
+        assert params['user_id'] == 'eq.u1' and params['limit'] == '10'
+        assert params['order'] == 'updated_at.desc.nullslast,id.desc'
+        assert params['or'] == (
+            '(updated_at.lt."2024-01-02T03:04:05Z",'
+            'and(updated_at.eq."2024-01-02T03:04:05Z",id.lt."t1"),updated_at.is.null)'
+        )
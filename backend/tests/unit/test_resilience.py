@@ -0,0 +1,103 @@
+"""
+Unit tests for retries and the circuit breaker.
+"""
+import pytest
+from unittest.mock import patch
+from services.resilience import CircuitBreaker, CircuitOpenError, backoff_delay, retry_async
+
+class Flaky:
+    """Coroutine function that fails a given number of times before succeeding."""
+
+    def __init__(self, failures, error=ConnectionError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("backend down")
+        return "ok"
+
+class TestRetryAsync:
+    """Tests for the retry_async helper."""
+
+    @pytest.mark.asyncio
+    async def test_retries_until_success(self):
+        """Test that transient errors are retried."""
+        call = Flaky(2)
+        assert await retry_async(call, attempts=3, base_delay=0) == "ok"
+        assert call.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_errors_raise_immediately(self):
+        """Test that errors outside retry_on are not retried."""
+        call = Flaky(1, error=ValueError)
+        with pytest.raises(ValueError):
+            await retry_async(call, attempts=3, base_delay=0, retry_on=(ConnectionError,))
+        assert call.calls == 1
+
+    def test_backoff_delay_is_jittered_and_capped(self):
+        """Test that delays stay within the exponential cap."""
+        delays = [backoff_delay(6, base_delay=0.5, max_delay=10.0) for _ in range(100)]
+        assert all(0 <= delay <= 10.0 for delay in delays)
+        assert len(set(delays)) > 1
+
+class TestCircuitBreaker:
+    """Tests for the CircuitBreaker class."""
+
+    @pytest.mark.asyncio
+    async def test_opens_and_fails_fast(self):
+        """Test that the breaker opens at the threshold and rejects calls."""
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+        call = Flaky(10)
+
+        with pytest.raises(ConnectionError):
+            await retry_async(call, attempts=2, base_delay=0, breaker=breaker)
+        with pytest.raises(CircuitOpenError):
+            await retry_async(call, attempts=2, base_delay=0, breaker=breaker)
+
+        assert call.calls == 2
+        assert breaker.stats()["state"] == "open"
+        assert breaker.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_half_open_trial_closes_or_reopens(self):
+        """Test that one trial call is let through after the reset timeout."""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+        with patch("services.resilience.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+            assert breaker.state == "open"
+
+        with patch("services.resilience.time.monotonic", return_value=131.0):
+            assert breaker.state == "half_open"
+            assert breaker.before_call()
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+            breaker.record_failure(trial=True)
+            assert breaker.state == "open"
+
+        with patch("services.resilience.time.monotonic", return_value=200.0):
+            assert await retry_async(Flaky(0), breaker=breaker) == "ok"
+            assert breaker.state == "closed"
+
+    def test_only_the_trial_call_frees_the_trial_slot(self):
+        """Test that calls started before the circuit opened cannot free the half-open trial slot."""
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+        with patch("services.resilience.time.monotonic", return_value=100.0):
+            early_calls = [breaker.before_call(), breaker.before_call(), breaker.before_call()]
+            assert early_calls == [False, False, False]
+            breaker.record_failure(early_calls[0])
+
+        with patch("services.resilience.time.monotonic", return_value=131.0):
+            trial = breaker.before_call()
+            assert trial
+            # The other early calls end (cancelled, failed) while the trial is in flight
+            breaker.release(early_calls[1])
+            breaker.record_failure(early_calls[2])
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+
+            breaker.record_success(trial)
+            assert breaker.state == "closed"
+            assert not breaker.before_call()
\ No newline at end of file
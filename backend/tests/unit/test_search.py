@@ -0,0 +1,57 @@
+"""
+Unit tests for scatter-gather search.
+"""
+import asyncio
+import pytest
+import numpy as np
+from services.local_index import LocalVectorIndex
+from services.search import merge_matches, scatter_gather
+
+class TestMergeMatches:
+    """Tests for merging per-namespace matches."""
+
+    def test_merges_by_score_and_deduplicates(self):
+        """Test that each ID is kept once at its best score, in score order."""
+        merged = merge_matches([
+            ("personal", [{"id": "a", "score": 0.9}, {"id": "b", "score": 0.5}]),
+            ("team", [{"id": "b", "score": 0.8, "metadata": {"n": 1}}, {"id": "c", "score": 0.1}]),
+        ], top_k=2)
+
+        assert [(match["id"], match["namespace"]) for match in merged] == [("a", "personal"), ("b", "team")]
+        assert merged[1]["metadata"] == {"n": 1}
+
+class TestScatterGather:
+    """Tests for the scatter_gather helper."""
+
+    @pytest.mark.asyncio
+    async def test_slow_namespace_returns_partial_results(self):
+        """Test that shards missing the deadline are reported and left out."""
+        async def query(vector, top_k, namespace, filter):
+            if namespace == "slow":
+                await asyncio.sleep(1)
+            return [{"id": f"{namespace}-{vector[0]}", "score": 1.0}]
+
+        result = await scatter_gather(query, [[1.0], [2.0]], ["fast", "slow"], timeout=0.05)
+
+        assert result["status"] == "partial"
+        assert [[match["id"] for match in matches] for matches in result["results"]] == [
+            ["fast-1.0"], ["fast-2.0"]
+        ]
+        assert result["failed"] == [
+            {"query": 0, "namespace": "slow", "error": "timed out"},
+            {"query": 1, "namespace": "slow", "error": "timed out"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_local_index_query_many(self):
+        """Test multi-query, multi-namespace search against the local index."""
+        index = LocalVectorIndex(dimension=2)
+        await index.upsert_matrix(["a"], np.array([[1.0, 0.0]]), namespace="personal")
+        await index.upsert_matrix(["b"], np.array([[0.0, 1.0]]), namespace="team")
+
+        result = await index.query_many(
+            [[1.0, 0.1], [0.1, 1.0]], namespaces=["personal", "team"], top_k=1
+        )
+
+        assert result["status"] == "success"
+        assert [matches[0]["id"] for matches in result["results"]] == ["a", "b"]
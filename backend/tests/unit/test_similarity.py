@@ -0,0 +1,58 @@
+"""
+Unit tests for the vectorized similarity helpers.
+"""
+import pytest
+import numpy as np
+from services.similarity import (
+    SimilarityIndex,
+    cosine_scores,
+    duplicate_pairs,
+    normalize_rows,
+    pairwise_similarity,
+    top_k,
+)
+
+class TestSimilarity:
+    """Tests for the similarity module."""
+
+    def test_normalize_rows_keeps_zero_rows(self):
+        """Test that rows get unit length and zero rows stay zero."""
+        matrix = normalize_rows([[3.0, 4.0], [0.0, 0.0]])
+        assert matrix.ravel().tolist() == pytest.approx([0.6, 0.8, 0.0, 0.0])
+
+    def test_cosine_scores_matches_loop(self):
+        """Test that the matrix-vector product matches per-item cosine similarity."""
+        rng = np.random.default_rng(0)
+        query = rng.normal(size=16)
+        candidates = rng.normal(size=(50, 16))
+
+        expected = [
+            np.dot(query, c) / (np.linalg.norm(query) * np.linalg.norm(c)) for c in candidates
+        ]
+        assert cosine_scores(query, candidates).tolist() == pytest.approx(expected, abs=1e-5)
+
+    def test_top_k_matches_full_sort(self):
+        """Test that partial selection returns the same ranking as a full sort."""
+        scores = np.random.default_rng(1).random(1000).astype(np.float32)
+        indices, values = top_k(scores, 10)
+
+        assert indices.tolist() == np.argsort(-scores)[:10].tolist()
+        assert values.tolist() == sorted(scores.tolist(), reverse=True)[:10]
+        assert len(top_k(scores[:3], 10)[0]) == 3
+
+    def test_index_top_k(self):
+        """Test that the index returns (position, score) pairs best first."""
+        index = SimilarityIndex([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+        results = index.top_k([1.0, 0.1], k=2)
+
+        assert [position for position, _ in results] == [0, 2]
+        assert results[0][1] > results[1][1]
+
+    def test_pairwise_and_duplicates(self):
+        """Test the all-pairs matrix and near-duplicate detection."""
+        vectors = [[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]]
+        matrix = pairwise_similarity(vectors)
+
+        assert matrix.shape == (3, 3)
+        assert np.diag(matrix) == pytest.approx([1.0, 1.0, 1.0])
+        assert [(i, j) for i, j, _ in duplicate_pairs(vectors, threshold=0.95)] == [(0, 1)]
@@ -1,65 +1,125 @@
 """
 Unit tests for the Supabase service.
 """
+import asyncio
+import time
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
+from db import client as db_client
+from db.database import Database
 from services.supabase import SupabaseService
 
 @pytest.fixture
 def mock_supabase_client():
-    """Fixture for mocking the Supabase client."""
-    with patch('services.supabase.create_client') as mock_client:
+    """Fixture for mocking the shared async PostgREST client."""
+    with patch('services.supabase.get_async_client') as mock_client:
         mock_instance = MagicMock()
         mock_client.return_value = mock_instance
         yield mock_instance
 
+@pytest.fixture
+def shared_client():
+    """Fixture giving a fresh shared client and closing it afterwards."""
+    db_client._client = None
+    yield db_client.get_async_client()
+    asyncio.run(db_client.close_async_client())
+
 class TestSupabaseService:
     """Tests for the SupabaseService class."""
 
-    def test_initialization(self, mock_supabase_client):
-        """Test that the service initializes correctly."""
-        with patch('services.supabase.get_settings') as mock_settings:
-            mock_settings.return_value.SUPABASE_URL = 'https://test.supabase.co'
-            mock_settings.return_value.SUPABASE_KEY = 'test-key'
-            
+    def test_initialization(self):
+        """Test that the service initializes without connecting and then uses the shared client."""
+        with patch('services.supabase.get_async_client') as mock_get_client:
             service = SupabaseService()
-            assert service._client is not None
-            mock_supabase_client.assert_called_once()
+            mock_get_client.assert_not_called()
+
+            assert service.client is mock_get_client.return_value
+            assert service.client is mock_get_client.return_value
+            mock_get_client.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_get_by_id(self, mock_supabase_client):
         """Test get_by_id method."""
         # Setup mock response
         mock_execute = MagicMock()
-        mock_execute.execute.return_value.data = [{"id": "123", "name": "Test"}]
+        mock_execute.execute = AsyncMock(return_value=MagicMock(data=[{"id": "123", "name": "Test"}]))
         mock_supabase_client.from_.return_value.select.return_value.eq.return_value = mock_execute
-        
+
         # Create service instance
         service = SupabaseService()
-        
+
         # Call the method
         result = await service.get_by_id("users", "123")
-        
+
         # Assertions
         assert result == {"id": "123", "name": "Test"}
         mock_supabase_client.from_.assert_called_once_with("users")
         mock_supabase_client.from_.return_value.select.assert_called_once_with("*")
         mock_supabase_client.from_.return_value.select.return_value.eq.assert_called_once_with("id", "123")
+        mock_execute.execute.assert_awaited_once()
 
     @pytest.mark.asyncio
     async def test_get_by_id_not_found(self, mock_supabase_client):
         """Test get_by_id method when record is not found."""
         # Setup mock response
         mock_execute = MagicMock()
-        mock_execute.execute.return_value.data = []
+        mock_execute.execute = AsyncMock(return_value=MagicMock(data=[]))
         mock_supabase_client.from_.return_value.select.return_value.eq.return_value = mock_execute
-        
+
         # Create service instance
         service = SupabaseService()
-        
+
         # Call the method
         result = await service.get_by_id("users", "456")
-        
+
         # Assertions
         assert result is None
-        mock_supabase_client.from_.assert_called_once_with("users") 
\ No newline at end of file
+        mock_supabase_client.from_.assert_called_once_with("users")
+
+class TestSharedClient:
+    """Tests for the shared per-process data client."""
+
+    def test_one_pooled_client_per_process(self, shared_client):
+        """Test that Database and SupabaseService share one keep-alive connection pool."""
+        from config.settings import get_settings
+        settings = get_settings()
+
+        assert db_client.get_async_client() is shared_client
+        assert Database().client is shared_client
+        assert SupabaseService().client is shared_client
+
+        pool = shared_client.session._transport._pool
+        assert pool._max_connections == settings.SUPABASE_MAX_CONNECTIONS
+        assert pool._max_keepalive_connections == settings.SUPABASE_MAX_KEEPALIVE
+        assert pool._keepalive_expiry == settings.SUPABASE_KEEPALIVE_EXPIRY
+        assert pool._http2 == db_client.http2_available()
+        assert shared_client.session.headers["apikey"] == settings.SUPABASE_KEY
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_overlap(self):
+        """Test that concurrent database calls do not serialize on the event loop."""
+        async def respond():
+            await asyncio.sleep(0.1)
+            return MagicMock(data=[{"id": "1"}])
+
+        client = MagicMock()
+        client.table.return_value.select.return_value = MagicMock(execute=respond)
+        with patch('db.database.get_async_client', return_value=client):
+            start = time.monotonic()
+            results = await asyncio.gather(*(Database().execute("users", "select") for _ in range(10)))
+
+        assert results == [[{"id": "1"}]] * 10
+        assert time.monotonic() - start < 0.5
+        client.table.return_value.select.assert_called_with("*")
+
+    @pytest.mark.asyncio
+    async def test_calls_time_out(self):
+        """Test that a call slower than its timeout is abandoned."""
+        async def slow():
+            await asyncio.sleep(1)
+
+        client = MagicMock()
+        client.table.return_value.select.return_value = MagicMock(execute=slow)
+        with patch('db.database.get_async_client', return_value=client):
+            with pytest.raises(asyncio.TimeoutError):
+                await Database().execute("users", "select", timeout=0.01)
@@ -0,0 +1,155 @@
+"""
+Unit tests for streaming context uploads and background processing.
+"""
+import hashlib
+import io
+import os
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+import numpy as np
+import pytest
+from main import app
+from services import uploads as uploads_module
+from services.hybrid_search import HybridRetriever
+from services.lexical_index import LexicalIndex
+from services.registry import registry
+from services.uploads import UploadManager, UploadTooLargeError, spool_upload
+
+client = TestClient(app)
+
+class FakeEmbeddings:
+    """Embeddings service streaming constant vectors."""
+
+    def __init__(self):
+        self.texts = []
+
+    async def stream_embeddings(self, texts, chunk_size=None, as_array=False):
+        self.texts.extend(texts)
+        for offset in range(0, len(texts), chunk_size):
+            yield offset, np.ones((len(texts[offset:offset + chunk_size]), 4), dtype=np.float32)
+
+class FakeStore:
+    """Vector store recording upserts."""
+
+    def __init__(self):
+        self.vectors = {}
+
+    async def upsert_matrix(self, ids, matrix, metadata=None, namespace=None):
+        for vector_id, meta in zip(ids, metadata):
+            self.vectors[namespace, vector_id] = (namespace, meta)
+        return {"status": "success", "count": len(ids)}
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """Upload manager with fake services, registered for the routes."""
+    monkeypatch.setattr(uploads_module.settings, "UPLOAD_BLOCK_SIZE", 1024)
+    monkeypatch.setattr(uploads_module.settings, "UPLOAD_CHUNK_TOKENS", 50)
+    monkeypatch.setattr(uploads_module.settings, "UPLOAD_CHUNK_OVERLAP", 5)
+    monkeypatch.setattr(uploads_module.settings, "UPLOAD_EMBED_BATCH_SIZE", 4)
+    monkeypatch.setattr(uploads_module.settings, "JOB_QUEUE_ENABLED", False)
+    manager = UploadManager(
+        str(tmp_path / "spool"), embeddings=FakeEmbeddings(), vector_store=FakeStore(), lexical_index=LexicalIndex()
+    )
+    monkeypatch.setitem(registry._instances, "upload_manager", manager)
+    return manager
+
+def upload(content, title="Board deck", filename="deck.txt", namespace="board"):
+    return client.post(
+        "/api/v1/contexts/upload",
+        params={"title": title, "namespace": namespace},
+        files={"file": (filename, content, "text/plain")}
+    )
+
+class TestUploads:
+    """Tests for spooling, deduplication and background processing."""
+
+    @pytest.mark.asyncio
+    async def test_spool_upload_streams_and_hashes(self, tmp_path):
+        """Test that the spool file and hash match the upload, block by block."""
+        content = os.urandom(10_000)
+        path, digest, size = await spool_upload(
+            UploadFile(io.BytesIO(content), filename="a.bin"), str(tmp_path), block_size=1000
+        )
+
+        assert digest == hashlib.sha256(content).hexdigest() and size == len(content)
+        with open(path, "rb") as f:
+            assert f.read() == content
+
+        with pytest.raises(UploadTooLargeError):
+            await spool_upload(UploadFile(io.BytesIO(content), filename="a.bin"), str(tmp_path), 1000, max_bytes=5000)
+        assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+    def test_upload_returns_202_and_processes_in_background(self, manager):
+        """Test that the upload is accepted at once and its progress can be polled."""
+        content = " ".join(f"word{i}" for i in range(500)).encode()
+        response = upload(content)
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["sha256"] == hashlib.sha256(content).hexdigest() and job["size"] == len(content)
+
+        status = client.get(f"/api/v1/contexts/upload/{job['id']}").json()
+        assert status["status"] == "completed" and status["progress"] == 1.0
+        assert status["chunks_done"] == status["chunks_total"] > 1
+        assert len(manager._vector_store.vectors) == status["chunks_total"]
+        namespace, metadata = next(iter(manager._vector_store.vectors.values()))
+        assert namespace == "board" and metadata["context_id"] == job["id"]
+        assert manager._lexical_index.get_stats("board")["text_count"] == status["chunks_total"]
+        assert manager._lexical_index.search("word250", namespace="board")[0]["metadata"]["context_id"] == job["id"]
+        assert os.listdir(manager._spool_dir) == []
+
+    def test_uploaded_context_is_searchable(self, manager, monkeypatch):
+        """Test that the search route finds uploaded chunks through the hybrid retriever."""
+        retriever = HybridRetriever(manager._lexical_index, manager._vector_store, manager._embeddings)
+        monkeypatch.setitem(registry._instances, "hybrid_retriever", retriever)
+        job = upload(" ".join(f"word{i}" for i in range(500)).encode()).json()
+
+        response = client.post(
+            "/api/v1/contexts/search", json={"query": "word250", "namespace": "board", "mode": "lexical"}
+        )
+        assert response.status_code == 200
+        assert response.json()[0]["metadata"]["context_id"] == job["id"]
+        response = client.post("/api/v1/contexts/search", json={"query": "word250", "mode": "fuzzy"})
+        assert response.status_code == 400
+
+    def test_duplicate_upload_is_not_processed_again(self, manager):
+        """Test that identical content returns the earlier job without re-embedding."""
+        first = upload(b"quarterly numbers").json()
+        embedded = len(manager._embeddings.texts)
+        second = upload(b"quarterly numbers", title="Copy", filename="copy.txt")
+
+        assert second.status_code == 202
+        assert second.json()["id"] == first["id"] and second.json()["duplicate"] is True
+        assert len(manager._embeddings.texts) == embedded
+        assert os.listdir(manager._spool_dir) == []
+
+    def test_same_content_in_another_namespace_is_processed(self, manager):
+        """Test that deduplication never points one namespace at another's vectors."""
+        first = upload(b"quarterly numbers").json()
+        other = upload(b"quarterly numbers", namespace="finance").json()
+
+        assert other["id"] != first["id"] and not other["duplicate"]
+        assert client.get(f"/api/v1/contexts/upload/{other['id']}").json()["status"] == "completed"
+        assert {namespace for namespace, _ in manager._vector_store.vectors} == {"board", "finance"}
+        assert upload(b"quarterly numbers", namespace="finance").json()["id"] == other["id"]
+
+    def test_oversized_upload_and_unknown_job(self, manager, monkeypatch):
+        """Test that oversized uploads get 413 and unknown jobs 404."""
+        monkeypatch.setattr(uploads_module.settings, "UPLOAD_MAX_BYTES", 100)
+
+        assert upload(b"x" * 101).status_code == 413
+        assert os.listdir(manager._spool_dir) == []
+        assert client.get("/api/v1/contexts/upload/missing").status_code == 404
+
+    def test_failed_processing_is_reported(self, manager):
+        """Test that a processing error marks the job failed and allows a retry."""
+        async def fail(*args, **kwargs):
+            raise RuntimeError("index unavailable")
+        manager._vector_store.upsert_matrix = fail
+
+        job = upload(b"some text to embed").json()
+        status = client.get(f"/api/v1/contexts/upload/{job['id']}").json()
+        assert status["status"] == "failed" and "index unavailable" in status["error"]
+
+        retry = upload(b"some text to embed").json()
+        assert retry["id"] != job["id"] and not retry["duplicate"]
@@ -1,4 +1,590 @@
+"""
+Streaming RAG ingestion: list, extract, chunk, embed and upsert documents.
+
+Stages are connected by bounded queues, so a slow stage applies
+backpressure to the ones before it and only a few documents are ever held
+in memory. Text extraction runs in a process pool; chunking is
+generator-based; embedding and upserting are async and batched.
+
+With an IngestionManifest, re-runs are incremental: files whose hash is
+unchanged are skipped, only new or changed chunks are embedded, and the
+vectors of vanished chunks and documents are deleted in batches.
+
+Example:
+    from services.embeddings import embeddings_service
+    from services.registry import get_service
+    from services.vector_store import get_vector_store
+
+    stats = await ingest_directory(
+        "docs", embeddings_service, get_vector_store(), namespace="team", manifest="data/ingest.json",
+        lexical_index=get_service("lexical_index")
+    )
+"""
+import asyncio
+import hashlib
+import logging
 import os
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+from .manifest import IngestionManifest, chunk_hash, file_hash
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+EmbedFn = Callable[[List[str]], Awaitable[Sequence[Any]]]
+UpsertFn = Callable[[List[str], Sequence[Any], List[Dict[str, Any]]], Awaitable[Any]]
+DeleteFn = Callable[[List[str]], Awaitable[Any]]
+
+def iter_documents(
+    directory: str = "docs",
+    extensions: Tuple[str, ...] = (".pdf",),
+    recursive: bool = False
+) -> Iterator[str]:
+    """
+    Lazily list document paths in a directory.
+
+    Args:
+        directory: Directory to scan
+        extensions: File extensions to include (lowercase)
+        recursive: Also scan subdirectories
+
+    Yields:
+        Paths of matching files
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir() and recursive:
+                yield from iter_documents(entry.path, extensions, recursive)
+            elif entry.is_file() and entry.name.lower().endswith(extensions):
+                yield entry.path
+
+def ingest_documents(directory: str = "docs") -> List[str]:
+    """List the PDF paths in a directory."""
+    return list(iter_documents(directory))
+
+def extract_text(path: str) -> str:
+    """
+    Extract the text of a document (runs in a worker process).
+
+    Args:
+        path: PDF, plain-text or Markdown file
+
+    Returns:
+        Document text
+    """
+    if path.lower().endswith(".pdf"):
+        from pdfminer.high_level import extract_text as extract_pdf_text
+        return extract_pdf_text(path)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+def extract_document(path: str, known_hash: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    Hash a document and extract its text unless it is unchanged (runs in a worker process).
+
+    Args:
+        path: Document path
+        known_hash: File hash recorded by the last ingestion, if any
+
+    Returns:
+        File hash, and the text (None if the hash matches known_hash)
+    """
+    digest = file_hash(path)
+    if digest == known_hash:
+        return digest, None
+    return digest, extract_text(path)
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> Iterator[str]:
+    """
+    Split text into overlapping chunks, preferring whitespace boundaries.
+
+    Args:
+        text: Text to split
+        chunk_size: Maximum characters per chunk
+        overlap: Characters shared by consecutive chunks
+
+    Yields:
+        Non-empty chunks in text order
+    """
+    if overlap >= chunk_size:
+        raise ValueError("Chunk overlap must be smaller than the chunk size")
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Break at the last whitespace in the second half of the window
+            boundary = text.rfind(" ", start + chunk_size // 2, end)
+            if boundary == -1:
+                boundary = text.rfind("\n", start + chunk_size // 2, end)
+            if boundary != -1:
+                end = boundary
+        chunk = text[start:end].strip()
+        if chunk:
+            yield chunk
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+
+def document_id(path: str) -> str:
+    """Stable ID for a document, derived from its absolute path."""
+    return hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+
+def _failed_ids(result: Any, ids: List[str]) -> Set[str]:
+    """IDs an upsert reports as not written (PineconeService returns partial results instead of raising)."""
+    if not isinstance(result, dict) or result.get("status", "success") == "success":
+        return set()
+    failed = {
+        vector_id
+        for batch in result.get("batches", []) if batch.get("status") == "failed"
+        for vector_id in batch.get("ids", [])
+    }
+    return failed or set(ids)
+
+@dataclass
+class _DocumentState:
+    """Progress of one document through the embed and upsert stages."""
+    document_id: str
+    source: str
+    file_hash: str
+    stored: Dict[str, str]  # Chunk hash -> vector ID of chunks in the store
+    stale: List[str] = field(default_factory=list)  # Vector IDs to delete once done
+    pending: int = 0  # Chunks not yet upserted (or failed)
+    chunked: bool = False
+    failed: bool = False
+
+@dataclass
+class Chunk:
+    """A chunk of document text on its way to the vector store."""
+    id: str
+    text: str
+    metadata: Dict[str, Any]
+    hash: str = ""
+    document: Optional[_DocumentState] = field(default=None, repr=False)
+
+@dataclass
+class StageStats:
+    """Throughput and backpressure counters of one pipeline stage."""
+    name: str
+    items: int = 0
+    errors: int = 0
+    skipped: int = 0  # Unchanged documents or chunks
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0  # Waiting for room in the next stage's queue
+    max_queue: int = 0  # Deepest the stage's input queue got
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Counters plus items per second of wall time."""
+        elapsed = (self.finished_at or time.monotonic()) - (self.started_at or time.monotonic())
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "items_per_second": self.items / elapsed if elapsed > 0 else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "max_queue": self.max_queue,
+        }
+
+_DONE = object()
+
+@dataclass
+class IngestionPipeline:
+    """Streaming extract -> chunk -> embed -> upsert pipeline with bounded queues.
+
+    Args:
+        embed: Async function embedding a list of texts (e.g.
+            EmbeddingsService.get_embeddings with as_array=True)
+        upsert: Async function storing (ids, vectors, metadata) (e.g.
+            a vector store's upsert_matrix bound to a namespace)
+        workers: Extraction processes (defaults to the CPU count)
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters shared by consecutive chunks
+        embed_batch_size: Chunks per embeddings request
+        embed_concurrency: Embeddings requests in flight at once
+        queue_size: Capacity of each inter-stage queue, in items
+        executor: Executor for extraction (a process pool if None)
+        delete: Async function deleting vectors by ID (e.g. a vector
+            store's delete_vectors bound to a namespace)
+        manifest: Record of what earlier runs stored; enables incremental runs
+        delete_batch_size: Vector IDs per delete request
+    """
+    embed: EmbedFn
+    upsert: UpsertFn
+    workers: Optional[int] = None
+    chunk_size: int = 1000
+    chunk_overlap: int = 200
+    embed_batch_size: int = 256
+    embed_concurrency: int = 4
+    queue_size: int = 1024
+    executor: Optional[Executor] = None
+    delete: Optional[DeleteFn] = None
+    manifest: Optional[IngestionManifest] = None
+    delete_batch_size: int = 1000
+    stats: Dict[str, StageStats] = field(init=False, default_factory=dict)
+
+    async def run(self, paths: Iterable[str], prune: bool = False) -> Dict[str, Any]:
+        """
+        Ingest documents, streaming them through every stage.
+
+        Args:
+            paths: Document paths (consumed lazily)
+            prune: Delete the vectors of manifest documents missing from
+                paths (only when paths is the whole corpus)
+
+        Returns:
+            Per-stage counters, throughput and backpressure, document counts
+            and total seconds
+        """
+        workers = self.workers or os.cpu_count() or 1
+        self.stats = {name: StageStats(name) for name in ("extract", "chunk", "embed", "upsert", "delete")}
+        self._documents: Counter = Counter()
+        self._seen: Set[str] = set()
+        self._deletes: List[str] = []
+        if self.manifest is not None:
+            self._deletes, self.manifest.pending_deletes = self.manifest.pending_deletes, []
+        texts: asyncio.Queue = asyncio.Queue(maxsize=workers)
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        batches: asyncio.Queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+
+        started = time.monotonic()
+        executor = self.executor or ProcessPoolExecutor(max_workers=workers)
+        try:
+            embedders = [
+                asyncio.create_task(self._embed_stage(chunks, batches))
+                for _ in range(self.embed_concurrency)
+            ]
+            stages = [
+                asyncio.create_task(self._extract_stage(paths, texts, executor, workers)),
+                asyncio.create_task(self._chunk_stage(texts, chunks)),
+                asyncio.create_task(self._upsert_stage(batches)),
+            ]
+
+            async def close_embedders():
+                await asyncio.gather(*embedders)
+                await batches.put(_DONE)
+
+            await asyncio.gather(*stages, close_embedders())
+
+            if prune and self.manifest is not None:
+                for doc_id in self.manifest.document_ids():
+                    if doc_id not in self._seen:
+                        self._deletes.extend(self.manifest.remove(doc_id)["chunks"].values())
+                        self._documents["removed"] += 1
+            await self._flush_deletes(force=True)
+        finally:
+            if self.executor is None:
+                executor.shutdown(cancel_futures=True)
+            if self.manifest is not None:
+                self.manifest.pending_deletes.extend(self._deletes)
+                if self.manifest.path:
+                    self.manifest.save()
+
+        report: Dict[str, Any] = {name: stats.as_dict() for name, stats in self.stats.items()}
+        report["documents"] = {
+            key: self._documents[key] for key in ("ingested", "unchanged", "failed", "removed")
+        }
+        report["seconds"] = round(time.monotonic() - started, 3)
+        logger.info(
+            f"Ingested {self._documents['ingested']} documents ({self._documents['unchanged']} unchanged) "
+            f"as {self.stats['upsert'].items} new chunks, deleted {self.stats['delete'].items} vectors "
+            f"in {report['seconds']}s"
+        )
+        return report
+
+    async def _put(self, queue: asyncio.Queue, item: Any, stats: StageStats) -> None:
+        """Put an item on the next queue, timing how long backpressure blocks it."""
+        waited = time.monotonic()
+        await queue.put(item)
+        stats.blocked_seconds += time.monotonic() - waited
+
+    @staticmethod
+    def _begin(stats: StageStats) -> None:
+        if stats.started_at is None:
+            stats.started_at = time.monotonic()
+
+    async def _extract_stage(
+        self,
+        paths: Iterable[str],
+        texts: asyncio.Queue,
+        executor: Executor,
+        max_in_flight: int
+    ) -> None:
+        """Extract documents in the executor, keeping a bounded number in flight."""
+        stats = self.stats["extract"]
+        loop = asyncio.get_running_loop()
+
+        async def extract(path: str, known_hash: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+            started = time.monotonic()
+            try:
+                digest, text = await loop.run_in_executor(executor, extract_document, path, known_hash)
+                return path, digest, text
+            except Exception as e:
+                logger.error(f"Error extracting text from {path}: {str(e)}")
+                stats.errors += 1
+                self._documents["failed"] += 1
+                return path, None, None
+            finally:
+                stats.busy_seconds += time.monotonic() - started
+
+        async def emit(done: Iterable[asyncio.Task]) -> None:
+            for task in done:
+                path, digest, text = task.result()
+                if text is not None:
+                    stats.items += 1
+                    await self._put(texts, (path, digest, text), stats)
+                elif digest is not None:
+                    stats.skipped += 1
+                    self._documents["unchanged"] += 1
+
+        pending: set = set()
+        try:
+            for path in paths:
+                self._begin(stats)
+                if len(pending) >= max_in_flight:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    await emit(done)
+                doc_id = document_id(path)
+                # Seen even if extraction fails, so pruning keeps its vectors
+                self._seen.add(doc_id)
+                entry = self.manifest.get(doc_id) if self.manifest is not None else None
+                pending.add(asyncio.create_task(extract(path, entry["file_hash"] if entry else None)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                await emit(done)
+        finally:
+            for task in pending:
+                task.cancel()
+            stats.finished_at = time.monotonic()
+            await texts.put(_DONE)
+
+    async def _chunk_stage(self, texts: asyncio.Queue, chunks: asyncio.Queue) -> None:
+        """Split each document into chunks as it arrives, passing on only new chunks."""
+        stats = self.stats["chunk"]
+        try:
+            while True:
+                stats.max_queue = max(stats.max_queue, texts.qsize())
+                item = await texts.get()
+                if item is _DONE:
+                    break
+                self._begin(stats)
+                path, digest, text = item
+                doc_id = document_id(path)
+                entry = self.manifest.get(doc_id) if self.manifest is not None else None
+                previous: Dict[str, str] = entry["chunks"] if entry else {}
+                document = _DocumentState(doc_id, path, digest, stored={})
+                current: Set[str] = set()
+
+                started = time.monotonic()
+                for n, chunk in enumerate(chunk_text(text, self.chunk_size, self.chunk_overlap)):
+                    content_hash = chunk_hash(chunk)
+                    if content_hash in current:
+                        continue
+                    current.add(content_hash)
+                    if content_hash in previous:
+                        document.stored[content_hash] = previous[content_hash]
+                        stats.skipped += 1
+                        continue
+                    stats.busy_seconds += time.monotonic() - started
+                    stats.items += 1
+                    document.pending += 1
+                    # Content-addressed IDs stay stable when other chunks shift
+                    await self._put(chunks, Chunk(
+                        id=f"{doc_id}:{content_hash[:16]}",
+                        text=chunk,
+                        metadata={"source": path, "document_id": doc_id, "chunk": n, "text": chunk},
+                        hash=content_hash,
+                        document=document
+                    ), stats)
+                    started = time.monotonic()
+                stats.busy_seconds += time.monotonic() - started
+
+                document.stale = [vector_id for key, vector_id in previous.items() if key not in current]
+                document.chunked = True
+                await self._settle([document])
+        finally:
+            stats.finished_at = time.monotonic()
+            for _ in range(self.embed_concurrency):
+                await chunks.put(_DONE)
+
+    async def _embed_stage(self, chunks: asyncio.Queue, batches: asyncio.Queue) -> None:
+        """Embed chunks in batches; one of several concurrent workers."""
+        stats = self.stats["embed"]
+        done = False
+        while not done:
+            stats.max_queue = max(stats.max_queue, chunks.qsize())
+            batch: List[Chunk] = []
+            item = await chunks.get()
+            # Take what is already queued, up to a batch, without waiting for more
+            while item is not _DONE:
+                batch.append(item)
+                if len(batch) >= self.embed_batch_size or chunks.empty():
+                    break
+                item = chunks.get_nowait()
+            done = item is _DONE
+            if not batch:
+                continue
+
+            self._begin(stats)
+            started = time.monotonic()
+            try:
+                vectors = await self.embed([chunk.text for chunk in batch])
+            except Exception as e:
+                logger.error(f"Error embedding {len(batch)} chunks: {str(e)}")
+                stats.errors += len(batch)
+                await self._settle(self._complete(batch, failed={chunk.id for chunk in batch}))
+                continue
+            finally:
+                stats.busy_seconds += time.monotonic() - started
+                stats.finished_at = time.monotonic()
+            stats.items += len(batch)
+            await self._put(batches, (batch, vectors), stats)
+
+    async def _upsert_stage(self, batches: asyncio.Queue) -> None:
+        """Store embedded batches in the vector store."""
+        stats = self.stats["upsert"]
+        while True:
+            stats.max_queue = max(stats.max_queue, batches.qsize())
+            item = await batches.get()
+            if item is _DONE:
+                break
+            self._begin(stats)
+            batch, vectors = item
+            ids = [chunk.id for chunk in batch]
+            started = time.monotonic()
+            try:
+                failed = _failed_ids(
+                    await self.upsert(ids, vectors, [chunk.metadata for chunk in batch]),
+                    ids
+                )
+            except Exception as e:
+                logger.error(f"Error upserting {len(batch)} chunks: {str(e)}")
+                failed = set(ids)
+            finally:
+                stats.busy_seconds += time.monotonic() - started
+                stats.finished_at = time.monotonic()
+            stats.items += len(batch) - len(failed)
+            stats.errors += len(failed)
+            await self._settle(self._complete(batch, failed))
+
+    @staticmethod
+    def _complete(batch: List[Chunk], failed: Set[str]) -> List[_DocumentState]:
+        """Record chunks as stored (or failed) on their documents; returns those documents."""
+        documents = {}
+        for chunk in batch:
+            document = chunk.document
+            if document is None:
+                continue
+            document.pending -= 1
+            if chunk.id in failed:
+                document.failed = True
+            else:
+                document.stored[chunk.hash] = chunk.id
+            documents[id(document)] = document
+        return list(documents.values())
+
+    async def _settle(self, documents: List[_DocumentState]) -> None:
+        """Finish documents whose chunks have all been handled.
+
+        The manifest entry is written and the vectors of vanished chunks are
+        queued for deletion only after the new chunks are stored. A document
+        with failed chunks keeps the chunks that did land but loses its file
+        hash, so the next run extracts it again.
+        """
+        for document in documents:
+            if not document.chunked or document.pending:
+                continue
+            if self.manifest is not None:
+                self.manifest.set(
+                    document.document_id,
+                    document.source,
+                    "" if document.failed else document.file_hash,
+                    document.stored
+                )
+            self._documents["failed" if document.failed else "ingested"] += 1
+            self._deletes.extend(document.stale)
+        await self._flush_deletes()
+
+    async def _flush_deletes(self, force: bool = False) -> None:
+        """Delete queued vector IDs in batches (a final partial batch only if forced)."""
+        if self.delete is None:
+            return
+        stats = self.stats["delete"]
+        while self._deletes and (force or len(self._deletes) >= self.delete_batch_size):
+            batch = self._deletes[:self.delete_batch_size]
+            del self._deletes[:self.delete_batch_size]
+            self._begin(stats)
+            started = time.monotonic()
+            try:
+                await self.delete(batch)
+                stats.items += len(batch)
+            except Exception as e:
+                logger.error(f"Error deleting {len(batch)} vectors: {str(e)}")
+                stats.errors += len(batch)
+                if self.manifest is not None:
+                    self.manifest.pending_deletes.extend(batch)
+            finally:
+                stats.busy_seconds += time.monotonic() - started
+                stats.finished_at = time.monotonic()
+
+async def ingest_directory(
+    directory: str,
+    embeddings: Any,
+    vector_store: Any,
+    namespace: Optional[str] = None,
+    extensions: Tuple[str, ...] = SUPPORTED_EXTENSIONS,
+    recursive: bool = True,
+    manifest: Optional[Union[str, IngestionManifest]] = None,
+    lexical_index: Any = None,
+    **options: Any
+) -> Dict[str, Any]:
+    """
+    Ingest every document in a directory into a vector store.
+
+    Args:
+        directory: Directory to scan
+        embeddings: EmbeddingsService (get_embeddings with as_array)
+        vector_store: PineconeService or a local index (upsert_matrix)
+        namespace: Optional vector store namespace
+        extensions: File extensions to ingest
+        recursive: Also scan subdirectories
+        manifest: Manifest (or its JSON path) for incremental re-ingestion;
+            documents no longer in the directory are then deleted
+        lexical_index: Optional LexicalIndex kept in step with the vector
+            store: stored chunks are added and deleted chunks removed
+        **options: IngestionPipeline options (workers, chunk_size, ...)
+
+    Returns:
+        Per-stage statistics from IngestionPipeline.run
+    """
+    async def embed(texts: List[str]) -> Any:
+        return await embeddings.get_embeddings(texts, as_array=True)
+
+    async def upsert(ids: List[str], vectors: Any, metadata: List[Dict[str, Any]]) -> Any:
+        result = await vector_store.upsert_matrix(ids, vectors, metadata, namespace=namespace)
+        if lexical_index is not None:
+            failed = _failed_ids(result, ids)
+            stored = [i for i, vector_id in enumerate(ids) if vector_id not in failed]
+            lexical_index.add_texts(
+                [ids[i] for i in stored],
+                [metadata[i]["text"] for i in stored],
+                [metadata[i] for i in stored],
+                namespace=namespace
+            )
+        return result
+
+    async def delete(ids: List[str]) -> Any:
+        result = await vector_store.delete_vectors(ids=ids, namespace=namespace)
+        if lexical_index is not None:
+            lexical_index.remove(ids, namespace=namespace)
+        return result
 
-def ingest_documents(directory="docs"):
-    return [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".pdf")]
\ No newline at end of file
+    if isinstance(manifest, str):
+        manifest = IngestionManifest(manifest)
+    pipeline = IngestionPipeline(embed=embed, upsert=upsert, delete=delete, manifest=manifest, **options)
+    return await pipeline.run(iter_documents(directory, extensions, recursive), prune=manifest is not None)
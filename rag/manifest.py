@@ -0,0 +1,136 @@
+"""
+Ingestion manifest: which chunks of which documents are in the vector store.
+
+For every document the manifest records the hash of the file and, per
+chunk, the hash of its text and the ID of its vector, so a re-run only
+extracts changed files, only embeds changed chunks and knows exactly which
+vectors to delete.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Hash a file's bytes without reading it into memory at once.
+
+    Args:
+        path: File to hash
+        block_size: Bytes read per step
+
+    Returns:
+        SHA-256 hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_hash(text: str) -> str:
+    """SHA-256 hex digest of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class IngestionManifest:
+    """Per-document file and chunk hashes, persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the manifest, loading it from disk if it exists.
+
+        Args:
+            path: JSON file to load from and save to (None keeps it in memory)
+        """
+        self._path = path
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        # Vector IDs whose deletion failed, retried on the next run
+        self.pending_deletes: List[str] = []
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._documents
+
+    @property
+    def path(self) -> Optional[str]:
+        """JSON file the manifest is saved to."""
+        return self._path
+
+    def document_ids(self) -> Iterator[str]:
+        """IDs of the documents in the manifest."""
+        return iter(list(self._documents))
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a document's entry.
+
+        Args:
+            document_id: Document ID
+
+        Returns:
+            Dict with 'source', 'file_hash' and 'chunks' (chunk hash -> vector
+            ID), or None if the document was never ingested
+        """
+        return self._documents.get(document_id)
+
+    def set(self, document_id: str, source: str, file_hash: str, chunks: Dict[str, str]) -> None:
+        """
+        Record a document's ingested state.
+
+        Args:
+            document_id: Document ID
+            source: Document path
+            file_hash: Hash of the file ("" forces re-extraction next time)
+            chunks: Chunk hash -> vector ID of every stored chunk
+        """
+        self._documents[document_id] = {"source": source, "file_hash": file_hash, "chunks": chunks}
+
+    def remove(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Forget a document; returns its last entry."""
+        return self._documents.pop(document_id, None)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Write the manifest atomically.
+
+        Args:
+            path: JSON file (defaults to the path it was loaded from)
+        """
+        path = path or self._path
+        if not path:
+            raise ValueError("No manifest path given")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "documents": self._documents,
+                "pending_deletes": self.pending_deletes,
+            }, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved ingestion manifest with {len(self._documents)} documents to {path}")
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Load the manifest from disk.
+
+        Args:
+            path: JSON file (defaults to the manifest's path)
+        """
+        with open(path or self._path) as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported ingestion manifest version: {data.get('version')}")
+        self._documents = data["documents"]
+        self.pending_deletes = data.get("pending_deletes", [])